@@ -0,0 +1,150 @@
+"""Benchmark: latência acrescentada pelo backend no caminho de áudio Live.
+
+Corre N conversas em simultâneo por `EmpatIAAgent.stream_conversation`
+contra o servidor Live falso (`src/vertex/fake_live.py`), com memórias em
+memória e embeddings locais: não precisa de rede, credenciais nem base de
+dados. O servidor falso responde sem atrasos próprios, pelo que os tempos
+medidos são do backend (e do event loop partilhado pelas N conversas):
+
+- chunk_ms: do chunk de áudio do cliente entregue ao agente até o eco do
+  servidor sair de `stream_conversation` (ida e volta)
+- model_part_ms: do envio de uma parte de áudio pelo servidor até sair de
+  `stream_conversation`
+- tool_call_ms: da tool call enviada pelo servidor até à resposta (inclui
+  executar a tool: `manage_memory` ADD e SEARCH alternados)
+- turn_ms: do `turn_complete` enviado pelo servidor até ao evento
+  `turn_complete` do agente
+
+Uso:
+    python -m benchmarks.live_latency --sessions 1 --sessions 25 --sessions 100 --turns 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, AsyncIterator
+
+# Sem base de dados nem Vertex (antes de carregar as configurações)
+os.environ["MEMORY_BACKEND"] = "memory"
+os.environ["EMBEDDING_PROVIDER"] = "local"
+os.environ["EMBEDDING_FALLBACK_PROVIDER"] = ""
+os.environ.setdefault("POSTGRES_PASSWORD", "")
+
+import structlog
+
+from src.agent.empatia_agent import EmpatIAAgent
+from src.observability import Histogram
+from src.vertex import set_client
+from src.vertex.fake_live import FakeClient, LiveScript, STAMP_CLIENT, read_stamp, stamp
+
+# Latências abaixo de 1 ms são o caso normal: buckets mais finos
+BUCKETS_MS = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 40, 100, 250, 500, 1000, 2500)
+# PCM 16 bits mono a 16 kHz
+INPUT_BYTES_PER_MS = 32
+
+
+class Results:
+    def __init__(self):
+        self.chunk_ms = Histogram(BUCKETS_MS)
+        self.model_part_ms = Histogram(BUCKETS_MS)
+        self.turn_ms = Histogram(BUCKETS_MS)
+        self.errors = 0
+
+
+async def conversation(
+    agent: EmpatIAAgent,
+    client: FakeClient,
+    tag: int,
+    args: argparse.Namespace,
+    results: Results,
+) -> None:
+    session = await agent.create_session(f"bench-live-{tag}")
+    chunks = args.turns * args.chunks_per_turn
+    size = int(args.chunk_ms * INPUT_BYTES_PER_MS)
+
+    async def audio() -> AsyncIterator[bytes]:
+        for seq in range(chunks):
+            yield stamp(STAMP_CLIENT, tag, seq, size)
+            await asyncio.sleep(args.chunk_ms / 1000)
+
+    def on_event(event: str, **data) -> None:
+        fake = client.sessions.get(tag)
+        if event == "turn_complete" and fake and fake.turns_sent:
+            results.turn_ms.observe((time.perf_counter() - fake.turns_sent.popleft()) * 1000)
+
+    try:
+        async for data in agent.stream_conversation(session, audio(), on_event=on_event):
+            stamped = read_stamp(data)
+            if stamped is None:
+                continue
+            origin, _, _, sent_at = stamped
+            latency = (time.perf_counter() - sent_at) * 1000
+            if origin == STAMP_CLIENT:
+                results.chunk_ms.observe(latency)
+            else:
+                results.model_part_ms.observe(latency)
+    except Exception:
+        results.errors += 1
+    finally:
+        await agent.end_session(session.session_id)
+
+
+async def run(args: argparse.Namespace, sessions: int) -> Dict[str, Any]:
+    script = LiveScript(
+        chunks_per_turn=args.chunks_per_turn,
+        parts_per_turn=args.parts_per_turn,
+        part_ms=args.part_ms,
+        tool_every=args.tool_every,
+        interrupt_every=args.interrupt_every,
+    )
+    client = FakeClient(script)
+    set_client(client)
+    agent = EmpatIAAgent()
+    await agent.initialize()
+
+    results = Results()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(conversation(agent, client, tag, args, results) for tag in range(sessions))
+        )
+    finally:
+        elapsed = time.perf_counter() - started
+        await agent.shutdown(timeout=5)
+        set_client(None)
+
+    return {
+        "sessions": sessions,
+        "turns": args.turns,
+        "elapsed_s": round(elapsed, 2),
+        "errors": results.errors,
+        "chunk_ms": results.chunk_ms.snapshot(),
+        "model_part_ms": results.model_part_ms.snapshot(),
+        "tool_call_ms": client.tool_ms.snapshot(),
+        "turn_ms": results.turn_ms.snapshot(),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, args.log_level))
+    )
+    for sessions in args.sessions or [1, 10, 50]:
+        print(json.dumps(await run(args, sessions)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, action="append")
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--chunk-ms", type=float, default=20.0)
+    parser.add_argument("--chunks-per-turn", type=int, default=50)
+    parser.add_argument("--parts-per-turn", type=int, default=25)
+    parser.add_argument("--part-ms", type=float, default=40.0)
+    parser.add_argument("--tool-every", type=int, default=2)
+    parser.add_argument("--interrupt-every", type=int, default=3)
+    parser.add_argument("--log-level", default="WARNING")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+"""Benchmark: débito e qualidade do fornecedor de embeddings local.
+
+Corre sem rede nem base de dados. Mede textos por segundo por tamanho de
+lote e, com um conjunto sintético de memórias, se a pesquisa por cosseno
+encontra a memória certa para consultas com variações (plurais, acentos,
+palavras trocadas), como no modo degradado.
+
+Uso:
+    python -m benchmarks.local_embeddings --texts 5000 --batch-size 1 --batch-size 100
+
+Os resultados são determinísticos (mesma semente, mesmos vetores).
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from src.embeddings import LocalEmbeddingProvider
+from src.observability import Histogram
+
+WORDS = [
+    "neta", "filho", "jardim", "médico", "consulta", "pressão", "caminhada",
+    "igreja", "domingo", "futebol", "benfica", "receita", "bacalhau", "rádio",
+    "fado", "costura", "gato", "vizinha", "farmácia", "comprimidos", "praia",
+    "aldeia", "vindima", "netos", "aniversário", "fotografias", "guerra",
+]
+
+# (memória, consulta com variações) para a medida de qualidade
+PAIRS: List[Tuple[str, str]] = [
+    ("A neta Maria vive em Lisboa e visita aos domingos", "quando vem a netinha maria"),
+    ("Toma comprimidos para a tensão ao pequeno-almoço", "comprimido da tensao"),
+    ("Gosta de ouvir fado na rádio à noite", "fados na radio"),
+    ("Consulta no médico de família na terça-feira", "medico de familia consulta"),
+    ("Adora cozinhar bacalhau com natas para os filhos", "receita de bacalhau"),
+    ("O gato chama-se Tareco e dorme no sofá", "tareco o gato"),
+    ("Fazia a vindima na aldeia quando era novo", "vindimas na aldeia"),
+    ("É sócio do Benfica desde 1960", "benfiquista socio"),
+]
+
+
+def random_text(rng: random.Random) -> str:
+    return " ".join(rng.sample(WORDS, rng.randint(5, 15)))
+
+
+def throughput(provider: LocalEmbeddingProvider, texts: List[str], batch_size: int) -> Dict[str, Any]:
+    latency = Histogram()
+    started = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        batch_started = time.perf_counter()
+        provider.embed_sync(texts[i:i + batch_size])
+        latency.observe((time.perf_counter() - batch_started) * 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        "batch_size": batch_size,
+        "texts_per_s": round(len(texts) / elapsed, 1),
+        "batch_ms": latency.snapshot(),
+    }
+
+
+def recall(provider: LocalEmbeddingProvider, distractors: List[str]) -> Dict[str, Any]:
+    """Fração de consultas cuja memória certa fica em 1.º lugar."""
+    memories = [memory for memory, _ in PAIRS] + distractors
+    matrix = provider.embed_sync(memories)
+    queries = provider.embed_sync([query for _, query in PAIRS])
+    # Vetores normalizados: produto interno = cosseno
+    scores = queries @ matrix.T
+    best = np.argmax(scores, axis=1)
+    hits = int(np.sum(best == np.arange(len(PAIRS))))
+    return {
+        "queries": len(PAIRS),
+        "memories": len(memories),
+        "recall_at_1": round(hits / len(PAIRS), 3),
+        "similarity_hit_avg": round(float(np.mean(scores[np.arange(len(PAIRS)), np.arange(len(PAIRS))])), 3),
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    provider = LocalEmbeddingProvider()
+    texts = [random_text(rng) for _ in range(args.texts)]
+    provider.embed_sync(texts[:10])  # aquecimento
+
+    for batch_size in args.batch_size or [1, 100]:
+        print(json.dumps({"model": provider.model, **throughput(provider, texts, batch_size)}))
+    print(json.dumps({"model": provider.model, **recall(provider, texts[:args.distractors])}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, action="append")
+    parser.add_argument("--distractors", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
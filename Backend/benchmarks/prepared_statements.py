@@ -0,0 +1,189 @@
+"""Benchmark: SQL em texto (sem cache de statements) vs statements preparados.
+
+Corre a mesma carga de operações de memória contra a base de dados
+configurada (.env) em dois modos:
+
+- raw: SQL enviado como texto, com o update dinâmico antigo (f-strings) e a
+  cache de statements do asyncpg desativada, pelo que cada pedido faz
+  parse/plan no servidor
+- prepared: statements do registo (`src/database/statements.py`),
+  preparados uma vez por conexão no `init` do pool
+
+Uso:
+    python -m benchmarks.prepared_statements --concurrency 32 --operations 5000
+
+Cria um utilizador de teste (`__bench_prepared__`) com memórias sintéticas e
+remove-o no fim.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Callable, Awaitable, Dict, Any
+
+import asyncpg
+
+from src.config import settings
+from src.database.connection import PreparedConnection, _init_connection
+from src.observability import Histogram
+
+BENCH_USER = "__bench_prepared__"
+CATEGORIES = ["familia", "saude", "hobbies", "interesses", "geral"]
+ZERO_VECTOR = "[" + ",".join(["0"] * 768) + "]"
+
+
+async def create_pool(prepared: bool, size: int) -> asyncpg.Pool:
+    kwargs: Dict[str, Any] = dict(
+        host=settings.postgres_host,
+        port=settings.postgres_port,
+        user=settings.postgres_user,
+        password=settings.postgres_password,
+        database=settings.postgres_db,
+        min_size=size,
+        max_size=size,
+    )
+    if prepared:
+        kwargs.update(connection_class=PreparedConnection, init=_init_connection)
+    else:
+        kwargs.update(statement_cache_size=0)
+    return await asyncpg.create_pool(**kwargs)
+
+
+async def setup(pool: asyncpg.Pool, memories: int) -> list:
+    async with pool.acquire() as conn:
+        await conn.execute("DELETE FROM user_profiles WHERE user_id = $1", BENCH_USER)
+        await conn.execute("INSERT INTO user_profiles (user_id) VALUES ($1)", BENCH_USER)
+        await conn.executemany(
+            """
+            INSERT INTO user_memories
+            (user_id, category, entity_type, entity_name, content, importance, embedding)
+            VALUES ($1, $2, $3, $4, $5, $6, $7::vector)
+            """,
+            [
+                (BENCH_USER, random.choice(CATEGORIES), "facto", f"e{i}", f"memória {i}", 5, ZERO_VECTOR)
+                for i in range(memories)
+            ],
+        )
+        rows = await conn.fetch("SELECT id FROM user_memories WHERE user_id = $1", BENCH_USER)
+    return [row["id"] for row in rows]
+
+
+async def teardown(pool: asyncpg.Pool) -> None:
+    async with pool.acquire() as conn:
+        await conn.execute("DELETE FROM user_profiles WHERE user_id = $1", BENCH_USER)
+
+
+def random_update() -> Dict[str, Any]:
+    """Subconjunto aleatório de campos (como as chamadas reais de update_memory)."""
+    fields: Dict[str, Any] = {}
+    if random.random() < 0.5:
+        fields["content"] = f"atualizado {random.random():.6f}"
+    if random.random() < 0.5:
+        fields["importance"] = random.randint(1, 10)
+    if random.random() < 0.3 or not fields:
+        fields["metadata"] = {"bench": True}
+    return fields
+
+
+async def raw_operation(conn: asyncpg.Connection, memory_ids: list) -> None:
+    """Carga com SQL em texto e update dinâmico (comportamento anterior)."""
+    await conn.fetchrow("SELECT id FROM user_profiles WHERE user_id = $1", BENCH_USER)
+    await conn.fetch(
+        """
+        SELECT category, entity_type, entity_name, content, importance
+        FROM user_memories
+        WHERE user_id = $1 AND is_active = TRUE
+        ORDER BY category, importance DESC
+        """,
+        BENCH_USER,
+    )
+    fields = random_update()
+    updates, params = [], []
+    for column, value in fields.items():
+        params.append(json.dumps(value) if column == "metadata" else value)
+        updates.append(f"{column} = ${len(params)}")
+    if "content" in fields:
+        params.append(ZERO_VECTOR)
+        updates.append(f"embedding = ${len(params)}::vector")
+    params.append(random.choice(memory_ids))
+    await conn.fetchrow(
+        f"UPDATE user_memories SET {', '.join(updates)} WHERE id = ${len(params)} RETURNING id",
+        *params,
+    )
+
+
+async def prepared_operation(conn: PreparedConnection, memory_ids: list) -> None:
+    """A mesma carga com os statements do registo."""
+    await (await conn.prepared("user_exists")).fetchrow(BENCH_USER)
+    await (await conn.prepared("profile_memories")).fetch(BENCH_USER)
+    fields = random_update()
+    await (await conn.prepared("memory_update")).fetchrow(
+        random.choice(memory_ids),
+        fields.get("content"),
+        ZERO_VECTOR if "content" in fields else None,
+        fields.get("importance"),
+        json.dumps(fields["metadata"]) if "metadata" in fields else None,
+    )
+
+
+async def run_mode(
+    name: str,
+    pool: asyncpg.Pool,
+    operation: Callable[..., Awaitable[None]],
+    memory_ids: list,
+    concurrency: int,
+    operations: int,
+) -> Dict[str, Any]:
+    latency = Histogram()
+    remaining = operations
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            async with pool.acquire() as conn:
+                await operation(conn, memory_ids)
+            latency.observe((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": name,
+        "ops_per_s": round(operations / elapsed, 1),
+        "elapsed_s": round(elapsed, 2),
+        "latency_ms": latency.snapshot(),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    raw_pool = await create_pool(prepared=False, size=args.pool_size)
+    memory_ids = await setup(raw_pool, args.memories)
+    prepared_pool = await create_pool(prepared=True, size=args.pool_size)
+    try:
+        # Aquecimento (conexões abertas e, no modo prepared, statements preparados)
+        await run_mode("warmup", raw_pool, raw_operation, memory_ids, args.concurrency, args.concurrency)
+        await run_mode("warmup", prepared_pool, prepared_operation, memory_ids, args.concurrency, args.concurrency)
+
+        for name, pool, operation in (
+            ("raw", raw_pool, raw_operation),
+            ("prepared", prepared_pool, prepared_operation),
+        ):
+            result = await run_mode(name, pool, operation, memory_ids, args.concurrency, args.operations)
+            print(json.dumps(result))
+    finally:
+        await teardown(raw_pool)
+        await raw_pool.close()
+        await prepared_pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--memories", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
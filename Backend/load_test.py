@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""Teste de carga: N clientes WebSocket em simultâneo contra o servidor.
+
+Por omissão arranca um servidor local sem rede nem base de dados (memórias
+em memória, embeddings locais e o Gemini Live falso de
+`src/vertex/fake_live.py` com VAD), num processo à parte para medir o CPU e
+a memória só do servidor. Cada cliente envia PCM 16 kHz ao ritmo real pelo
+protocolo de frames (`?framing=1`): falas com silêncios realistas e
+interrupções (barge-in), sintéticas ou de uma gravação WAV, e recebe o
+áudio de resposta.
+
+Reporta:
+- setup_ms: da abertura da ligação ao `session_created`
+- first_audio_ms: do último frame com voz ao primeiro frame da resposta
+  (inclui os `vad_silence_ms` que o servidor falso espera para responder)
+- jitter_ms: desvio entre o intervalo de chegada de dois frames seguidos de
+  uma resposta e a duração de áudio do primeiro
+- frames_dropped: frames descartados pelo servidor (cliente lento) e
+  frames em falta na sequência recebida
+- cpu_pct_per_session e rss_kb_per_session: CPU e memória do servidor
+
+Uso:
+    python load_test.py --sessions 50 --duration 60
+    python load_test.py --sessions 20 --audio conversa.wav
+    python load_test.py --url ws://host:8765/ws --sessions 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+import wave
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
+
+# As configurações exigem a password mesmo sem base de dados
+os.environ.setdefault("POSTGRES_PASSWORD", "")
+
+import numpy as np
+import structlog
+import websockets
+
+from src.observability import Histogram
+from src.server.framing import (
+    FRAME_FLAG_TURN_START,
+    FRAME_FLAG_VOICE,
+    SEQ_MODULO,
+    FrameHeader,
+    FrameType,
+    unpack_frame,
+)
+from src.vertex.fake_live import is_speech
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * 2 * FRAME_MS // 1000
+OUTPUT_SAMPLE_RATE = 24000
+OUTPUT_BYTES_PER_MS = OUTPUT_SAMPLE_RATE * 2 / 1000
+# Mesmo limiar do VAD do servidor falso
+SPEECH_THRESHOLD = 500
+SILENCE_MS = 600
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 40, 60, 100, 150, 250, 400, 600, 1000, 2500, 5000)
+
+Frames = List[Tuple[bytes, bool]]
+
+
+# ----------------------------------------------------------------------
+# Áudio de entrada
+# ----------------------------------------------------------------------
+
+
+def to_frames(pcm: bytes) -> Frames:
+    """Divide PCM 16 kHz em frames de 20 ms, marcados com voz/silêncio."""
+    usable = len(pcm) - len(pcm) % FRAME_BYTES
+    return [
+        (pcm[i:i + FRAME_BYTES], is_speech(pcm[i:i + FRAME_BYTES], SPEECH_THRESHOLD))
+        for i in range(0, usable, FRAME_BYTES)
+    ]
+
+
+def synth_speech(rng: random.Random, ms: float) -> np.ndarray:
+    """Voz sintética: harmónicos de uma fundamental com ritmo de sílabas."""
+    t = np.arange(int(SAMPLE_RATE * ms / 1000)) / SAMPLE_RATE
+    f0 = rng.uniform(100, 220)
+    voice = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in (1, 2, 3))
+    syllables = 0.35 + 0.65 * np.abs(np.sin(np.pi * rng.uniform(3, 5) * t))
+    return voice * syllables * rng.uniform(3000, 6000)
+
+
+def synth_silence(rng: random.Random, ms: float) -> np.ndarray:
+    """Ruído de fundo abaixo do limiar de voz."""
+    return np.random.default_rng(rng.randrange(2**32)).normal(0, 30, int(SAMPLE_RATE * ms / 1000))
+
+
+def synthetic_conversation(rng: random.Random, duration_s: float, barge_in: float) -> Frames:
+    """
+    Falas de 0,8-3 s seguidas de pausas para a resposta (4-7 s). Com
+    probabilidade `barge_in`, o utilizador volta a falar pouco depois de a
+    resposta começar (interrompendo-a).
+    """
+    parts = [synth_silence(rng, 500)]
+    total_ms = 500.0
+    while total_ms < duration_s * 1000:
+        speech_ms = rng.uniform(800, 3000)
+        if rng.random() < barge_in:
+            pause_ms = SILENCE_MS + rng.uniform(300, 900)
+        else:
+            pause_ms = rng.uniform(4000, 7000)
+        parts += [synth_speech(rng, speech_ms), synth_silence(rng, pause_ms)]
+        total_ms += speech_ms + pause_ms
+    pcm = np.clip(np.concatenate(parts), -32768, 32767).astype("<i2").tobytes()
+    return to_frames(pcm)
+
+
+def recorded_conversation(path: str, rng: random.Random, duration_s: float) -> Frames:
+    """Gravação WAV (16 kHz, mono, 16 bits) em loop, a partir de um ponto aleatório."""
+    with wave.open(path, "rb") as wav:
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+            raise SystemExit(f"{path}: é preciso WAV 16 kHz, mono, 16 bits")
+        frames = to_frames(wav.readframes(wav.getnframes()))
+    if not frames:
+        raise SystemExit(f"{path}: gravação vazia")
+    needed = int(duration_s * 1000 / FRAME_MS)
+    start = rng.randrange(len(frames))
+    return [frames[(start + i) % len(frames)] for i in range(needed)]
+
+
+# ----------------------------------------------------------------------
+# Servidor local (processo à parte)
+# ----------------------------------------------------------------------
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Modo --serve: servidor offline; escreve uma linha JSON ao arrancar e no fim."""
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, args.log_level)),
+        logger_factory=structlog.PrintLoggerFactory(sys.stderr),
+    )
+    from src.agent.empatia_agent import agent
+    from src.observability import tracing
+    from src.server.websocket_server import ws_server
+    from src.vertex import set_client
+    from src.vertex.fake_live import FakeClient, LiveScript
+
+    set_client(
+        FakeClient(
+            LiveScript(
+                echo=False,
+                vad=True,
+                vad_threshold=SPEECH_THRESHOLD,
+                silence_ms=SILENCE_MS,
+                parts_per_turn=args.parts_per_turn,
+                part_ms=args.part_ms,
+                tool_every=args.tool_every,
+            )
+        )
+    )
+    await agent.initialize()
+    await ws_server.start()
+    print(json.dumps({"ready": True}), flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    # Como no main.py: drain com prazo (uma sessão à espera do Live não prende o fim)
+    await ws_server.drain(timeout=4)
+    await agent.shutdown(timeout=5)
+    tracing.shutdown()
+    stats = ws_server.get_stats()
+    print(json.dumps({k: v for k, v in stats.items() if isinstance(v, (int, float))}), flush=True)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_server(args: argparse.Namespace) -> Tuple[asyncio.subprocess.Process, str]:
+    port = free_port()
+    env = dict(os.environ)
+    env.update(
+        MEMORY_BACKEND="memory",
+        EMBEDDING_PROVIDER="local",
+        EMBEDDING_FALLBACK_PROVIDER="",
+        WEBSOCKET_HOST="127.0.0.1",
+        WEBSOCKET_PORT=str(port),
+    )
+    # Sem limite de admissão abaixo da carga pedida (salvo configuração explícita)
+    env.setdefault("MAX_SESSIONS", str(args.sessions))
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__), "--serve",
+        "--parts-per-turn", str(args.parts_per_turn),
+        "--part-ms", str(args.part_ms),
+        "--tool-every", str(args.tool_every),
+        "--log-level", args.log_level,
+        stdout=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    line = await asyncio.wait_for(process.stdout.readline(), timeout=60)
+    if not line:
+        raise SystemExit("O servidor de teste não arrancou")
+    return process, f"ws://127.0.0.1:{port}/ws"
+
+
+async def stop_server(process: asyncio.subprocess.Process) -> Dict[str, Any]:
+    process.send_signal(signal.SIGTERM)
+    try:
+        line = await asyncio.wait_for(process.stdout.readline(), timeout=30)
+        await asyncio.wait_for(process.wait(), timeout=10)
+    except asyncio.TimeoutError:
+        process.kill()
+        return {}
+    return json.loads(line) if line else {}
+
+
+class ProcessSampler:
+    """CPU e memória de um processo a partir de /proc (Linux)."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.peak_rss = 0
+
+    def cpu_s(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime e stime (campos 14 e 15 do stat)
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def rss(self) -> Optional[int]:
+        try:
+            with open(f"/proc/{self.pid}/statm") as f:
+                value = int(f.read().split()[1]) * self.page_size
+        except OSError:
+            return None
+        self.peak_rss = max(self.peak_rss, value)
+        return value
+
+    async def sample(self, interval_s: float = 1.0) -> None:
+        while True:
+            self.rss()
+            await asyncio.sleep(interval_s)
+
+
+# ----------------------------------------------------------------------
+# Clientes
+# ----------------------------------------------------------------------
+
+
+class Metrics:
+    def __init__(self):
+        self.setup_ms = Histogram(BUCKETS_MS)
+        self.first_audio_ms = Histogram(BUCKETS_MS)
+        self.jitter_ms = Histogram(BUCKETS_MS)
+        self.connected = 0
+        self.frames_sent = 0
+        self.frames_late = 0
+        self.frames_received = 0
+        self.frames_missing = 0
+        self.bytes_received = 0
+        self.responses = 0
+        self.errors: Counter = Counter()
+
+
+def now_us() -> int:
+    return time.perf_counter_ns() // 1000
+
+
+async def receive(ws: Any, metrics: Metrics, audio: Optional[bytearray]) -> None:
+    expected_seq = 0
+    last: Optional[Tuple[float, int, float]] = None
+    async for message in ws:
+        if isinstance(message, str):
+            continue
+        arrival = time.perf_counter()
+        header, payload = unpack_frame(message)
+        metrics.frames_received += 1
+        metrics.bytes_received += len(payload)
+        if audio is not None:
+            audio.extend(payload)
+        metrics.frames_missing += (header.seq - expected_seq) % SEQ_MODULO
+        expected_seq = (header.seq + 1) % SEQ_MODULO
+
+        if header.flags & FRAME_FLAG_TURN_START:
+            metrics.responses += 1
+            if header.timestamp_us > 0:
+                # Relógio do cliente nas duas pontas
+                metrics.first_audio_ms.observe(arrival * 1000 - header.timestamp_us / 1000)
+                await ws.send(json.dumps({
+                    "type": "playback_started",
+                    "reply_to_us": header.timestamp_us,
+                    "timestamp_us": int(arrival * 1_000_000),
+                }))
+        elif last is not None and last[1] == header.turn_id:
+            metrics.jitter_ms.observe(abs((arrival - last[0]) * 1000 - last[2]))
+        last = (arrival, header.turn_id, len(payload) / OUTPUT_BYTES_PER_MS)
+
+
+async def send(ws: Any, frames: Frames, metrics: Metrics) -> None:
+    """Envia os frames ao ritmo real (agenda absoluta, sem deriva)."""
+    started = time.perf_counter()
+    for seq, (pcm, voice) in enumerate(frames):
+        delay = started + seq * FRAME_MS / 1000 - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif delay < -FRAME_MS / 1000:
+            metrics.frames_late += 1
+        header = FrameHeader(
+            type=FrameType.AUDIO,
+            seq=seq,
+            timestamp_us=now_us(),
+            turn_id=0,
+            flags=FRAME_FLAG_VOICE if voice else 0,
+        )
+        await ws.send(header.pack() + pcm)
+        metrics.frames_sent += 1
+
+
+async def client(
+    url: str, index: int, frames: Frames, args: argparse.Namespace, metrics: Metrics
+) -> None:
+    await asyncio.sleep(args.ramp_s * index / max(1, args.sessions))
+    audio = bytearray() if args.save_audio else None
+    started = time.perf_counter()
+    try:
+        async with websockets.connect(
+            f"{url}?user_id=load-{index}&framing=1",
+            max_size=None,
+            open_timeout=args.connect_timeout,
+        ) as ws:
+            # Pode chegar "queued" (admissão) antes do session_created
+            deadline = started + args.connect_timeout
+            while True:
+                message = await asyncio.wait_for(ws.recv(), timeout=max(0.1, deadline - time.perf_counter()))
+                if isinstance(message, str) and json.loads(message).get("type") == "session_created":
+                    break
+            metrics.setup_ms.observe((time.perf_counter() - started) * 1000)
+            metrics.connected += 1
+
+            receiver = asyncio.create_task(receive(ws, metrics, audio))
+            try:
+                await send(ws, frames, metrics)
+                # Ouvir o fim da última resposta antes de terminar
+                await asyncio.sleep(args.tail_s)
+                await ws.send(json.dumps({"type": "end_session"}))
+            finally:
+                receiver.cancel()
+                await asyncio.gather(receiver, return_exceptions=True)
+    except Exception as e:
+        metrics.errors[type(e).__name__] += 1
+    finally:
+        if audio:
+            with wave.open(os.path.join(args.save_audio, f"session-{index}.wav"), "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(OUTPUT_SAMPLE_RATE)
+                wav.writeframes(bytes(audio))
+
+
+async def main(args: argparse.Namespace) -> int:
+    if args.serve:
+        await serve(args)
+        return 0
+
+    if args.save_audio:
+        os.makedirs(args.save_audio, exist_ok=True)
+    conversations = []
+    for index in range(args.sessions):
+        rng = random.Random(args.seed + index)
+        if args.audio:
+            conversations.append(recorded_conversation(args.audio, rng, args.duration))
+        else:
+            conversations.append(synthetic_conversation(rng, args.duration, args.barge_in))
+
+    process, url = (None, args.url) if args.url else await start_server(args)
+    sampler = ProcessSampler(process.pid) if process else None
+    sampler_task = asyncio.create_task(sampler.sample()) if sampler else None
+    rss_before = sampler.rss() if sampler else None
+    cpu_before = sampler.cpu_s() if sampler else None
+
+    print(f"🚀 {args.sessions} sessões contra {url} ({args.duration:.0f}s de áudio cada)", file=sys.stderr)
+    metrics = Metrics()
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(client(url, index, frames, args, metrics) for index, frames in enumerate(conversations))
+    )
+    elapsed = time.perf_counter() - started
+
+    report: Dict[str, Any] = {
+        "sessions": args.sessions,
+        "connected": metrics.connected,
+        "errors": dict(metrics.errors),
+        "elapsed_s": round(elapsed, 1),
+        "setup_ms": metrics.setup_ms.snapshot(),
+        "first_audio_ms": metrics.first_audio_ms.snapshot(),
+        "vad_silence_ms": SILENCE_MS,
+        "jitter_ms": metrics.jitter_ms.snapshot(),
+        "responses": metrics.responses,
+        "frames_sent": metrics.frames_sent,
+        "frames_sent_late": metrics.frames_late,
+        "frames_received": metrics.frames_received,
+        "frames_missing": metrics.frames_missing,
+        "bytes_received": metrics.bytes_received,
+    }
+
+    if process:
+        cpu_after = sampler.cpu_s()
+        sampler_task.cancel()
+        server = await stop_server(process)
+        report["frames_dropped"] = server.get("audio_frames_dropped", 0) + metrics.frames_missing
+        sessions = max(1, metrics.connected)
+        if cpu_before is not None and cpu_after is not None:
+            report["server_cpu_pct"] = round((cpu_after - cpu_before) / elapsed * 100, 1)
+            report["cpu_pct_per_session"] = round(report["server_cpu_pct"] / sessions, 2)
+        if rss_before is not None:
+            report["server_rss_mb"] = round(sampler.peak_rss / 2**20, 1)
+            report["rss_kb_per_session"] = round((sampler.peak_rss - rss_before) / 1024 / sessions, 1)
+
+    print(json.dumps(report, indent=2))
+    return 0 if metrics.connected == args.sessions and not metrics.errors else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos de áudio por sessão")
+    parser.add_argument("--audio", help="gravação WAV 16 kHz mono (por omissão, voz sintética)")
+    parser.add_argument("--barge-in", type=float, default=0.2, help="fração de falas que interrompem a resposta")
+    parser.add_argument("--ramp-s", type=float, default=5.0, help="intervalo para abrir todas as ligações")
+    parser.add_argument("--tail-s", type=float, default=3.0)
+    parser.add_argument("--connect-timeout", type=float, default=30.0)
+    parser.add_argument("--url", help="servidor já a correr (sem medição de CPU/memória)")
+    parser.add_argument("--save-audio", help="pasta para gravar o áudio recebido por sessão")
+    parser.add_argument("--seed", type=int, default=42)
+    # Servidor falso
+    parser.add_argument("--parts-per-turn", type=int, default=75)
+    parser.add_argument("--part-ms", type=float, default=40.0)
+    parser.add_argument("--tool-every", type=int, default=3)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    sys.exit(asyncio.run(main(parser.parse_args())))
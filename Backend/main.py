@@ -3,17 +3,27 @@ EmpatIA Backend - Agente de voz empático para idosos
 Baseado no Google Gen AI Agent Development Kit (ADK)
 """
 
+import argparse
 import asyncio
 import logging
+import multiprocessing
+import os
+import queue
 import signal
 import sys
+import time
+from typing import Optional
 
 import structlog
 from structlog.stdlib import LoggerFactory
 
 from src.agent.empatia_agent import agent
 from src.server.websocket_server import ws_server
+from src.server.supervisor import WorkerSupervisor
 from src.config import settings
+from src.database import DatabaseConnection
+from src.observability import tracing
+from src.vertex import api_stats
 
 # Configurar logging estruturado com flush automático
 structlog.configure(
@@ -40,8 +50,15 @@ logger = structlog.get_logger(__name__)
 class EmpatIABackend:
     """Aplicação principal do backend EmpatIA."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        worker_index: Optional[int] = None,
+        metrics_queue: Optional[multiprocessing.Queue] = None,
+    ):
         self.shutdown_event = asyncio.Event()
+        # Definidos apenas em modo multi-processo (worker de um supervisor)
+        self.worker_index = worker_index
+        self.metrics_queue = metrics_queue
 
     def setup_signal_handlers(self):
         """Configura handlers para sinais de sistema (SIGINT, SIGTERM)."""
@@ -67,6 +84,7 @@ class EmpatIABackend:
         logger.info(f"  - Voz: {settings.gemini_voice}")
         logger.info(f"  - Idioma: {settings.gemini_language}")
 
+        started = time.perf_counter()
         try:
             # Inicializar agente
             logger.info("A inicializar agente EmpatIA...")
@@ -78,10 +96,13 @@ class EmpatIABackend:
 
             # Iniciar servidor WebSocket
             logger.info("A iniciar servidor WebSocket...")
-            await ws_server.start()
+            await ws_server.start(reuse_port=self.worker_index is not None)
 
             logger.info("=" * 60)
-            logger.info("✅ EmpatIA Backend PRONTO")
+            logger.info(
+                "✅ EmpatIA Backend PRONTO",
+                startup_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
             logger.info(f"WebSocket disponível em: ws://{settings.websocket_host}:{settings.websocket_port}")
             logger.info("=" * 60)
 
@@ -93,29 +114,58 @@ class EmpatIABackend:
         """Encerra todos os componentes graciosamente."""
         logger.info("A encerrar EmpatIA Backend...")
 
+        deadline = time.monotonic() + settings.shutdown_timeout_s
         try:
-            # Parar servidor WebSocket
-            await ws_server.stop()
+            # Drain: parar de aceitar, avisar os clientes e fechar as conexões
+            # (no máximo um quarto do prazo; o resto é para gravar as sessões)
+            await ws_server.drain(timeout=settings.shutdown_timeout_s / 4)
 
-            # Encerrar agente
-            await agent.shutdown()
+            # Encerrar agente (gravação paralela das sessões)
+            await agent.shutdown(timeout=max(1.0, deadline - time.monotonic()))
+            tracing.shutdown()
 
             logger.info("EmpatIA Backend encerrado com sucesso")
 
         except Exception as e:
             logger.error(f"Erro durante encerramento: {e}")
 
+    async def report_metrics(self):
+        """Regista as métricas do pool e publica as do worker para o supervisor."""
+        while not self.shutdown_event.is_set():
+            try:
+                await asyncio.wait_for(
+                    self.shutdown_event.wait(), timeout=settings.metrics_interval_s
+                )
+            except asyncio.TimeoutError:
+                pass
+            logger.info("Métricas do pool PostgreSQL", **DatabaseConnection.stats())
+            vertex = api_stats()
+            if vertex:
+                logger.info("Métricas do limitador Vertex", **vertex)
+            if self.metrics_queue is None:
+                continue
+            try:
+                self.metrics_queue.put_nowait(
+                    {"worker": self.worker_index, "pid": os.getpid(), **ws_server.get_stats()}
+                )
+            except queue.Full:
+                logger.warning("Queue de métricas cheia, snapshot descartado")
+
     async def run(self):
         """Loop principal da aplicação."""
         self.setup_signal_handlers()
 
         await self.startup()
 
+        metrics_task = asyncio.create_task(self.report_metrics())
+
         # Aguardar sinal de shutdown
         await self.shutdown_event.wait()
 
         await self.shutdown()
 
+        await metrics_task
+
 
 async def main():
     """Ponto de entrada principal."""
@@ -123,9 +173,35 @@ async def main():
     await backend.run()
 
 
+def run_worker(worker_index: int, metrics_queue: multiprocessing.Queue):
+    """Ponto de entrada de um processo worker (modo multi-processo)."""
+    structlog.contextvars.bind_contextvars(worker=worker_index)
+    backend = EmpatIABackend(worker_index=worker_index, metrics_queue=metrics_queue)
+    try:
+        asyncio.run(backend.run())
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_args():
+    """Argumentos de linha de comandos."""
+    parser = argparse.ArgumentParser(description="EmpatIA Backend")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.workers,
+        help="Número de processos worker (SO_REUSEPORT); 1 = processo único",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        asyncio.run(main())
+        if args.workers > 1:
+            WorkerSupervisor(run_worker, args.workers).run()
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Encerramento forçado pelo utilizador")
     except Exception as e:
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Replay de gravações de sessões (`RECORDING_ENABLED`, `src/server/recorder.py`).
+
+Subcomandos:
+- info: metadados e resumo de uma gravação (duração do áudio, eventos,
+  latência de resposta)
+- export: escreve `in.wav` (16 kHz), `out.wav` (24 kHz, alinhado no tempo com
+  a entrada) e `events.jsonl` para ouvir o que aconteceu
+- run: volta a passar o áudio de entrada gravado, ao ritmo original, por
+  `EmpatIAAgent.stream_conversation`. Por omissão contra o Gemini Live falso
+  com VAD (sem rede nem base de dados), para profiling (`--profile`) e
+  testes de regressão (`--check` compara os eventos com os gravados);
+  com `--vertex` contra o Gemini Live real (requer credenciais)
+
+A latência de resposta é o tempo entre o último chunk de entrada com voz e o
+primeiro áudio da resposta seguinte (inclui o silêncio que o VAD espera).
+
+Uso:
+    python replay_recording.py info recordings/2026-10-19/<sessão>
+    python replay_recording.py export recordings/2026-10-19/<sessão> --out /tmp/sessao
+    python replay_recording.py run recordings/2026-10-19/<sessão> --sessions 20 --profile /tmp/replay.prof
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import time
+import wave
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+# Sem base de dados (e sem Vertex, exceto com --vertex) antes de carregar as configurações
+os.environ["MEMORY_BACKEND"] = "memory"
+if "--vertex" not in sys.argv:
+    os.environ["EMBEDDING_PROVIDER"] = "local"
+    os.environ["EMBEDDING_FALLBACK_PROVIDER"] = ""
+os.environ.setdefault("POSTGRES_PASSWORD", "")
+
+import structlog
+
+from src.observability import Histogram
+from src.server.recorder import (
+    Record,
+    RecordKind,
+    SessionRecorder,
+    read_recording,
+    recording_info,
+)
+from src.vertex.fake_live import is_speech
+
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+# Mesmo limiar do VAD do servidor falso
+SPEECH_THRESHOLD = 500
+# Eventos comparados por --check
+CHECKED_EVENTS = ("turn_complete", "interrupted", "tool_call")
+BUCKETS_MS = (10, 20, 40, 60, 100, 150, 250, 400, 600, 800, 1000, 1500, 2500, 5000)
+
+
+def summarize(records: List[Record]) -> Dict[str, Any]:
+    """Resumo de uma gravação: áudio, eventos e latências de resposta."""
+    audio_in = audio_out = 0
+    events: Counter = Counter()
+    latencies: List[float] = []
+    last_voice_us: Optional[int] = None
+    awaiting = True
+    for record in records:
+        if record.kind == RecordKind.AUDIO_IN:
+            audio_in += len(record.payload)
+            if is_speech(record.payload, SPEECH_THRESHOLD):
+                last_voice_us = record.t_us
+        elif record.kind == RecordKind.AUDIO_OUT:
+            audio_out += len(record.payload)
+            if awaiting and last_voice_us is not None:
+                latencies.append((record.t_us - last_voice_us) / 1000)
+            awaiting = False
+        elif record.kind == RecordKind.EVENT:
+            name = record.event()["event"]
+            events[name] += 1
+            if name in ("turn_complete", "interrupted"):
+                awaiting = True
+    return {
+        "duration_s": round(records[-1].t_us / 1e6, 2) if records else 0.0,
+        "audio_in_s": round(audio_in / (INPUT_SAMPLE_RATE * 2), 2),
+        "audio_out_s": round(audio_out / (OUTPUT_SAMPLE_RATE * 2), 2),
+        "events": dict(events),
+        "response_ms": [round(ms, 1) for ms in latencies],
+    }
+
+
+def timeline(records: List[Record], kind: RecordKind, sample_rate: int) -> bytes:
+    """PCM com cada chunk na sua posição no tempo (silêncio entre chunks)."""
+    out = bytearray()
+    for record in records:
+        if record.kind != kind:
+            continue
+        position = int(record.t_us * sample_rate / 1e6) * 2
+        if position > len(out):
+            out.extend(bytes(position - len(out)))
+        out.extend(record.payload)
+    return bytes(out)
+
+
+def write_wav(path: Path, pcm: bytes, sample_rate: int) -> None:
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+
+
+def cmd_info(args: argparse.Namespace) -> int:
+    records = list(read_recording(args.recording))
+    print(json.dumps({**recording_info(args.recording), **summarize(records)}, indent=2))
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    records = list(read_recording(args.recording))
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    write_wav(out / "in.wav", timeline(records, RecordKind.AUDIO_IN, INPUT_SAMPLE_RATE), INPUT_SAMPLE_RATE)
+    write_wav(out / "out.wav", timeline(records, RecordKind.AUDIO_OUT, OUTPUT_SAMPLE_RATE), OUTPUT_SAMPLE_RATE)
+    with open(out / "events.jsonl", "w") as f:
+        for record in records:
+            if record.kind == RecordKind.EVENT:
+                f.write(json.dumps({"t_ms": round(record.t_us / 1000, 1), **record.event()}) + "\n")
+    print(f"✅ Exportado para {out}")
+    return 0
+
+
+async def replay(
+    agent: Any,
+    inputs: List[Record],
+    tag: int,
+    args: argparse.Namespace,
+    directory: Path,
+) -> Dict[str, Any]:
+    """Uma conversa com o áudio gravado; a resposta é gravada para comparação."""
+    recorder = SessionRecorder(directory / f"replay-{tag}", f"replay-{tag}", max_segments=10**6)
+    session = await agent.create_session(f"replay-{tag}")
+    finished = asyncio.Event()
+
+    async def audio():
+        started = time.perf_counter()
+        base_us = inputs[0].t_us if inputs else 0
+        for record in inputs:
+            delay = (record.t_us - base_us) / 1e6 / args.speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            recorder.audio_in(record.payload)
+            yield record.payload
+        # Deixar chegar a resposta ao último turno
+        await asyncio.sleep(args.tail_s)
+        finished.set()
+
+    async def consume():
+        async for data in agent.stream_conversation(session, audio(), on_event=recorder.event):
+            recorder.audio_out(data)
+
+    # receive() só termina num fim de turno: parar quando o áudio acabar
+    task = asyncio.create_task(consume())
+    waiter = asyncio.create_task(finished.wait())
+    await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    for pending in (task, waiter):
+        pending.cancel()
+    error = None
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    await agent.end_session(session.session_id)
+    await recorder.aclose()
+    return {**summarize(list(read_recording(recorder.directory))), "error": error}
+
+
+async def run(args: argparse.Namespace) -> int:
+    from src.agent.empatia_agent import EmpatIAAgent
+    from src.vertex import set_client
+    from src.vertex.fake_live import FakeClient, LiveScript
+
+    records = list(read_recording(args.recording))
+    inputs = [record for record in records if record.kind == RecordKind.AUDIO_IN]
+    if not inputs:
+        print("❌ A gravação não tem áudio de entrada")
+        return 1
+
+    if not args.vertex:
+        set_client(
+            FakeClient(
+                LiveScript(
+                    echo=False,
+                    vad=True,
+                    vad_threshold=SPEECH_THRESHOLD,
+                    silence_ms=args.silence_ms,
+                    parts_per_turn=args.parts_per_turn,
+                    part_ms=args.part_ms,
+                    tool_every=args.tool_every,
+                )
+            )
+        )
+    agent = EmpatIAAgent()
+    await agent.initialize()
+    directory = Path(args.out or tempfile.mkdtemp(prefix="replay-"))
+    started = time.perf_counter()
+    try:
+        replays = await asyncio.gather(
+            *(replay(agent, inputs, tag, args, directory) for tag in range(args.sessions))
+        )
+    finally:
+        elapsed = time.perf_counter() - started
+        await agent.shutdown(timeout=5)
+        set_client(None)
+
+    recorded = summarize(records)
+    response_ms = Histogram(BUCKETS_MS)
+    mismatches = 0
+    expected = {name: recorded["events"].get(name, 0) for name in CHECKED_EVENTS}
+    for result in replays:
+        for ms in result["response_ms"]:
+            response_ms.observe(ms)
+        if {name: result["events"].get(name, 0) for name in CHECKED_EVENTS} != expected:
+            mismatches += 1
+
+    print(json.dumps({
+        "sessions": args.sessions,
+        "elapsed_s": round(elapsed, 2),
+        "errors": sum(1 for result in replays if result["error"]),
+        "recorded": {k: v for k, v in recorded.items() if k != "response_ms"},
+        "replayed": {k: v for k, v in replays[0].items() if k != "response_ms"},
+        "recorded_response_ms": recorded["response_ms"],
+        "replayed_response_ms": response_ms.snapshot(),
+        "event_mismatches": mismatches,
+        "replay_dir": str(directory),
+    }))
+    if args.check and mismatches:
+        print(f"❌ {mismatches} replays com eventos diferentes da gravação: {expected}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log-level", default="WARNING")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info = commands.add_parser("info", help="resumo de uma gravação")
+    info.add_argument("recording", type=Path)
+
+    export = commands.add_parser("export", help="exportar WAV e eventos")
+    export.add_argument("recording", type=Path)
+    export.add_argument("--out", required=True)
+
+    run_parser = commands.add_parser("run", help="voltar a passar a gravação pelo agente")
+    run_parser.add_argument("recording", type=Path)
+    run_parser.add_argument("--sessions", type=int, default=1, help="replays em simultâneo")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="1 = ritmo original")
+    run_parser.add_argument("--tail-s", type=float, default=3.0)
+    run_parser.add_argument("--out", help="diretoria das gravações do replay (omissão: temporária)")
+    run_parser.add_argument("--profile", help="escrever o perfil cProfile neste ficheiro")
+    run_parser.add_argument("--check", action="store_true", help="falhar se os eventos diferirem")
+    run_parser.add_argument("--vertex", action="store_true", help="Gemini Live real em vez do falso")
+    run_parser.add_argument("--silence-ms", type=float, default=600.0)
+    run_parser.add_argument("--parts-per-turn", type=int, default=75)
+    run_parser.add_argument("--part-ms", type=float, default=40.0)
+    run_parser.add_argument("--tool-every", type=int, default=3)
+    args = parser.parse_args()
+
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, args.log_level)),
+        logger_factory=structlog.PrintLoggerFactory(sys.stderr),
+    )
+    if args.command == "info":
+        return cmd_info(args)
+    if args.command == "export":
+        return cmd_export(args)
+
+    if not args.profile:
+        return asyncio.run(run(args))
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return asyncio.run(run(args))
+    finally:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
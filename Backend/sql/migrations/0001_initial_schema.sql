@@ -58,6 +58,36 @@ CREATE INDEX IF NOT EXISTS idx_conversation_episodes_user_id ON conversation_epi
 CREATE INDEX IF NOT EXISTS idx_conversation_episodes_session_id ON conversation_episodes(session_id);
 CREATE INDEX IF NOT EXISTS idx_conversation_episodes_ended_at ON conversation_episodes(ended_at DESC);
 
+-- Transcrição das conversas, gravada em lotes durante a sessão
+CREATE TABLE IF NOT EXISTS conversation_transcripts (
+    id BIGSERIAL PRIMARY KEY,
+    session_id VARCHAR(255) NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    seq INTEGER NOT NULL,
+    speaker VARCHAR(20) NOT NULL,
+    text TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (session_id, seq)
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_transcripts_user_id ON conversation_transcripts(user_id);
+
+-- Fila de sessões terminadas à espera de resumo/embedding (pipeline de episódios)
+CREATE TABLE IF NOT EXISTS session_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    session_id VARCHAR(255) UNIQUE NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    available_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    locked_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_session_jobs_pending ON session_jobs(status, available_at);
+
 -- Trigger para atualizar updated_at
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
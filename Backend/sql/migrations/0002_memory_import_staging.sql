@@ -0,0 +1,16 @@
+-- Tabela de staging para importação em massa de memórias (COPY + merge).
+-- UNLOGGED: os dados são transitórios (cada lote é apagado na mesma transação).
+CREATE UNLOGGED TABLE IF NOT EXISTS memory_import_staging (
+    batch_id UUID NOT NULL,
+    ord INTEGER NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    entity_type VARCHAR(100) NOT NULL,
+    entity_name VARCHAR(255),
+    content TEXT NOT NULL,
+    importance INTEGER NOT NULL,
+    metadata JSONB NOT NULL,
+    embedding TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_memory_import_staging_batch ON memory_import_staging(batch_id);
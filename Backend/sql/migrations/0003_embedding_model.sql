@@ -0,0 +1,21 @@
+-- Modelo que gerou cada embedding, para re-embedding ao trocar de modelo.
+-- As linhas existentes foram todas geradas com text-embedding-004.
+ALTER TABLE user_memories ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(100);
+ALTER TABLE conversation_episodes ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(100);
+
+UPDATE user_memories SET embedding_model = 'text-embedding-004'
+WHERE embedding_model IS NULL AND embedding IS NOT NULL;
+UPDATE conversation_episodes SET embedding_model = 'text-embedding-004'
+WHERE embedding_model IS NULL AND embedding IS NOT NULL;
+
+-- Progresso do re-embedding (keyset por id), por tabela e modelo de destino
+CREATE TABLE IF NOT EXISTS reembed_checkpoints (
+    table_name VARCHAR(100) NOT NULL,
+    target_model VARCHAR(100) NOT NULL,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    rows_done BIGINT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (table_name, target_model)
+);
@@ -0,0 +1,17 @@
+-- Embeddings em falta ficam NULL (pendentes) em vez de um vetor de zeros,
+-- que tem distância de cosseno indefinida e poluía a pesquisa.
+
+-- Quarentena dos vetores de zeros já gravados: passam a pendentes
+UPDATE user_memories SET embedding = NULL, embedding_model = NULL
+WHERE embedding IS NOT NULL AND vector_norm(embedding) = 0;
+UPDATE conversation_episodes SET embedding = NULL, embedding_model = NULL
+WHERE embedding IS NOT NULL AND vector_norm(embedding) = 0;
+
+-- Contagem barata do backlog de pendentes
+CREATE INDEX IF NOT EXISTS idx_user_memories_embedding_pending
+    ON user_memories(id) WHERE embedding_model IS NULL;
+CREATE INDEX IF NOT EXISTS idx_conversation_episodes_embedding_pending
+    ON conversation_episodes(id) WHERE embedding_model IS NULL;
+
+-- A importação em massa também pode ter embeddings pendentes
+ALTER TABLE memory_import_staging ALTER COLUMN embedding DROP NOT NULL;
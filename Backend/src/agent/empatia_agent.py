@@ -1,9 +1,10 @@
 """EmpatIA Agent - Agente de voz empático baseado no Google ADK."""
 
 import asyncio
-import os
+import time
+from contextlib import asynccontextmanager, AsyncExitStack
 from datetime import datetime
-from typing import Optional, Dict, Any, AsyncIterator
+from typing import Optional, Dict, Any, AsyncIterator, Callable
 import uuid
 
 import structlog
@@ -11,8 +12,13 @@ from google import genai
 from google.genai import types
 
 from src.config import settings
-from src.database import MemoryStore, DatabaseConnection
-from src.agent.system_prompt import get_system_prompt
+from src.database import MemoryStore, DatabaseConnection, ReEmbedder
+from src.observability import tracing
+from src.vertex import get_client, live_connect, priority, Priority
+from src.agent.live_pool import LiveConnectionPool
+from src.agent.episode_pipeline import EpisodePipeline
+from src.agent.transcript import SessionTranscript
+from src.agent.system_prompt import get_system_prompt, get_session_context_message
 from src.tools import (
     manage_memory_tool,
     ManageMemoryInput,
@@ -32,49 +38,37 @@ class EmpatIASession:
         self.user_id = user_id
         self.session_id = session_id or str(uuid.uuid4())
         self.started_at = datetime.now()
-        self.conversation_turns = []
+        self.transcript = SessionTranscript(self.session_id, user_id)
         self.key_topics = set()
         self.memory_store = MemoryStore()
 
+        # Estado preservado entre reconexões
+        self.context: Optional[Dict[str, Any]] = None
+        self.resumption_handle: Optional[str] = None
+        self.parked_at: Optional[float] = None
+        self._expiry_task: Optional[asyncio.Task] = None
+
     async def get_context(self) -> Dict[str, Any]:
         """Obtém o contexto completo do utilizador para injetar no system prompt."""
-        profile = await self.memory_store.get_user_profile(self.user_id)
-        recent_episodes = await self.memory_store.get_recent_episodes(
-            self.user_id, limit=3
-        )
+        if self.context is not None:
+            # Reconexão: reutilizar o contexto já carregado nesta sessão
+            return self.context
+
+        with DatabaseConnection.operation("session_start"):
+            profile = await self.memory_store.get_user_profile(self.user_id)
+            recent_episodes = await self.memory_store.get_recent_episodes(
+                self.user_id, limit=3
+            )
 
-        return {
+        self.context = {
             "profile": profile,
             "recent_episodes": recent_episodes,
         }
+        return self.context
 
     def add_turn(self, speaker: str, text: str):
-        """Adiciona um turno de conversa."""
-        self.conversation_turns.append(
-            {"speaker": speaker, "text": text, "timestamp": datetime.now()}
-        )
-
-    async def save_episode(self, summary: str, emotional_tone: str):
-        """Guarda o episódio de conversa na base de dados."""
-        duration = (datetime.now() - self.started_at).seconds // 60
-
-        await self.memory_store.save_episode(
-            user_id=self.user_id,
-            session_id=self.session_id,
-            summary=summary,
-            key_topics=list(self.key_topics),
-            emotional_tone=emotional_tone,
-            started_at=self.started_at,
-            duration_minutes=duration,
-        )
-
-        logger.info(
-            "Episódio guardado",
-            user_id=self.user_id,
-            session_id=self.session_id,
-            duration=duration,
-        )
-
+        """Adiciona um fragmento de transcrição ao turno em curso."""
+        self.transcript.add(speaker, text)
 
 class EmpatIAAgent:
     """Agente EmpatIA com suporte a streaming de áudio bidireccional."""
@@ -83,23 +77,40 @@ class EmpatIAAgent:
         self.client: Optional[genai.Client] = None
         self.active_sessions: Dict[str, EmpatIASession] = {}
         self.memory_store = MemoryStore()
+        self.live_pool: Optional[LiveConnectionPool] = None
+        self.episodes = EpisodePipeline(self.memory_store)
+        self.reembedder = ReEmbedder(self.memory_store)
 
     async def initialize(self):
         """Inicializa o agente e a conexão com a base de dados."""
-        await DatabaseConnection.get_pool()
-        # Inicializar schema (seguro para múltiplas execuções - usa IF NOT EXISTS)
-        await DatabaseConnection.init_schema()
-        logger.info("✅ Schema verificado/inicializado")
+        durable = settings.memory_backend == "postgres"
+        if durable:
+            await DatabaseConnection.get_pool()
+            if settings.db_auto_migrate:
+                # Só aplica migrações pendentes (sem DDL se o schema estiver atualizado)
+                report = await DatabaseConnection.migrate()
+                logger.info("✅ Schema verificado", **report)
+            await DatabaseConnection.start_replicas()
+        else:
+            logger.warning(
+                "Modo de nó único: memórias em memória, perdidas ao reiniciar",
+                memory_backend=settings.memory_backend,
+            )
 
-        # Configurar autenticação Vertex AI
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
+        # Cliente Vertex AI partilhado (embeddings, pesquisa e Live usam o mesmo)
+        self.client = get_client()
 
-        # Inicializar cliente com Vertex AI
-        self.client = genai.Client(
-            vertexai=True,
-            project=settings.google_cloud_project,
-            location=settings.google_cloud_region,
-        )
+        # Resumo e persistência dos episódios em background
+        await self.episodes.start(self.client)
+
+        # Re-embedding em background das linhas de outro modelo de embeddings
+        if durable:
+            self.reembedder.start()
+
+        # Pool opcional de conexões Live pré-estabelecidas
+        if settings.live_pool_size > 0:
+            self.live_pool = LiveConnectionPool(self._connect_generic_live)
+            await self.live_pool.start()
 
         logger.info(
             "Agente EmpatIA inicializado",
@@ -107,10 +118,142 @@ class EmpatIAAgent:
             region=settings.google_cloud_region,
         )
 
+    def _build_live_config(
+        self, system_prompt: str, resumption_handle: Optional[str] = None
+    ) -> types.LiveConnectConfig:
+        """Configuração Live: voz, generation config, tools e system prompt."""
+        return types.LiveConnectConfig(
+            response_modalities=["AUDIO"],
+            # Pedir handles de retoma (e retomar, se houver um da ligação anterior)
+            session_resumption=types.SessionResumptionConfig(handle=resumption_handle),
+            # Transcrição do áudio do utilizador e do modelo
+            input_audio_transcription=types.AudioTranscriptionConfig(),
+            output_audio_transcription=types.AudioTranscriptionConfig(),
+            system_instruction=types.Content(
+                parts=[types.Part(text=system_prompt)]
+            ),
+            generation_config=types.GenerationConfig(
+                temperature=settings.gemini_temperature,
+            ),
+            speech_config=types.SpeechConfig(
+                voice_config=types.VoiceConfig(
+                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                        voice_name=settings.gemini_voice
+                    )
+                )
+            ),
+            tools=[
+                types.Tool(function_declarations=[
+                    types.FunctionDeclaration(
+                        name=MANAGE_MEMORY_TOOL_DEFINITION["name"],
+                        description=MANAGE_MEMORY_TOOL_DEFINITION["description"],
+                        parameters=MANAGE_MEMORY_TOOL_DEFINITION["parameters"],
+                    ),
+                    types.FunctionDeclaration(
+                        name=GOOGLE_SEARCH_TOOL_DEFINITION["name"],
+                        description=GOOGLE_SEARCH_TOOL_DEFINITION["description"],
+                        parameters=GOOGLE_SEARCH_TOOL_DEFINITION["parameters"],
+                    ),
+                ])
+            ],
+        )
+
+    def _connect_generic_live(self):
+        """Abre uma conexão Live sem perfil de utilizador (para o pool).
+
+        As reposições do pool não têm um utilizador à espera: prioridade
+        BACKGROUND, para não gastarem tokens dos handshakes interativos.
+        """
+        config = self._build_live_config(get_system_prompt(deferred_context=True))
+        return live_connect(
+            self.client, Priority.BACKGROUND, model=settings.gemini_model, config=config
+        )
+
+    @asynccontextmanager
+    async def _open_live_session(self, session: EmpatIASession, context: Dict[str, Any]):
+        """
+        Obtém uma sessão Live para a conversa: do pool (com o contexto do
+        utilizador enviado como primeira mensagem) ou por handshake novo.
+        """
+        started = time.perf_counter()
+        # Uma retoma precisa do handle no setup: não pode usar o pool
+        use_pool = self.live_pool is not None and not session.resumption_handle
+        slot = await self.live_pool.acquire() if use_pool else None
+
+        if slot is not None:
+            try:
+                await slot.session.send_client_content(
+                    turns=types.Content(
+                        role="user",
+                        parts=[types.Part(text=get_session_context_message(
+                            user_profile=context["profile"],
+                            recent_episodes=context["recent_episodes"],
+                        ))],
+                    ),
+                    turn_complete=False,
+                )
+            except Exception as e:
+                logger.warning("Conexão do pool inválida, a abrir nova", error=str(e))
+                await self.live_pool.discard(slot)
+                slot = None
+
+        if slot is not None:
+            logger.info(
+                "Conexão Live obtida do pool",
+                session_id=session.session_id,
+                connect_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+            try:
+                yield slot.session
+            finally:
+                await self.live_pool.discard(slot)
+            return
+
+        system_prompt = get_system_prompt(
+            user_profile=context["profile"],
+            recent_episodes=context["recent_episodes"],
+        )
+        logger.info(
+            "A conectar à Gemini Live API",
+            model=settings.gemini_model,
+            resuming=bool(session.resumption_handle),
+        )
+        async with AsyncExitStack() as stack:
+            try:
+                live_session = await stack.enter_async_context(
+                    live_connect(
+                        self.client,
+                        Priority.INTERACTIVE,
+                        model=settings.gemini_model,
+                        config=self._build_live_config(system_prompt, session.resumption_handle),
+                    )
+                )
+            except Exception as e:
+                if not session.resumption_handle:
+                    raise
+                # Handle expirado/inválido: nova sessão Live sem retoma
+                logger.warning("Retoma da sessão Live falhou, a abrir nova", error=str(e))
+                session.resumption_handle = None
+                live_session = await stack.enter_async_context(
+                    live_connect(
+                        self.client,
+                        Priority.INTERACTIVE,
+                        model=settings.gemini_model,
+                        config=self._build_live_config(system_prompt),
+                    )
+                )
+            logger.info(
+                "Conexão Live estabelecida (system_instruction no config)",
+                session_id=session.session_id,
+                connect_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+            yield live_session
+
     async def create_session(self, user_id: str) -> EmpatIASession:
         """Cria uma nova sessão para o utilizador."""
         session = EmpatIASession(user_id)
         self.active_sessions[session.session_id] = session
+        session.transcript.start()
 
         logger.info(
             "Nova sessão criada",
@@ -147,7 +290,8 @@ class EmpatIAAgent:
                     return {"success": False, "error": "Parâmetros inválidos"}
 
                 params = ManageMemoryInput(**tool_input)
-                return await manage_memory_tool(params, user_id)
+                with DatabaseConnection.operation(f"tool:{tool_name}"), priority(Priority.INTERACTIVE):
+                    return await manage_memory_tool(params, user_id)
 
             elif tool_name == "google_search":
                 if not isinstance(tool_input, dict):
@@ -159,7 +303,8 @@ class EmpatIAAgent:
                     return {"success": False, "error": "Parâmetros inválidos"}
 
                 params = GoogleSearchInput(**tool_input)
-                return await google_search_tool(params)
+                with priority(Priority.INTERACTIVE):
+                    return await google_search_tool(params)
 
             else:
                 logger.warning("Tool desconhecida", tool_name=tool_name)
@@ -178,7 +323,10 @@ class EmpatIAAgent:
             return {"success": False, "error": str(e)}
 
     async def stream_conversation(
-        self, session: EmpatIASession, audio_stream: AsyncIterator[bytes]
+        self,
+        session: EmpatIASession,
+        audio_stream: AsyncIterator[bytes],
+        on_event: Optional[Callable[..., None]] = None,
     ) -> AsyncIterator[bytes]:
         """
         Mantém uma conversa de voz bidireccional streaming.
@@ -186,6 +334,8 @@ class EmpatIAAgent:
         Args:
             session: Sessão do utilizador
             audio_stream: Stream de áudio de entrada do cliente
+            on_event: Callback opcional para eventos do modelo
+                ("turn_complete", "interrupted", "tool_call", "tool_result")
 
         Yields:
             Bytes de áudio de resposta
@@ -194,43 +344,8 @@ class EmpatIAAgent:
             raise RuntimeError("Agente não inicializado")
 
         # Obter contexto do utilizador
-        context = await session.get_context()
-        system_prompt = get_system_prompt(
-            user_profile=context["profile"],
-            recent_episodes=context["recent_episodes"],
-        )
-
-        # Configurar modelo com voice config, generation config e tools
-        config = types.LiveConnectConfig(
-            response_modalities=["AUDIO"],
-            system_instruction=types.Content(
-                parts=[types.Part(text=system_prompt)]
-            ),
-            generation_config=types.GenerationConfig(
-                temperature=settings.gemini_temperature,
-            ),
-            speech_config=types.SpeechConfig(
-                voice_config=types.VoiceConfig(
-                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                        voice_name=settings.gemini_voice
-                    )
-                )
-            ),
-            tools=[
-                types.Tool(function_declarations=[
-                    types.FunctionDeclaration(
-                        name=MANAGE_MEMORY_TOOL_DEFINITION["name"],
-                        description=MANAGE_MEMORY_TOOL_DEFINITION["description"],
-                        parameters=MANAGE_MEMORY_TOOL_DEFINITION["parameters"],
-                    ),
-                    types.FunctionDeclaration(
-                        name=GOOGLE_SEARCH_TOOL_DEFINITION["name"],
-                        description=GOOGLE_SEARCH_TOOL_DEFINITION["description"],
-                        parameters=GOOGLE_SEARCH_TOOL_DEFINITION["parameters"],
-                    ),
-                ])
-            ],
-        )
+        with tracing.span("session.context"):
+            context = await session.get_context()
 
         logger.info(
             "A iniciar conversa streaming",
@@ -239,13 +354,10 @@ class EmpatIAAgent:
             voice=settings.gemini_voice,
         )
 
+        # Não ativado no contexto: o generator corre na task de quem o consome
+        conversation = tracing.start_span("live.conversation", session_id=session.session_id)
         try:
-            logger.info("A conectar à Gemini Live API", model=settings.gemini_model)
-            async with self.client.aio.live.connect(
-                model=settings.gemini_model, config=config
-            ) as live_session:
-                logger.info("Conexão Live estabelecida (system_instruction no config)")
-
+            async with self._open_live_session(session, context) as live_session:
                 # Processar audio stream de entrada
                 async def send_audio():
                     """Envia áudio do cliente para o modelo."""
@@ -307,28 +419,42 @@ class EmpatIAAgent:
                                             # Áudio de resposta
                                             if part.inline_data and part.inline_data.data:
                                                 audio_responses += 1
-                                                audio_size = len(part.inline_data.data)
-                                                logger.info(f"🔊 Áudio recebido #{audio_responses}", size=audio_size)
+                                                if audio_responses % 100 == 1:
+                                                    logger.debug(
+                                                        f"🔊 Áudio recebido #{audio_responses}",
+                                                        size=len(part.inline_data.data),
+                                                    )
                                                 yield part.inline_data.data
 
                                             # Texto de resposta (para logging)
                                             if part.text:
                                                 text_responses += 1
-                                                session.add_turn("assistant", part.text)
                                                 logger.info(
                                                     f"💬 Texto recebido #{text_responses}",
                                                     text=part.text[:100] if len(part.text) > 100 else part.text
                                                 )
 
+                                    # Transcrições (chegam em fragmentos)
+                                    if server_content.input_transcription and server_content.input_transcription.text:
+                                        session.add_turn("user", server_content.input_transcription.text)
+                                    if server_content.output_transcription and server_content.output_transcription.text:
+                                        session.add_turn("assistant", server_content.output_transcription.text)
+
                                     # Verificar se o turno está completo
+                                    if server_content.turn_complete or server_content.interrupted:
+                                        session.transcript.end_turn()
                                     if server_content.turn_complete:
                                         turn_count += 1
                                         logger.info(f"✅ Turn #{turn_count} completo - aguardando mais input...")
+                                        if on_event:
+                                            on_event("turn_complete")
                                         # NÃO sair do loop - continuar a escutar
 
                                     # Verificar se foi interrompido
                                     if server_content.interrupted:
                                         logger.info("⚠️ Resposta interrompida pelo utilizador")
+                                        if on_event:
+                                            on_event("interrupted")
 
                                 # Processar tool calls
                                 if response.tool_call:
@@ -352,9 +478,20 @@ class EmpatIAAgent:
                                                 # Tentar converter para dict
                                                 call_args = dict(call_args) if call_args else {}
 
-                                            tool_result = await self._execute_tool(
-                                                call_name, call_args, session.user_id
-                                            )
+                                            if on_event:
+                                                on_event("tool_call", tool=call_name, args=call_args)
+                                            tool_started = time.perf_counter()
+                                            with tracing.span(f"tool.{call_name}"):
+                                                tool_result = await self._execute_tool(
+                                                    call_name, call_args, session.user_id
+                                                )
+                                            if on_event:
+                                                on_event(
+                                                    "tool_result",
+                                                    tool=call_name,
+                                                    success=bool(tool_result.get("success", True)),
+                                                    ms=round((time.perf_counter() - tool_started) * 1000, 2),
+                                                )
 
                                             # Enviar resultado da tool
                                             await live_session.send_tool_response(
@@ -368,6 +505,11 @@ class EmpatIAAgent:
                                 if hasattr(response, 'setup_complete') and response.setup_complete:
                                     logger.info("Setup da sessão Live completo")
 
+                                # Guardar o handle mais recente para retomar após reconexão
+                                resumption = getattr(response, 'session_resumption_update', None)
+                                if resumption and resumption.resumable and resumption.new_handle:
+                                    session.resumption_handle = resumption.new_handle
+
                             # Se o iterador terminou, pode significar que a sessão fechou
                             logger.info("Iterador receive() terminou, verificando estado...")
 
@@ -392,36 +534,163 @@ class EmpatIAAgent:
                 error=str(e),
                 session_id=session.session_id,
             )
+            if conversation:
+                conversation.end(e)
             raise
 
+        finally:
+            if conversation:
+                conversation.end()
+
         logger.info(
             "Conversa finalizada",
             session_id=session.session_id,
-            turns=len(session.conversation_turns),
+            turns=len(session.transcript),
         )
 
-    async def end_session(self, session_id: str):
-        """Termina uma sessão e guarda o episódio."""
+    def park_session(self, session_id: str) -> None:
+        """
+        Mantém a sessão em espera após uma desconexão, durante a janela de
+        reconexão. O episódio só é guardado quando a janela expira.
+        """
         session = self.active_sessions.get(session_id)
-        if session:
-            # Gerar resumo e guardar episódio
-            # (isto poderia usar o próprio Gemini para resumir)
-            await session.save_episode(
-                summary="Conversa com EmpatIA",
-                emotional_tone="neutro",
-            )
+        if not session:
+            return
 
-            del self.active_sessions[session_id]
+        if settings.session_resume_grace_s <= 0:
+            asyncio.create_task(self.end_session(session_id))
+            return
 
-            logger.info("Sessão terminada", session_id=session_id)
+        session.parked_at = time.monotonic()
+        session._expiry_task = asyncio.create_task(self._expire_parked(session_id))
+        logger.info(
+            "Sessão em espera de reconexão",
+            session_id=session_id,
+            grace_s=settings.session_resume_grace_s,
+        )
 
-    async def shutdown(self):
-        """Encerra o agente graciosamente."""
-        for session_id in list(self.active_sessions.keys()):
+    async def _expire_parked(self, session_id: str) -> None:
+        """Termina a sessão se o cliente não reconectar a tempo."""
+        await asyncio.sleep(settings.session_resume_grace_s)
+        session = self.active_sessions.get(session_id)
+        if session and session.parked_at is not None:
+            session._expiry_task = None
+            logger.info("Janela de reconexão expirada", session_id=session_id)
             await self.end_session(session_id)
 
+    def is_parked(self, session_id: str) -> bool:
+        """Indica se existe uma sessão em espera de reconexão."""
+        session = self.active_sessions.get(session_id)
+        return session is not None and session.parked_at is not None
+
+    def resume_session(self, session_id: str, user_id: str) -> Optional[EmpatIASession]:
+        """Reassocia uma sessão em espera a uma nova conexão do mesmo utilizador."""
+        session = self.active_sessions.get(session_id)
+        if not session or session.parked_at is None or session.user_id != user_id:
+            return None
+
+        if session._expiry_task:
+            session._expiry_task.cancel()
+            session._expiry_task = None
+        parked_for = time.monotonic() - session.parked_at
+        session.parked_at = None
+
+        logger.info(
+            "Sessão retomada",
+            user_id=user_id,
+            session_id=session_id,
+            parked_s=round(parked_for, 1),
+            live_handle=bool(session.resumption_handle),
+        )
+        return session
+
+    def _detach_session(self, session_id: str) -> Optional[EmpatIASession]:
+        """Retira uma sessão das ativas e cancela a expiração pendente."""
+        # Retirar primeiro: impede retomas e fins duplicados durante a escrita
+        session = self.active_sessions.pop(session_id, None)
+        if session:
+            if session._expiry_task and session._expiry_task is not asyncio.current_task():
+                session._expiry_task.cancel()
+            session._expiry_task = None
+            session.parked_at = None
+        return session
+
+    async def end_session(self, session_id: str):
+        """Termina uma sessão e enfileira o episódio (resumo em background)."""
+        session = self._detach_session(session_id)
+        if session:
+            with DatabaseConnection.operation("session_end"):
+                await session.transcript.close()
+                await self.episodes.enqueue(session)
+            logger.info("Sessão terminada", session_id=session_id)
+
+    async def shutdown(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Encerra o agente graciosamente, dentro de um prazo global.
+
+        As transcrições de todas as sessões são gravadas em paralelo (limitado
+        por `shutdown_concurrency`), os episódios são enfileirados de uma vez
+        e a fila de episódios é drenada com o tempo que sobrar. O que não
+        couber no prazo fica na fila e é processado no próximo arranque.
+
+        Returns:
+            Relatório do que foi gravado e do que se perdeu
+        """
+        started = time.monotonic()
+        deadline = started + (settings.shutdown_timeout_s if timeout is None else timeout)
+
+        def remaining() -> float:
+            return max(0.0, deadline - time.monotonic())
+
+        if self.live_pool:
+            await self.live_pool.stop()
+        # O checkpoint é gravado por página: o re-embedding retoma no próximo arranque
+        await self.reembedder.stop()
+
+        sessions = [
+            session
+            for session in (self._detach_session(sid) for sid in list(self.active_sessions))
+            if session
+        ]
+        report: Dict[str, Any] = {"sessions": len(sessions)}
+
+        # 1. Transcrições (em paralelo, com limite de concorrência)
+        semaphore = asyncio.Semaphore(max(1, settings.shutdown_concurrency))
+
+        async def flush_transcript(session: EmpatIASession) -> None:
+            async with semaphore:
+                await session.transcript.close()
+
+        tasks = [asyncio.create_task(flush_transcript(session)) for session in sessions]
+        if tasks:
+            _, not_done = await asyncio.wait(tasks, timeout=remaining())
+            for task in not_done:
+                task.cancel()
+        report["transcript_turns_persisted"] = sum(s.transcript.turns_persisted for s in sessions)
+        report["transcript_turns_dropped"] = sum(
+            s.transcript.turns_dropped + s.transcript.stats()["pending"] for s in sessions
+        )
+
+        # 2. Episódios: um único round-trip para todas as sessões
+        try:
+            await asyncio.wait_for(self.episodes.enqueue_many(sessions), timeout=remaining() or 0.1)
+            report["episodes_enqueued"] = len(sessions)
+            report["episodes_dropped"] = 0
+        except Exception as e:
+            logger.error("Erro ao enfileirar sessões no encerramento", error=str(e), sessions=len(sessions))
+            report["episodes_enqueued"] = 0
+            report["episodes_dropped"] = len(sessions)
+
+        # 3. Drenar a fila com o tempo que sobrar (o resto fica para o próximo arranque)
+        pending = await self.episodes.stop(
+            drain_timeout=min(settings.episode_drain_timeout_s, remaining())
+        )
+        report["episodes_deferred"] = pending
+        report["elapsed_s"] = round(time.monotonic() - started, 2)
+
         await DatabaseConnection.close_pool()
-        logger.info("Agente EmpatIA encerrado")
+        logger.info("Agente EmpatIA encerrado", **report)
+        return report
 
 
 # Instância global do agente
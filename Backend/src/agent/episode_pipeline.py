@@ -0,0 +1,435 @@
+"""Pipeline assíncrono de episódios: resumo, embedding e persistência pós-sessão."""
+
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Deque
+
+import structlog
+from google import genai
+from google.genai import types
+
+from src.config import settings
+from src.database import DatabaseConnection, MemoryStore
+from src.observability import Histogram
+from src.vertex import get_api, priority, Priority, VertexUnavailable
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_SUMMARY = "Conversa com EmpatIA"
+DEFAULT_TONE = "neutro"
+
+# Limite de texto da transcrição enviado ao modelo de resumo (mantém o fim)
+TRANSCRIPT_MAX_CHARS = 20000
+# Backoff entre tentativas de um job falhado
+RETRY_BASE_S = 5
+RETRY_MAX_S = 600
+
+SUMMARY_PROMPT = """Resume a seguinte conversa entre um utilizador idoso e a EmpatIA,
+uma assistente de voz empática. Responde apenas com JSON.
+
+- "summary": 2 a 3 frases em português de Portugal, na terceira pessoa, com o
+  que foi falado e qualquer facto relevante para próximas conversas
+- "key_topics": até 5 tópicos curtos (1-3 palavras cada)
+- "emotional_tone": uma palavra para o tom emocional do utilizador
+  (ex.: alegre, neutro, triste, ansioso, saudoso, cansado)
+
+Conversa:
+{transcript}"""
+
+SUMMARY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {"type": "STRING"},
+        "key_topics": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "emotional_tone": {"type": "STRING"},
+    },
+    "required": ["summary", "key_topics", "emotional_tone"],
+}
+
+
+class EpisodePipeline:
+    """
+    Fila durável (tabela `session_jobs`) de sessões terminadas.
+
+    `enqueue()` é apenas um INSERT, pelo que o fim de sessão não espera pelo
+    resumo nem pelo embedding. Workers em background reclamam lotes com
+    `FOR UPDATE SKIP LOCKED` (seguro com vários processos), geram o resumo
+    com um modelo de texto, calculam os embeddings do lote num só pedido e
+    inserem os episódios numa transação. Jobs que falham voltam à fila com
+    backoff; jobs presos num worker que morreu são retomados após
+    `episode_lock_timeout_s`. Um resumo recusado pelo limitador do Vertex
+    não gasta tentativas: o job é adiado, e ao fim de
+    `episode_max_attempts` adiamentos é guardado com o resumo por omissão.
+
+    No modo de nó único (`memory_backend="memory"`) a fila é uma deque em
+    memória com a mesma semântica de lotes e tentativas, mas não durável:
+    o que não for drenado no encerramento perde-se.
+    """
+
+    def __init__(
+        self,
+        memory_store: Optional[MemoryStore] = None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.memory_store = memory_store or MemoryStore()
+        self.num_workers = settings.episode_workers if workers is None else workers
+        self.batch_size = batch_size or settings.episode_batch_size
+
+        self._client: Optional[genai.Client] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+        # Fila em memória (modo de nó único)
+        self.durable = settings.memory_backend == "postgres"
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._job_ids = itertools.count(1)
+        self._running = 0
+        self._delayed = 0
+
+        # Métricas
+        self.enqueued = 0
+        self.completed = 0
+        self.retried = 0
+        self.deferred = 0
+        self.failed = 0
+        self.summary_fallbacks = 0
+        self.summary_ms = Histogram()
+        self.batch_ms = Histogram()
+
+    async def start(self, client: Optional[genai.Client]) -> None:
+        """Inicia os workers (o cliente é usado para gerar os resumos)."""
+        self._client = client
+        self._stopping = False
+        for index in range(self.num_workers):
+            self._tasks.append(asyncio.create_task(self._worker(index)))
+        logger.info(
+            "Pipeline de episódios iniciado",
+            workers=self.num_workers,
+            batch_size=self.batch_size,
+        )
+
+    @staticmethod
+    def build_job(session: Any) -> Dict[str, Any]:
+        """Extrai de uma sessão os dados necessários para o episódio."""
+        ended_at = datetime.now()
+        return {
+            "user_id": session.user_id,
+            "session_id": session.session_id,
+            "started_at": session.started_at.isoformat(),
+            "ended_at": ended_at.isoformat(),
+            "duration_minutes": (ended_at - session.started_at).seconds // 60,
+            "key_topics": sorted(session.key_topics),
+            "turns": session.transcript.turns(),
+        }
+
+    async def enqueue(self, session: Any) -> None:
+        """Enfileira uma sessão terminada."""
+        await self.enqueue_many([session])
+
+    async def enqueue_many(self, sessions: List[Any]) -> None:
+        """Enfileira várias sessões num único round-trip (ex.: shutdown)."""
+        if not sessions:
+            return
+        jobs = [self.build_job(session) for session in sessions]
+        if self.durable:
+            await DatabaseConnection.executemany_prepared(
+                "job_enqueue",
+                [(job["user_id"], job["session_id"], json.dumps(job)) for job in jobs],
+            )
+        else:
+            self._queue.extend({"id": next(self._job_ids), "attempts": 0, **job} for job in jobs)
+        self.enqueued += len(jobs)
+        self._wakeup.set()
+        logger.info("Sessões enfileiradas para episódio", count=len(jobs))
+
+    async def _claim(self) -> List[Dict[str, Any]]:
+        """Reclama um lote de jobs pendentes (ou abandonados por outro worker)."""
+        if not self.durable:
+            jobs = []
+            while self._queue and len(jobs) < self.batch_size:
+                job = self._queue.popleft()
+                job["attempts"] += 1
+                jobs.append(job)
+            return jobs
+
+        rows = await DatabaseConnection.fetch_prepared(
+            "job_claim",
+            self.batch_size,
+            float(settings.episode_lock_timeout_s),
+        )
+        jobs = []
+        for row in rows:
+            payload = row["payload"]
+            if isinstance(payload, str):
+                payload = json.loads(payload)
+            jobs.append({"id": row["id"], "attempts": row["attempts"], **payload})
+        return jobs
+
+    async def _worker(self, index: int) -> None:
+        """Loop de um worker: reclama, processa e confirma lotes."""
+        with DatabaseConnection.operation("episodes"), priority(Priority.BACKGROUND):
+            while not self._stopping:
+                try:
+                    jobs = await self._claim()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Erro ao reclamar jobs de episódio", worker=index, error=str(e))
+                    jobs = []
+
+                if not jobs:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(
+                            self._wakeup.wait(), timeout=settings.episode_poll_interval_s
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                self._running += len(jobs)
+                try:
+                    await self._process_batch(jobs)
+                finally:
+                    self._running -= len(jobs)
+
+    async def _process_batch(self, jobs: List[Dict[str, Any]]) -> None:
+        """
+        Resume, embebe e guarda um lote; reagenda o lote se falhar. Os jobs
+        cujo resumo o Vertex recusou são adiados e o resto do lote é guardado.
+        """
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(
+                *(self._summarize(job) for job in jobs), return_exceptions=True
+            )
+            summaries = []
+            rejected = []
+            for job, result in zip(jobs, results):
+                if isinstance(result, VertexUnavailable):
+                    rejected.append(job)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    summaries.append((job, result))
+            if rejected:
+                await self._defer(rejected)
+                jobs = [job for job, _ in summaries]
+                if not jobs:
+                    return
+            episodes = [
+                {
+                    "user_id": job["user_id"],
+                    "session_id": job["session_id"],
+                    "summary": summary["summary"],
+                    "key_topics": summary["key_topics"],
+                    "emotional_tone": summary["emotional_tone"],
+                    "started_at": datetime.fromisoformat(job["started_at"]),
+                    "ended_at": datetime.fromisoformat(job["ended_at"]),
+                    "duration_minutes": job["duration_minutes"],
+                    "metadata": {"turns": len(job["turns"])},
+                }
+                for job, summary in summaries
+            ]
+            await self.memory_store.save_episodes(episodes)
+            if self.durable:
+                await DatabaseConnection.execute_prepared(
+                    "job_delete_many", [job["id"] for job in jobs]
+                )
+        except asyncio.CancelledError:
+            # Encerramento: os jobs ficam 'running' e são retomados após o lock expirar
+            raise
+        except Exception as e:
+            logger.error("Erro ao processar lote de episódios", error=str(e), jobs=len(jobs))
+            await self._reschedule(jobs, str(e))
+            return
+
+        self.completed += len(jobs)
+        self.batch_ms.observe((time.perf_counter() - started) * 1000)
+        logger.info(
+            "Lote de episódios guardado",
+            jobs=len(jobs),
+            batch_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+
+    async def _reschedule(self, jobs: List[Dict[str, Any]], error: str) -> None:
+        """Devolve jobs à fila com backoff, ou marca-os como falhados."""
+        for job in jobs:
+            exhausted = job["attempts"] >= settings.episode_max_attempts
+            delay = min(RETRY_MAX_S, RETRY_BASE_S * 2 ** (job["attempts"] - 1))
+            if not self.durable:
+                if not exhausted:
+                    self._delayed += 1
+                    asyncio.get_running_loop().call_later(delay, self._requeue, job)
+            else:
+                try:
+                    await DatabaseConnection.execute_prepared(
+                        "job_reschedule",
+                        job["id"],
+                        "failed" if exhausted else "pending",
+                        error[:1000],
+                        float(delay),
+                    )
+                except Exception as e:
+                    logger.warning("Erro ao reagendar job de episódio", job_id=job["id"], error=str(e))
+                    continue
+            if exhausted:
+                self.failed += 1
+                logger.error("Job de episódio falhou definitivamente", session_id=job["session_id"])
+            else:
+                self.retried += 1
+
+    async def _defer(self, jobs: List[Dict[str, Any]]) -> None:
+        """Devolve à fila jobs cujo resumo o Vertex recusou, sem gastar uma tentativa."""
+        for job in jobs:
+            job["deferrals"] = job.get("deferrals", 0) + 1
+            job["attempts"] -= 1
+            delay = min(RETRY_MAX_S, RETRY_BASE_S * 2 ** (job["deferrals"] - 1))
+            if not self.durable:
+                self._delayed += 1
+                asyncio.get_running_loop().call_later(delay, self._requeue, job)
+            else:
+                try:
+                    await DatabaseConnection.execute_prepared(
+                        "job_defer",
+                        job["id"],
+                        "Vertex indisponível",
+                        float(delay),
+                        job["deferrals"],
+                    )
+                except Exception as e:
+                    logger.warning("Erro ao adiar job de episódio", job_id=job["id"], error=str(e))
+                    continue
+            self.deferred += 1
+        logger.info("Resumos de episódio adiados (Vertex indisponível)", jobs=len(jobs))
+
+    def _requeue(self, job: Dict[str, Any]) -> None:
+        """Fim do backoff de um job da fila em memória."""
+        self._delayed -= 1
+        self._queue.append(job)
+        self._wakeup.set()
+
+    async def _summarize(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Gera resumo, tópicos e tom emocional a partir da transcrição."""
+        fallback = {
+            "summary": DEFAULT_SUMMARY,
+            "key_topics": job["key_topics"],
+            "emotional_tone": DEFAULT_TONE,
+        }
+        transcript = "\n".join(
+            f"{turn['speaker']}: {turn['text']}" for turn in job["turns"] if turn.get("text")
+        )
+        if not transcript.strip() or self._client is None:
+            return fallback
+
+        started = time.perf_counter()
+        try:
+            async with get_api("generate").call():
+                response = await self._client.aio.models.generate_content(
+                    model=settings.episode_summary_model,
+                    contents=SUMMARY_PROMPT.format(transcript=transcript[-TRANSCRIPT_MAX_CHARS:]),
+                    config=types.GenerateContentConfig(
+                        temperature=0.2,
+                        response_mime_type="application/json",
+                        response_schema=SUMMARY_SCHEMA,
+                    ),
+                )
+            data = json.loads(response.text)
+        except VertexUnavailable as e:
+            # Vertex sobrecarregado: o job é adiado em vez de ficar sem resumo,
+            # até esgotar os adiamentos
+            if job.get("deferrals", 0) < settings.episode_max_attempts:
+                raise
+            self.summary_fallbacks += 1
+            logger.warning(
+                "Resumo do episódio por omissão após adiamentos",
+                session_id=job["session_id"],
+                error=str(e),
+            )
+            return fallback
+        except Exception as e:
+            self.summary_fallbacks += 1
+            logger.warning("Erro ao gerar resumo do episódio", session_id=job["session_id"], error=str(e))
+            return fallback
+        finally:
+            self.summary_ms.observe((time.perf_counter() - started) * 1000)
+
+        topics = [str(t)[:100] for t in data.get("key_topics") or []][:5]
+        return {
+            "summary": str(data.get("summary") or DEFAULT_SUMMARY),
+            "key_topics": sorted(set(topics) | set(job["key_topics"])),
+            "emotional_tone": str(data.get("emotional_tone") or DEFAULT_TONE)[:50],
+        }
+
+    async def drain(self, timeout: float) -> Optional[int]:
+        """
+        Espera até a fila ficar vazia (ou o timeout expirar).
+
+        Na fila durável contam os jobs que este worker tem em mãos e os que
+        podem ser reclamados já; os que esperam pelo backoff, ou que outro
+        worker está a processar, ficam na base de dados.
+
+        Returns:
+            Jobs ainda por processar (None se não foi possível consultar)
+        """
+        deadline = time.monotonic() + timeout
+        pending = None
+        while True:
+            if not self.durable:
+                pending = len(self._queue) + self._running + self._delayed
+            else:
+                try:
+                    pending = self._running + await DatabaseConnection.fetchval_prepared(
+                        "jobs_claimable_count", float(settings.episode_lock_timeout_s)
+                    )
+                except Exception:
+                    return None
+            if not pending or time.monotonic() >= deadline:
+                return pending
+            self._wakeup.set()
+            await asyncio.sleep(0.2)
+
+    async def stop(self, drain_timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Para os workers. Com `drain_timeout`, processa primeiro o que estiver
+        na fila; o que ficar por fazer continua na base de dados e é retomado
+        no próximo arranque (na fila em memória perde-se).
+
+        Returns:
+            Jobs que ficaram na fila (None se desconhecido)
+        """
+        pending = None
+        if drain_timeout:
+            pending = await self.drain(drain_timeout)
+            if pending:
+                logger.warning(
+                    "Fila de episódios não esvaziou a tempo",
+                    timeout_s=drain_timeout,
+                    pending=pending,
+                )
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Pipeline de episódios parado", **self.stats())
+        return pending
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do pipeline."""
+        return {
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "retried": self.retried,
+            "deferred": self.deferred,
+            "failed": self.failed,
+            "summary_fallbacks": self.summary_fallbacks,
+            "summary_ms": self.summary_ms.snapshot(),
+            "batch_ms": self.batch_ms.snapshot(),
+        }
@@ -0,0 +1,188 @@
+"""Pool de conexões Gemini Live pré-estabelecidas."""
+
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, Callable, AsyncContextManager
+
+import structlog
+
+from src.config import settings
+from src.observability import Histogram
+
+logger = structlog.get_logger(__name__)
+
+# Espera após uma falha ao abrir conexão, antes de voltar a tentar
+REFILL_ERROR_BACKOFF_S = 5.0
+
+
+class LiveSlot:
+    """Uma conexão Live aberta e ainda não atribuída a nenhuma sessão."""
+
+    __slots__ = ("cm", "session", "created_at")
+
+    def __init__(self, cm: AsyncContextManager, session: Any):
+        self.cm = cm
+        self.session = session
+        self.created_at = time.monotonic()
+
+    @property
+    def age_s(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class LiveConnectionPool:
+    """
+    Mantém até `size` conexões Live abertas com uma configuração genérica
+    (system prompt sem perfil do utilizador), prontas a entregar a novas
+    sessões sem esperar pelo handshake.
+
+    Cada conexão é de uso único: depois de entregue não volta ao pool. As
+    conexões com mais de `ttl_s` ou cujo transporte fechou são descartadas
+    pela verificação periódica e substituídas.
+
+    O `connect_factory` devolve o context manager de `client.aio.live.connect`
+    (ou equivalente), pelo que o pool funciona com qualquer cliente, incluindo
+    um servidor Live local para benchmarks.
+    """
+
+    def __init__(
+        self,
+        connect_factory: Callable[[], AsyncContextManager],
+        size: Optional[int] = None,
+        ttl_s: Optional[float] = None,
+        health_interval_s: Optional[float] = None,
+    ):
+        self.connect_factory = connect_factory
+        self.size = settings.live_pool_size if size is None else size
+        self.ttl_s = settings.live_pool_ttl_s if ttl_s is None else ttl_s
+        self.health_interval_s = (
+            settings.live_pool_health_interval_s if health_interval_s is None else health_interval_s
+        )
+
+        self._idle: List[LiveSlot] = []
+        self._opening = 0
+        self._refill = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.opened = 0
+        self.expired = 0
+        self.unhealthy = 0
+        self.errors = 0
+        self.connect_ms = Histogram()
+
+    async def start(self) -> None:
+        """Inicia a manutenção do pool (abertura em background)."""
+        if self.size > 0 and self._task is None:
+            self._task = asyncio.create_task(self._maintain())
+            logger.info("Pool Live iniciado", size=self.size, ttl_s=self.ttl_s)
+
+    def _is_healthy(self, slot: LiveSlot) -> bool:
+        """Verifica idade e estado do transporte de uma conexão."""
+        if slot.age_s >= self.ttl_s:
+            self.expired += 1
+            return False
+        # google-genai: AsyncSession._ws é a conexão websockets subjacente
+        ws = getattr(slot.session, "_ws", None)
+        state = getattr(ws, "state", None)
+        if state is not None and getattr(state, "name", "OPEN") != "OPEN":
+            self.unhealthy += 1
+            return False
+        if getattr(slot.session, "closed", False):
+            self.unhealthy += 1
+            return False
+        return True
+
+    async def acquire(self) -> Optional[LiveSlot]:
+        """Entrega uma conexão saudável, ou None se o pool estiver vazio."""
+        while self._idle:
+            slot = self._idle.pop()
+            self._refill.set()
+            if self._is_healthy(slot):
+                self.hits += 1
+                return slot
+            await self.discard(slot)
+        self.misses += 1
+        self._refill.set()
+        return None
+
+    async def discard(self, slot: LiveSlot) -> None:
+        """Fecha uma conexão (entregue ou inválida)."""
+        try:
+            await slot.cm.__aexit__(None, None, None)
+        except Exception as e:
+            logger.debug("Erro ao fechar conexão Live do pool", error=str(e))
+
+    async def _open_one(self) -> None:
+        """Abre uma conexão e adiciona-a ao pool."""
+        started = time.perf_counter()
+        cm = self.connect_factory()
+        session = await cm.__aenter__()
+        self.connect_ms.observe((time.perf_counter() - started) * 1000)
+        self.opened += 1
+        slot = LiveSlot(cm, session)
+        if self._closing:
+            await self.discard(slot)
+        else:
+            self._idle.append(slot)
+
+    async def _maintain(self) -> None:
+        """Remove conexões expiradas/fechadas e repõe o tamanho do pool."""
+        while not self._closing:
+            healthy = []
+            for slot in self._idle:
+                if self._is_healthy(slot):
+                    healthy.append(slot)
+                else:
+                    await self.discard(slot)
+            self._idle = healthy
+
+            while len(self._idle) + self._opening < self.size and not self._closing:
+                self._opening += 1
+                try:
+                    await self._open_one()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning("Erro ao pré-abrir conexão Live", error=str(e))
+                    await asyncio.sleep(REFILL_ERROR_BACKOFF_S)
+                    break
+                finally:
+                    self._opening -= 1
+
+            self._refill.clear()
+            try:
+                await asyncio.wait_for(self._refill.wait(), timeout=self.health_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self) -> None:
+        """Para a manutenção e fecha todas as conexões em espera."""
+        self._closing = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self.discard(slot) for slot in idle))
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do pool."""
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "opened": self.opened,
+            "expired": self.expired,
+            "unhealthy": self.unhealthy,
+            "errors": self.errors,
+            "connect_ms": self.connect_ms.snapshot(),
+        }
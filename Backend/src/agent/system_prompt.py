@@ -131,9 +131,44 @@ def format_recent_episodes(episodes: Optional[List[Dict[str, Any]]]) -> str:
     return "\n".join(formatted)
 
 
+# Texto usado no system prompt de conexões pré-estabelecidas (pool Live),
+# cujo contexto do utilizador só é conhecido quando a sessão é atribuída
+DEFERRED_CONTEXT_TEXT = (
+    "Será enviado na primeira mensagem de contexto desta sessão. "
+    "Usa essa informação como se estivesse aqui."
+)
+
+
+def get_session_context_message(
+    user_profile: Optional[Dict[str, Any]] = None,
+    recent_episodes: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    Gera a mensagem de contexto do utilizador enviada a uma conexão Live
+    pré-estabelecida (cujo system prompt foi criado sem perfil). Inclui a
+    data e a hora atuais: a conexão pode ter sido aberta minutos antes.
+    """
+    context = get_current_context()
+    return f"""[CONTEXTO DA SESSÃO - NÃO RESPONDAS A ESTA MENSAGEM]
+
+# CONTEXTO ATUAL (substitui o do system prompt)
+- Data: {context['data_completa']}
+- Hora: {context['hora']}
+- Período: {context['periodo']}
+
+# PERFIL DO UTILIZADOR (MEMÓRIA)
+{format_user_profile(user_profile)}
+
+# CONVERSAS RECENTES
+{format_recent_episodes(recent_episodes)}
+
+Aguarda que o utilizador fale primeiro."""
+
+
 def get_system_prompt(
     user_profile: Optional[Dict[str, Any]] = None,
     recent_episodes: Optional[List[Dict[str, Any]]] = None,
+    deferred_context: bool = False,
 ) -> str:
     """
     Gera o system prompt completo para o agente EmpatIA.
@@ -141,13 +176,18 @@ def get_system_prompt(
     Args:
         user_profile: Perfil consolidado do utilizador
         recent_episodes: Episódios recentes de conversa
+        deferred_context: Perfil e episódios chegam depois, numa mensagem
+            de contexto (conexões do pool Live)
 
     Returns:
         System prompt formatado
     """
     context = get_current_context()
-    profile_text = format_user_profile(user_profile)
-    episodes_text = format_recent_episodes(recent_episodes)
+    if deferred_context:
+        profile_text = episodes_text = DEFERRED_CONTEXT_TEXT
+    else:
+        profile_text = format_user_profile(user_profile)
+        episodes_text = format_recent_episodes(recent_episodes)
 
     return f"""# IDENTIDADE E PROPÓSITO
 Tu és a "EmpatIA", uma companheira compassiva e proativa para idosos em Portugal.
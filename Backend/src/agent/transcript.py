@@ -0,0 +1,209 @@
+"""Transcrição da sessão: buffer limitado em memória com persistência incremental."""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Deque
+
+import structlog
+
+from src.config import settings
+from src.database import DatabaseConnection
+
+logger = structlog.get_logger(__name__)
+
+# Tamanho máximo de um turno (fragmentos acumulados) antes de o fechar
+MAX_TURN_CHARS = 4000
+# Custo aproximado de um TranscriptTurn (objeto com __slots__ + referências)
+TURN_OVERHEAD_BYTES = 120
+
+
+class TranscriptTurn:
+    """Um turno da conversa (utilizador ou assistente)."""
+
+    __slots__ = ("seq", "speaker", "text", "at")
+
+    def __init__(self, seq: int, speaker: str, text: str, at: float):
+        self.seq = seq
+        self.speaker = speaker
+        self.text = text
+        self.at = at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"speaker": self.speaker, "text": self.text}
+
+
+class SessionTranscript:
+    """
+    Transcrição de uma sessão com memória limitada.
+
+    As transcrições do Gemini Live chegam em fragmentos; fragmentos seguidos
+    do mesmo interlocutor são juntos num turno, fechado na mudança de
+    interlocutor ou no fim do turno do modelo. Os turnos fechados ficam num
+    ring (`deque(maxlen)`) com os mais recentes, usado para o resumo do
+    episódio, e são gravados em `conversation_transcripts` em lotes (a cada
+    `flush_turns` turnos ou `flush_interval_s` segundos) com um único INSERT
+    multi-linha. Se a base de dados falhar, os turnos por gravar ficam
+    limitados a `max_pending` (os mais antigos são descartados). No modo de
+    nó único (`memory_backend="memory"`) a transcrição não é gravada.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        user_id: str,
+        max_turns: Optional[int] = None,
+        flush_turns: Optional[int] = None,
+        flush_interval_s: Optional[float] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.flush_turns = flush_turns or settings.transcript_flush_turns
+        self.flush_interval_s = flush_interval_s or settings.transcript_flush_interval_s
+        self.persist = settings.memory_backend == "postgres"
+
+        self._recent: Deque[TranscriptTurn] = deque(
+            maxlen=max_turns or settings.transcript_max_turns
+        )
+        self._pending: Deque[TranscriptTurn] = deque(
+            maxlen=max_pending or settings.transcript_max_pending
+        )
+        self._current: Optional[TranscriptTurn] = None
+        self._parts: List[str] = []
+        self._seq = 0
+
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer_task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.turns_total = 0
+        self.turns_persisted = 0
+        self.turns_dropped = 0
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return self.turns_total
+
+    def start(self) -> None:
+        """Inicia a gravação periódica."""
+        if self._timer_task is None and self.flush_interval_s > 0 and self.persist:
+            self._timer_task = asyncio.create_task(self._flush_periodically())
+
+    def add(self, speaker: str, text: str) -> None:
+        """Acrescenta um fragmento de transcrição."""
+        if not text:
+            return
+        if self._current is not None and (
+            self._current.speaker != speaker
+            or sum(map(len, self._parts)) >= MAX_TURN_CHARS
+        ):
+            self.end_turn()
+        if self._current is None:
+            self._seq += 1
+            self._current = TranscriptTurn(self._seq, speaker, "", time.time())
+        self._parts.append(text)
+
+    def end_turn(self) -> None:
+        """Fecha o turno em curso (fim do turno do modelo ou interrupção)."""
+        turn = self._current
+        if turn is None:
+            return
+        turn.text = "".join(self._parts).strip()
+        self._current = None
+        self._parts = []
+        if not turn.text:
+            return
+
+        self.turns_total += 1
+        self._recent.append(turn)
+        if not self.persist:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.turns_dropped += 1
+        self._pending.append(turn)
+
+        if len(self._pending) >= self.flush_turns and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    def turns(self) -> List[Dict[str, Any]]:
+        """Turnos mais recentes (incluindo o turno ainda aberto)."""
+        result = [turn.to_dict() for turn in self._recent]
+        if self._current is not None and self._parts:
+            result.append({"speaker": self._current.speaker, "text": "".join(self._parts)})
+        return result
+
+    def memory_bytes(self) -> int:
+        """Estimativa da memória ocupada pelos turnos guardados."""
+        oldest_recent = self._recent[0].seq if self._recent else None
+        turns = list(self._recent) + [
+            turn for turn in self._pending
+            if oldest_recent is None or turn.seq < oldest_recent
+        ]
+        return sum(len(turn.text) + TURN_OVERHEAD_BYTES for turn in turns) + sum(
+            map(len, self._parts)
+        )
+
+    async def flush(self) -> int:
+        """Grava os turnos pendentes num único INSERT multi-linha."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch = list(self._pending)
+            try:
+                with DatabaseConnection.operation("transcript"):
+                    await DatabaseConnection.execute_prepared(
+                        "transcript_insert_many",
+                        self.session_id,
+                        self.user_id,
+                        [turn.seq for turn in batch],
+                        [turn.speaker for turn in batch],
+                        [turn.text for turn in batch],
+                        [datetime.fromtimestamp(turn.at, timezone.utc) for turn in batch],
+                    )
+            except Exception as e:
+                logger.warning(
+                    "Erro ao gravar transcrição",
+                    session_id=self.session_id,
+                    pending=len(self._pending),
+                    error=str(e),
+                )
+                return 0
+
+            # Retirar só o que foi gravado (podem ter entrado turnos entretanto)
+            last_seq = batch[-1].seq
+            while self._pending and self._pending[0].seq <= last_seq:
+                self._pending.popleft()
+            self.turns_persisted += len(batch)
+            self.flushes += 1
+            return len(batch)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            await self.flush()
+
+    async def close(self) -> None:
+        """Fecha o turno em curso, para a gravação periódica e grava o resto."""
+        self.end_turn()
+        if self._timer_task:
+            self._timer_task.cancel()
+            try:
+                await self._timer_task
+            except asyncio.CancelledError:
+                pass
+            self._timer_task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns_total,
+            "persisted": self.turns_persisted,
+            "pending": len(self._pending),
+            "dropped": self.turns_dropped,
+            "flushes": self.flushes,
+        }
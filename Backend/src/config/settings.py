@@ -21,10 +21,108 @@ class Settings(BaseSettings):
     postgres_user: str = Field("postgres", env="POSTGRES_USER")
     postgres_password: str = Field(..., env="POSTGRES_PASSWORD")
 
+    # Pool de conexões PostgreSQL
+    postgres_pool_min_size: int = Field(2, env="POSTGRES_POOL_MIN_SIZE")
+    postgres_pool_max_size: int = Field(10, env="POSTGRES_POOL_MAX_SIZE")
+    postgres_pool_max_queries: int = Field(50000, env="POSTGRES_POOL_MAX_QUERIES")
+    postgres_pool_max_idle_s: float = Field(300.0, env="POSTGRES_POOL_MAX_IDLE_S")
+    postgres_command_timeout_s: float = Field(30.0, env="POSTGRES_COMMAND_TIMEOUT_S")
+    postgres_statement_cache_size: int = Field(100, env="POSTGRES_STATEMENT_CACHE_SIZE")
+    postgres_connect_timeout_s: float = Field(10.0, env="POSTGRES_CONNECT_TIMEOUT_S")
+    postgres_acquire_timeout_s: float = Field(10.0, env="POSTGRES_ACQUIRE_TIMEOUT_S")
+
+    # Réplicas de leitura (vazio = tudo no primário)
+    postgres_replica_hosts: str = Field("", env="POSTGRES_REPLICA_HOSTS")
+    postgres_replica_pool_max_size: int = Field(5, env="POSTGRES_REPLICA_POOL_MAX_SIZE")
+    postgres_replica_max_lag_s: float = Field(5.0, env="POSTGRES_REPLICA_MAX_LAG_S")
+    postgres_replica_check_interval_s: float = Field(5.0, env="POSTGRES_REPLICA_CHECK_INTERVAL_S")
+    postgres_read_your_writes_s: float = Field(10.0, env="POSTGRES_READ_YOUR_WRITES_S")
+
+    # Armazenamento das memórias: "postgres", ou "memory" (nó único, sem base
+    # de dados; os dados perdem-se ao reiniciar)
+    memory_backend: str = Field("postgres", env="MEMORY_BACKEND")
+
+    # Migrações do schema no arranque
+    db_auto_migrate: bool = Field(True, env="DB_AUTO_MIGRATE")
+    migration_lock_timeout_s: float = Field(20.0, env="MIGRATION_LOCK_TIMEOUT_S")
+
+    # Embeddings (ao trocar de modelo, o re-embedder atualiza as linhas antigas;
+    # a coluna é vector(768), pelo que o modelo tem de suportar esta dimensão)
+    embedding_model: str = Field("text-embedding-004", env="EMBEDDING_MODEL")
+    # "vertex" ou "local" (n-gramas com hashing, sem rede: testes e benchmarks)
+    embedding_provider: str = Field("vertex", env="EMBEDDING_PROVIDER")
+    # Modo degradado: fornecedor usado quando o principal falha ("" = desativado)
+    embedding_fallback_provider: str = Field("", env="EMBEDDING_FALLBACK_PROVIDER")
+    embedding_dimensions: int = Field(768, env="EMBEDDING_DIMENSIONS")
+    reembed_batch_size: int = Field(100, env="REEMBED_BATCH_SIZE")
+    reembed_max_texts_per_s: float = Field(50.0, env="REEMBED_MAX_TEXTS_PER_S")
+    reembed_poll_interval_s: float = Field(60.0, env="REEMBED_POLL_INTERVAL_S")
+    embedding_pending_warn: int = Field(100, env="EMBEDDING_PENDING_WARN")
+
+    # Importação/exportação em massa de memórias
+    bulk_import_batch_size: int = Field(100, env="BULK_IMPORT_BATCH_SIZE")
+    bulk_export_prefetch: int = Field(500, env="BULK_EXPORT_PREFETCH")
+
     # WebSocket Server
     websocket_host: str = Field("0.0.0.0", env="WEBSOCKET_HOST")
     websocket_port: int = Field(8765, env="WEBSOCKET_PORT")
 
+    # Encerramento gracioso (drain): prazo global e paralelismo da gravação
+    shutdown_timeout_s: float = Field(25.0, env="SHUTDOWN_TIMEOUT_S")
+    shutdown_concurrency: int = Field(32, env="SHUTDOWN_CONCURRENCY")
+    drain_reconnect_after_ms: int = Field(2000, env="DRAIN_RECONNECT_AFTER_MS")
+
+    # Janela para retomar uma sessão após desconexão (0 = desativado)
+    session_resume_grace_s: float = Field(60.0, env="SESSION_RESUME_GRACE_S")
+
+    # Reaper de sessões inativas/zombie (0 = sem timeout de inatividade)
+    session_idle_timeout_s: float = Field(1800.0, env="SESSION_IDLE_TIMEOUT_S")
+    # Amplitude PCM a partir da qual o áudio recebido conta como atividade
+    # (um microfone aberto em silêncio não mantém a sessão viva)
+    session_idle_voice_threshold: int = Field(500, env="SESSION_IDLE_VOICE_THRESHOLD")
+    reaper_interval_s: float = Field(30.0, env="REAPER_INTERVAL_S")
+    zombie_grace_s: float = Field(60.0, env="ZOMBIE_GRACE_S")
+
+    # Controlo de admissão (0 = sem limite)
+    max_sessions: int = Field(50, env="MAX_SESSIONS")
+    max_sessions_per_user: int = Field(2, env="MAX_SESSIONS_PER_USER")
+    admission_queue_size: int = Field(20, env="ADMISSION_QUEUE_SIZE")
+    admission_queue_timeout_s: float = Field(10.0, env="ADMISSION_QUEUE_TIMEOUT_S")
+    admission_reconnect_window_s: float = Field(60.0, env="ADMISSION_RECONNECT_WINDOW_S")
+
+    # Processos worker (SO_REUSEPORT); 1 = processo único
+    workers: int = Field(1, env="WORKERS")
+    worker_shutdown_timeout_s: float = Field(30.0, env="WORKER_SHUTDOWN_TIMEOUT_S")
+    metrics_interval_s: float = Field(15.0, env="METRICS_INTERVAL_S")
+
+    # Áudio de saída (servidor -> cliente)
+    audio_output_frame_ms: int = Field(40, env="AUDIO_OUTPUT_FRAME_MS")
+    audio_output_buffer_ms: int = Field(5000, env="AUDIO_OUTPUT_BUFFER_MS")
+    audio_output_slow_client_policy: str = Field(
+        "drop", env="AUDIO_OUTPUT_SLOW_CLIENT_POLICY"
+    )  # drop | disconnect
+
+    # Transporte de áudio comprimido (negociado pelo cliente com ?codec=opus)
+    audio_opus_enabled: bool = Field(True, env="AUDIO_OPUS_ENABLED")
+    audio_opus_bitrate: int = Field(24000, env="AUDIO_OPUS_BITRATE")
+    audio_codec_threads: int = Field(2, env="AUDIO_CODEC_THREADS")
+
+    # Gravação das sessões para replay/debugging (segmentos mmap em disco)
+    recording_enabled: bool = Field(False, env="RECORDING_ENABLED")
+    recording_user_ids: str = Field("", env="RECORDING_USER_IDS")  # vazio = todos
+    recording_dir: str = Field("recordings", env="RECORDING_DIR")
+    recording_segment_mb: int = Field(16, env="RECORDING_SEGMENT_MB")
+    recording_max_segments: int = Field(8, env="RECORDING_MAX_SEGMENTS")
+    recording_retention_hours: float = Field(72.0, env="RECORDING_RETENTION_HOURS")
+
+    # Tracing de latência por conexão e por turno (spans em contextvars)
+    tracing_enabled: bool = Field(False, env="TRACING_ENABLED")
+    tracing_sample_rate: float = Field(1.0, env="TRACING_SAMPLE_RATE")
+    tracing_exporter: str = Field("file", env="TRACING_EXPORTER")  # file | log | none
+    tracing_file: str = Field("traces.jsonl", env="TRACING_FILE")
+    # Amplitude PCM a partir da qual um chunk conta como voz (sem VAD no cliente)
+    tracing_voice_threshold: int = Field(500, env="TRACING_VOICE_THRESHOLD")
+
     # Gemini Model Configuration
     gemini_model: str = Field(
         "gemini-live-2.5-flash-native-audio", env="GEMINI_MODEL"
@@ -33,6 +131,41 @@ class Settings(BaseSettings):
     gemini_language: str = Field("pt-PT", env="GEMINI_LANGUAGE")
     gemini_temperature: float = Field(0.6, env="GEMINI_TEMPERATURE")
 
+    # Pool de conexões Live pré-estabelecidas (0 = desativado)
+    live_pool_size: int = Field(0, env="LIVE_POOL_SIZE")
+    live_pool_ttl_s: float = Field(300.0, env="LIVE_POOL_TTL_S")
+    live_pool_health_interval_s: float = Field(5.0, env="LIVE_POOL_HEALTH_INTERVAL_S")
+
+    # Transcrição da sessão (buffer limitado e gravação incremental)
+    transcript_max_turns: int = Field(200, env="TRANSCRIPT_MAX_TURNS")
+    transcript_flush_turns: int = Field(10, env="TRANSCRIPT_FLUSH_TURNS")
+    transcript_flush_interval_s: float = Field(30.0, env="TRANSCRIPT_FLUSH_INTERVAL_S")
+    transcript_max_pending: int = Field(1000, env="TRANSCRIPT_MAX_PENDING")
+
+    # Pipeline assíncrono de episódios (resumo + embedding após a sessão)
+    episode_workers: int = Field(2, env="EPISODE_WORKERS")
+    episode_batch_size: int = Field(10, env="EPISODE_BATCH_SIZE")
+    episode_summary_model: str = Field("gemini-2.5-flash-lite", env="EPISODE_SUMMARY_MODEL")
+    episode_max_attempts: int = Field(5, env="EPISODE_MAX_ATTEMPTS")
+    episode_poll_interval_s: float = Field(2.0, env="EPISODE_POLL_INTERVAL_S")
+    episode_lock_timeout_s: float = Field(300.0, env="EPISODE_LOCK_TIMEOUT_S")
+    episode_drain_timeout_s: float = Field(10.0, env="EPISODE_DRAIN_TIMEOUT_S")
+
+    # Limitador de pedidos e circuit breaker do Vertex (por processo worker)
+    vertex_embed_rate_per_s: float = Field(20.0, env="VERTEX_EMBED_RATE_PER_S")
+    vertex_embed_burst: int = Field(40, env="VERTEX_EMBED_BURST")
+    vertex_search_rate_per_s: float = Field(5.0, env="VERTEX_SEARCH_RATE_PER_S")
+    vertex_search_burst: int = Field(10, env="VERTEX_SEARCH_BURST")
+    vertex_generate_rate_per_s: float = Field(5.0, env="VERTEX_GENERATE_RATE_PER_S")
+    vertex_generate_burst: int = Field(10, env="VERTEX_GENERATE_BURST")
+    vertex_live_connect_rate_per_s: float = Field(5.0, env="VERTEX_LIVE_CONNECT_RATE_PER_S")
+    vertex_live_connect_burst: int = Field(20, env="VERTEX_LIVE_CONNECT_BURST")
+    vertex_max_queue: int = Field(1000, env="VERTEX_MAX_QUEUE")
+    vertex_interactive_max_wait_s: float = Field(2.0, env="VERTEX_INTERACTIVE_MAX_WAIT_S")
+    vertex_background_max_wait_s: float = Field(60.0, env="VERTEX_BACKGROUND_MAX_WAIT_S")
+    vertex_breaker_failures: int = Field(5, env="VERTEX_BREAKER_FAILURES")
+    vertex_breaker_reset_s: float = Field(30.0, env="VERTEX_BREAKER_RESET_S")
+
     @property
     def postgres_dsn(self) -> str:
         """Retorna a DSN de conexão PostgreSQL."""
@@ -2,5 +2,6 @@
 
 from .connection import DatabaseConnection, get_db
 from .memory_store import MemoryStore
+from .reembed import ReEmbedder
 
-__all__ = ["DatabaseConnection", "get_db", "MemoryStore"]
+__all__ = ["DatabaseConnection", "get_db", "MemoryStore", "ReEmbedder"]
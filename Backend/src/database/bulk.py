@@ -0,0 +1,296 @@
+"""Importação e exportação em massa de memórias (JSONL).
+
+Importação: os registos são lidos em lotes; os embeddings de cada lote são
+gerados num só pedido e o lote é copiado com `COPY` para
+`memory_import_staging` e junto a `user_memories` com um único statement
+(`import_merge`), com a mesma deduplicação de `MemoryStore.add_memory`
+(utilizador, categoria, tipo e nome da entidade). O embedding do lote
+seguinte é gerado enquanto o anterior é gravado.
+
+Exportação: as memórias de cada utilizador são lidas com um cursor do lado
+do servidor e escritas linha a linha num ficheiro `<user_id>.jsonl`, sem
+carregar tudo em memória. O formato é o mesmo da importação.
+
+Uso:
+    python -m src.database.bulk import residentes.jsonl
+    python -m src.database.bulk export --out exports/ --user-id u1 --user-id u2
+    python -m src.database.bulk export --out exports/ --all
+
+Cada linha da importação é um objeto JSON com `user_id`, `category`,
+`entity_type`, `content` e, opcionalmente, `entity_name`, `importance` e
+`metadata`.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from typing import Optional, Dict, Any, List, Iterable, Iterator, AsyncIterator, Tuple
+
+import structlog
+
+from src.config import settings
+from src.vertex import priority, Priority
+from .connection import DatabaseConnection
+from .memory_store import MemoryStore, MemoryCategory
+
+logger = structlog.get_logger(__name__)
+
+STAGING_COLUMNS = [
+    "batch_id", "ord", "user_id", "category", "entity_type",
+    "entity_name", "content", "importance", "metadata", "embedding",
+]
+CATEGORIES = {category.value for category in MemoryCategory}
+
+
+class InvalidRecord(ValueError):
+    """Registo de importação inválido."""
+
+
+def normalize_record(data: Any) -> Dict[str, Any]:
+    """Valida um registo de importação e preenche os valores por omissão."""
+    if isinstance(data, InvalidRecord):
+        # Linha que nem chegou a ser lida (ver read_jsonl)
+        raise data
+    if not isinstance(data, dict):
+        raise InvalidRecord(f"o registo não é um objeto JSON ({type(data).__name__})")
+    missing = [f for f in ("user_id", "category", "entity_type", "content") if not data.get(f)]
+    if missing:
+        raise InvalidRecord(f"campos em falta: {', '.join(missing)}")
+    if data["category"] not in CATEGORIES:
+        raise InvalidRecord(f"categoria inválida: {data['category']}")
+    try:
+        importance = min(10, max(1, int(data.get("importance", 5))))
+    except (TypeError, ValueError):
+        raise InvalidRecord(f"importância inválida: {data.get('importance')}")
+    return {
+        "user_id": str(data["user_id"]),
+        "category": data["category"],
+        "entity_type": str(data["entity_type"])[:100],
+        "entity_name": str(data["entity_name"])[:255] if data.get("entity_name") else None,
+        "content": str(data["content"]),
+        "importance": importance,
+        "metadata": data.get("metadata") or {},
+    }
+
+
+def read_jsonl(path: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Lê um ficheiro JSONL linha a linha: (número da linha, objeto).
+
+    Uma linha com JSON inválido dá um `InvalidRecord` no lugar do objeto,
+    para ser contada como inválida sem interromper a importação.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, InvalidRecord(f"JSON inválido: {e.msg} (coluna {e.colno})")
+
+
+def _batches(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class BulkMemoryIO:
+    """Importação/exportação em massa de memórias."""
+
+    def __init__(self, memory_store: Optional[MemoryStore] = None):
+        self.memory_store = memory_store or MemoryStore()
+
+    async def import_records(
+        self,
+        records: Iterable[Tuple[int, Any]],
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Importa registos (número da linha, objeto) em lotes.
+
+        Returns:
+            Relatório com contagens e memórias por segundo
+        """
+        batch_size = batch_size or settings.bulk_import_batch_size
+        report = {"records": 0, "inserted": 0, "updated": 0, "invalid": 0, "batches": 0}
+        started = time.perf_counter()
+
+        def valid_records() -> Iterator[Dict[str, Any]]:
+            for line_number, data in records:
+                report["records"] += 1
+                try:
+                    yield normalize_record(data)
+                except InvalidRecord as e:
+                    report["invalid"] += 1
+                    logger.warning("Registo de importação ignorado", line=line_number, error=str(e))
+
+        # O embedding do lote seguinte sobrepõe-se à escrita do anterior
+        write_task: Optional[asyncio.Task] = None
+        try:
+            for batch in _batches(valid_records(), batch_size):
+                embeddings, model = await self.memory_store._generate_embeddings(
+                    [
+                        f"{r['category']} {r['entity_type']} {r['entity_name'] or ''} {r['content']}"
+                        for r in batch
+                    ]
+                )
+                if write_task is not None:
+                    self._add_counts(report, await write_task)
+                write_task = asyncio.create_task(self._write_batch(batch, embeddings, model))
+            if write_task is not None:
+                self._add_counts(report, await write_task)
+                write_task = None
+        finally:
+            if write_task is not None and not write_task.done():
+                write_task.cancel()
+
+        elapsed = time.perf_counter() - started
+        imported = report["inserted"] + report["updated"]
+        report["elapsed_s"] = round(elapsed, 2)
+        report["memories_per_s"] = round(imported / elapsed, 1) if elapsed > 0 else 0.0
+        logger.info("Importação de memórias concluída", **report)
+        return report
+
+    @staticmethod
+    def _add_counts(report: Dict[str, Any], counts: Dict[str, int]) -> None:
+        report["inserted"] += counts["inserted"]
+        report["updated"] += counts["updated"]
+        report["batches"] += 1
+
+    async def _write_batch(
+        self,
+        batch: List[Dict[str, Any]],
+        embeddings: List[Optional[List[float]]],
+        model: Optional[str],
+    ) -> Dict[str, int]:
+        """COPY do lote para a staging e merge, numa transação."""
+        batch_id = uuid.uuid4()
+        rows = [
+            (
+                batch_id,
+                index,
+                record["user_id"],
+                record["category"],
+                record["entity_type"],
+                record["entity_name"],
+                record["content"],
+                record["importance"],
+                json.dumps(record["metadata"]),
+                MemoryStore.to_vector(embedding),
+            )
+            for index, (record, embedding) in enumerate(zip(batch, embeddings))
+        ]
+        user_ids = sorted({record["user_id"] for record in batch})
+
+        with DatabaseConnection.operation("bulk_import"):
+            async with DatabaseConnection.acquire("import_merge") as conn:
+                async with conn.transaction():
+                    await conn.copy_records_to_table(
+                        "memory_import_staging", records=rows, columns=STAGING_COLUMNS
+                    )
+                    await (await conn.prepared("users_create_many")).fetch(user_ids)
+                    counts = await (await conn.prepared("import_merge")).fetchrow(batch_id, model)
+                    await (await conn.prepared("import_clear")).fetch(batch_id)
+
+        for user_id in user_ids:
+            DatabaseConnection.mark_write(user_id)
+        return {"inserted": counts["inserted"], "updated": counts["updated"]}
+
+    async def iter_user_ids(self) -> AsyncIterator[str]:
+        """Todos os utilizadores, via cursor do lado do servidor."""
+        async with DatabaseConnection.acquire("export_user_ids") as conn:
+            async with conn.transaction():
+                statement = await conn.prepared("export_user_ids")
+                async for row in statement.cursor(prefetch=settings.bulk_export_prefetch):
+                    yield row["user_id"]
+
+    async def iter_memories(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Memórias ativas de um utilizador, no formato de importação."""
+        async with DatabaseConnection.acquire("memory_export") as conn:
+            async with conn.transaction():
+                statement = await conn.prepared("memory_export")
+                async for row in statement.cursor(user_id, prefetch=settings.bulk_export_prefetch):
+                    metadata = row["metadata"]
+                    yield {
+                        "user_id": user_id,
+                        "category": row["category"],
+                        "entity_type": row["entity_type"],
+                        "entity_name": row["entity_name"],
+                        "content": row["content"],
+                        "importance": row["importance"],
+                        "metadata": json.loads(metadata) if isinstance(metadata, str) else metadata,
+                        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+                        "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+                    }
+
+    async def export_user(self, user_id: str, out_dir: str) -> int:
+        """Escreve as memórias de um utilizador em `<out_dir>/<user_id>.jsonl`."""
+        path = os.path.join(out_dir, f"{user_id.replace(os.sep, '_')}.jsonl")
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            async for record in self.iter_memories(user_id):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    async def export_users(self, user_ids: Iterable[str], out_dir: str) -> Dict[str, Any]:
+        """Exporta vários utilizadores (um ficheiro por utilizador)."""
+        os.makedirs(out_dir, exist_ok=True)
+        report = {"users": 0, "memories": 0}
+        started = time.perf_counter()
+        with DatabaseConnection.operation("bulk_export"):
+            for user_id in user_ids:
+                report["memories"] += await self.export_user(user_id, out_dir)
+                report["users"] += 1
+        elapsed = time.perf_counter() - started
+        report["elapsed_s"] = round(elapsed, 2)
+        report["memories_per_s"] = round(report["memories"] / elapsed, 1) if elapsed > 0 else 0.0
+        logger.info("Exportação de memórias concluída", **report)
+        return report
+
+    async def export_all(self, out_dir: str) -> Dict[str, Any]:
+        """Exporta todos os utilizadores."""
+        user_ids = [user_id async for user_id in self.iter_user_ids()]
+        return await self.export_users(user_ids, out_dir)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    bulk = BulkMemoryIO()
+    try:
+        # A importação precisa da tabela de staging (migração 0002)
+        await DatabaseConnection.migrate()
+        if args.command == "import":
+            # Embeddings em BACKGROUND: cedem o Vertex às conversas em curso
+            with priority(Priority.BACKGROUND):
+                report = await bulk.import_records(read_jsonl(args.path), batch_size=args.batch_size)
+        elif args.all:
+            report = await bulk.export_all(args.out)
+        else:
+            report = await bulk.export_users(args.user_id or [], args.out)
+        print(json.dumps(report))
+    finally:
+        await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importação/exportação em massa de memórias")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="importa um ficheiro JSONL")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--batch-size", type=int, default=None)
+
+    export_parser = commands.add_parser("export", help="exporta memórias para JSONL por utilizador")
+    export_parser.add_argument("--out", required=True, help="diretório de destino")
+    target = export_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--user-id", action="append")
+    target.add_argument("--all", action="store_true")
+
+    asyncio.run(_main(parser.parse_args()))
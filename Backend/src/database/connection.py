@@ -1,23 +1,117 @@
 """Gestão de conexão assíncrona ao PostgreSQL."""
 
 import asyncio
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Optional
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Optional, Dict, Any, Iterable, Iterator
 
 import asyncpg
 from asyncpg import Pool
+from asyncpg.prepared_stmt import PreparedStatement
 import structlog
 
 from src.config import settings
+from src.observability import Histogram, tracing
+from .migrations import migrate
+from .replicas import Replica, ReplicaRouter, REPLICA_ERRORS, parse_replica_hosts
+from .statements import REPLICA_STATEMENTS, STATEMENTS
 
 logger = structlog.get_logger(__name__)
 
+# Operação de alto nível em curso (ver DatabaseConnection.operation)
+_current_operation: ContextVar[Optional[str]] = ContextVar("db_operation", default=None)
+
+
+def _operation_key(statement: str) -> str:
+    """Chave das métricas: "operação:statement" ou só o statement."""
+    operation = _current_operation.get()
+    return f"{operation}:{statement}" if operation else statement
+
+
+class PoolMetrics:
+    """Histogramas de espera por conexão e de tempo de query, por operação."""
+
+    def __init__(self):
+        self.acquire_ms: Dict[str, Histogram] = {}
+        self.query_ms: Dict[str, Histogram] = {}
+        # Conexões em uso no momento de cada acquire (inclui a própria)
+        self.in_use = Histogram(buckets=range(1, settings.postgres_pool_max_size + 1))
+        self.acquire_timeouts = 0
+
+    def observe_acquire(self, key: str, wait_ms: float, in_use: int) -> None:
+        histogram = self.acquire_ms.get(key)
+        if histogram is None:
+            histogram = self.acquire_ms[key] = Histogram()
+        histogram.observe(wait_ms)
+        self.in_use.observe(in_use)
+
+    def observe_query(self, key: str, query_ms: float) -> None:
+        histogram = self.query_ms.get(key)
+        if histogram is None:
+            histogram = self.query_ms[key] = Histogram()
+        histogram.observe(query_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "acquire_timeouts": self.acquire_timeouts,
+            "in_use": self.in_use.snapshot(),
+            "operations": {
+                key: {
+                    "acquire_ms": self.acquire_ms[key].snapshot(),
+                    "query_ms": self.query_ms[key].snapshot() if key in self.query_ms else None,
+                }
+                for key in sorted(self.acquire_ms)
+            },
+        }
+
+
+class PreparedConnection(asyncpg.Connection):
+    """Conexão com os statements de `STATEMENTS` preparados por nome."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prepared: Dict[str, PreparedStatement] = {}
+
+    async def prepare_all(self, names: Optional[Iterable[str]] = None) -> int:
+        """Prepara os statements registados, ou só `names` (os que falharem ficam para depois)."""
+        for name in STATEMENTS if names is None else names:
+            if name in self._prepared:
+                continue
+            try:
+                self._prepared[name] = await self.prepare(STATEMENTS[name])
+            except asyncpg.PostgresError:
+                # Ex.: tabela ainda não criada no primeiro arranque
+                pass
+        return len(self._prepared)
+
+    async def prepared(self, name: str) -> PreparedStatement:
+        """Statement preparado pelo nome (prepara na primeira utilização)."""
+        statement = self._prepared.get(name)
+        if statement is None:
+            statement = await self.prepare(STATEMENTS[name])
+            self._prepared[name] = statement
+        return statement
+
+
+async def _init_connection(conn: PreparedConnection) -> None:
+    """Callback `init` do pool: corre uma vez por conexão nova."""
+    await conn.prepare_all()
+
+
+async def _init_replica_connection(conn: PreparedConnection) -> None:
+    """Callback `init` dos pools das réplicas: só os statements de leitura."""
+    await conn.prepare_all(REPLICA_STATEMENTS)
+
 
 class DatabaseConnection:
     """Gestor de conexões assíncronas ao PostgreSQL com pool."""
 
     _pool: Optional[Pool] = None
     _lock: asyncio.Lock = asyncio.Lock()
+    metrics = PoolMetrics()
+    # Réplicas de leitura (None se POSTGRES_REPLICA_HOSTS estiver vazio)
+    replicas: Optional[ReplicaRouter] = None
 
     @classmethod
     async def get_pool(cls) -> Pool:
@@ -39,27 +133,24 @@ class DatabaseConnection:
                                 user=settings.postgres_user,
                                 password=settings.postgres_password,
                                 database=settings.postgres_db,
-                                min_size=2,
-                                max_size=10,
-                                command_timeout=30,
-                                connection_class=asyncpg.Connection,
+                                min_size=settings.postgres_pool_min_size,
+                                max_size=settings.postgres_pool_max_size,
+                                max_queries=settings.postgres_pool_max_queries,
+                                max_inactive_connection_lifetime=settings.postgres_pool_max_idle_s,
+                                command_timeout=settings.postgres_command_timeout_s,
+                                statement_cache_size=settings.postgres_statement_cache_size,
+                                connection_class=PreparedConnection,
+                                init=_init_connection,
                             ),
-                            timeout=10,
+                            timeout=settings.postgres_connect_timeout_s,
                         )
 
                         logger.info("✅ Pool de conexões criado com sucesso")
 
-                        # Registar o tipo vector do pgvector
-                        try:
-                            async with cls._pool.acquire() as conn:
-                                await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
-                            logger.info("✅ Extensão vector registada")
-                        except Exception as e:
-                            logger.warning("Erro ao registar extensão vector", error=str(e))
-
                     except asyncio.TimeoutError:
                         logger.error(
-                            "❌ Timeout ao conectar ao PostgreSQL (10s)",
+                            "❌ Timeout ao conectar ao PostgreSQL",
+                            timeout_s=settings.postgres_connect_timeout_s,
                             host=settings.postgres_host,
                             port=settings.postgres_port,
                         )
@@ -73,9 +164,49 @@ class DatabaseConnection:
                         raise
         return cls._pool
 
+    @classmethod
+    async def _create_replica_pool(cls, replica: Replica) -> Pool:
+        """Pool de uma réplica (mesma base de dados e credenciais do primário)."""
+        return await asyncio.wait_for(
+            asyncpg.create_pool(
+                host=replica.host,
+                port=replica.port,
+                user=settings.postgres_user,
+                password=settings.postgres_password,
+                database=settings.postgres_db,
+                min_size=1,
+                max_size=settings.postgres_replica_pool_max_size,
+                max_queries=settings.postgres_pool_max_queries,
+                max_inactive_connection_lifetime=settings.postgres_pool_max_idle_s,
+                command_timeout=settings.postgres_command_timeout_s,
+                statement_cache_size=settings.postgres_statement_cache_size,
+                connection_class=PreparedConnection,
+                init=_init_replica_connection,
+            ),
+            timeout=settings.postgres_connect_timeout_s,
+        )
+
+    @classmethod
+    async def start_replicas(cls) -> None:
+        """Liga às réplicas de leitura configuradas (se houver)."""
+        replicas = parse_replica_hosts(settings.postgres_replica_hosts)
+        if not replicas or cls.replicas is not None:
+            return
+        cls.replicas = ReplicaRouter(replicas, cls._create_replica_pool)
+        await cls.replicas.start()
+
+    @classmethod
+    def mark_write(cls, user_id: str) -> None:
+        """Regista uma escrita do utilizador (read-your-writes nas réplicas)."""
+        if cls.replicas is not None:
+            cls.replicas.mark_write(user_id)
+
     @classmethod
     async def close_pool(cls) -> None:
-        """Fecha o pool de conexões."""
+        """Fecha o pool de conexões (e os das réplicas)."""
+        if cls.replicas is not None:
+            await cls.replicas.stop()
+            cls.replicas = None
         if cls._pool is not None:
             async with cls._lock:
                 if cls._pool is not None:
@@ -83,60 +214,182 @@ class DatabaseConnection:
                     cls._pool = None
                     logger.info("Pool de conexões fechado")
 
+    @classmethod
+    @contextmanager
+    def operation(cls, name: str) -> Iterator[None]:
+        """Etiqueta as queries feitas dentro do bloco (ex.: "session_start")."""
+        token = _current_operation.set(name)
+        try:
+            yield
+        finally:
+            _current_operation.reset(token)
+
     @classmethod
     @asynccontextmanager
-    async def acquire(cls) -> AsyncGenerator[asyncpg.Connection, None]:
-        """Context manager para obter uma conexão do pool."""
-        pool = await cls.get_pool()
-        async with pool.acquire() as connection:
+    async def acquire(
+        cls, statement: str = "raw", replica: Optional[Replica] = None
+    ) -> AsyncGenerator[asyncpg.Connection, None]:
+        """Context manager para obter uma conexão do pool (com métricas de espera)."""
+        if replica is not None:
+            pool = replica.pool
+            key = _operation_key(statement) + "@replica"
+        else:
+            pool = await cls.get_pool()
+            key = _operation_key(statement)
+        started = time.perf_counter()
+        try:
+            with tracing.span("db.acquire"):
+                connection = await pool.acquire(timeout=settings.postgres_acquire_timeout_s)
+        except asyncio.TimeoutError:
+            cls.metrics.acquire_timeouts += 1
+            logger.error(
+                "Timeout à espera de conexão PostgreSQL",
+                operation=key,
+                timeout_s=settings.postgres_acquire_timeout_s,
+                **cls.pool_usage(),
+            )
+            raise
+        cls.metrics.observe_acquire(
+            key, (time.perf_counter() - started) * 1000, pool.get_size() - pool.get_idle_size()
+        )
+        try:
             yield connection
+        finally:
+            await pool.release(connection)
+
+    @classmethod
+    @asynccontextmanager
+    async def _query(
+        cls, statement: str, replica: Optional[Replica] = None
+    ) -> AsyncGenerator[asyncpg.Connection, None]:
+        """Conexão para uma query, medindo o tempo de execução."""
+        with tracing.span("db.query", statement=statement, replica=replica is not None):
+            async with cls.acquire(statement, replica) as conn:
+                started = time.perf_counter()
+                try:
+                    yield conn
+                finally:
+                    cls.metrics.observe_query(
+                        _operation_key(statement) + ("@replica" if replica else ""),
+                        (time.perf_counter() - started) * 1000,
+                    )
 
     @classmethod
     async def execute(cls, query: str, *args) -> str:
         """Executa uma query sem retorno."""
-        async with cls.acquire() as conn:
+        async with cls._query("raw") as conn:
             return await conn.execute(query, *args)
 
     @classmethod
     async def fetch(cls, query: str, *args) -> list:
         """Executa uma query e retorna todos os resultados."""
-        async with cls.acquire() as conn:
+        async with cls._query("raw") as conn:
             return await conn.fetch(query, *args)
 
     @classmethod
     async def fetchrow(cls, query: str, *args) -> Optional[asyncpg.Record]:
         """Executa uma query e retorna uma linha."""
-        async with cls.acquire() as conn:
+        async with cls._query("raw") as conn:
             return await conn.fetchrow(query, *args)
 
     @classmethod
     async def fetchval(cls, query: str, *args):
         """Executa uma query e retorna um valor."""
-        async with cls.acquire() as conn:
+        async with cls._query("raw") as conn:
             return await conn.fetchval(query, *args)
 
     @classmethod
-    async def init_schema(cls) -> None:
-        """Inicializa o schema da base de dados."""
-        import os
+    async def fetch_prepared(cls, name: str, *args) -> list:
+        """Executa um statement registado e retorna todos os resultados."""
+        async with cls._query(name) as conn:
+            return await (await conn.prepared(name)).fetch(*args)
 
-        schema_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            "sql",
-            "schema.sql",
-        )
+    @classmethod
+    async def fetchrow_prepared(cls, name: str, *args) -> Optional[asyncpg.Record]:
+        """Executa um statement registado e retorna uma linha."""
+        async with cls._query(name) as conn:
+            return await (await conn.prepared(name)).fetchrow(*args)
 
-        if os.path.exists(schema_path):
-            with open(schema_path, "r", encoding="utf-8") as f:
-                schema_sql = f.read()
+    @classmethod
+    async def fetchval_prepared(cls, name: str, *args):
+        """Executa um statement registado e retorna um valor."""
+        async with cls._query(name) as conn:
+            return await (await conn.prepared(name)).fetchval(*args)
 
-            async with cls.acquire() as conn:
-                await conn.execute(schema_sql)
-                logger.info("Schema da base de dados inicializado")
-        else:
-            logger.warning(
-                "Ficheiro de schema não encontrado", path=schema_path
-            )
+    @classmethod
+    async def execute_prepared(cls, name: str, *args) -> str:
+        """Executa um statement registado sem retorno; retorna o status (ex.: "UPDATE 1")."""
+        async with cls._query(name) as conn:
+            statement = await conn.prepared(name)
+            await statement.fetch(*args)
+            return statement.get_statusmsg()
+
+    @classmethod
+    async def executemany_prepared(cls, name: str, args: Iterable[tuple]) -> None:
+        """Executa um statement registado para várias linhas de parâmetros."""
+        async with cls._query(name) as conn:
+            await (await conn.prepared(name)).executemany(args)
+
+    @classmethod
+    async def _read(cls, method: str, name: str, args: tuple, user_id: Optional[str]):
+        """Leitura numa réplica elegível, ou no primário (sem réplica ou se falhar)."""
+        replica = cls.replicas.pick(user_id) if cls.replicas is not None else None
+        if replica is not None:
+            try:
+                async with cls._query(name, replica) as conn:
+                    return await getattr(await conn.prepared(name), method)(*args)
+            except REPLICA_ERRORS as e:
+                cls.replicas.mark_failed(replica, e)
+        async with cls._query(name) as conn:
+            return await getattr(await conn.prepared(name), method)(*args)
+
+    @classmethod
+    async def fetch_read(cls, name: str, *args, user_id: Optional[str] = None) -> list:
+        """Como `fetch_prepared`, mas pode ler de uma réplica.
+
+        `user_id` aplica read-your-writes: após `mark_write(user_id)` as
+        leituras desse utilizador vão ao primário durante algum tempo.
+        """
+        return await cls._read("fetch", name, args, user_id)
+
+    @classmethod
+    async def fetchrow_read(
+        cls, name: str, *args, user_id: Optional[str] = None
+    ) -> Optional[asyncpg.Record]:
+        """Como `fetchrow_prepared`, mas pode ler de uma réplica."""
+        return await cls._read("fetchrow", name, args, user_id)
+
+    @classmethod
+    def pool_usage(cls) -> Dict[str, int]:
+        """Ocupação atual do pool."""
+        if cls._pool is None:
+            return {"pool_size": 0, "pool_in_use": 0, "pool_max": settings.postgres_pool_max_size}
+        size = cls._pool.get_size()
+        return {
+            "pool_size": size,
+            "pool_in_use": size - cls._pool.get_idle_size(),
+            "pool_max": cls._pool.get_max_size(),
+        }
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Ocupação do pool e histogramas por operação."""
+        stats = {**cls.pool_usage(), **cls.metrics.snapshot()}
+        if cls.replicas is not None:
+            stats["replicas"] = cls.replicas.snapshot()
+        return stats
+
+    @classmethod
+    async def migrate(cls) -> Dict[str, Any]:
+        """Aplica as migrações pendentes do schema (ver `migrations.py`)."""
+        async with cls.acquire() as conn:
+            report = await migrate(conn)
+
+        if report["applied"]:
+            # Reabrir as conexões para prepararem os statements sobre o schema atual
+            pool = await cls.get_pool()
+            await pool.expire_connections()
+        return report
 
 
 async def get_db() -> DatabaseConnection:
@@ -1,21 +1,32 @@
-"""Memory Store - Gestão de memórias do utilizador com pgvector."""
+"""Memory Store - Gestão de memórias do utilizador.
+
+O armazenamento fica num `MemoryBackend` (`settings.memory_backend`):
+PostgreSQL + pgvector em produção, ou em memória no modo de nó único.
+"""
 
-import os
-import json
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from enum import Enum
 
 import structlog
-from google import genai
 
-from .connection import DatabaseConnection
 from src.config import settings
+from src.embeddings import EmbeddingProvider, get_embedding_provider, get_fallback_provider
+from src.observability import tracing
+from .storage import MemoryBackend, get_memory_backend
+from .storage.postgres import to_vector
 
 logger = structlog.get_logger(__name__)
 
 
+def _without_zero_vectors(
+    embeddings: List[List[float]],
+) -> List[Optional[List[float]]]:
+    """Vetores de norma zero passam a None: o cosseno não está definido."""
+    return [embedding if any(embedding) else None for embedding in embeddings]
+
+
 class MemoryCategory(str, Enum):
     """Categorias de memória do utilizador."""
 
@@ -60,53 +71,89 @@ class Memory:
 class MemoryStore:
     """Gestor de memórias do utilizador com suporte a busca semântica."""
 
-    def __init__(self):
-        self._embedding_model = "text-embedding-004"
-        self._client = None
-
-    async def _get_client(self):
-        """Obtém o cliente Gemini para embeddings (Vertex AI)."""
-        if self._client is None:
-            # Configurar credenciais Vertex AI
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
+    # Embeddings que falharam e ficaram pendentes (todas as instâncias do processo)
+    embedding_failures = 0
+    # Embeddings gerados pelo fornecedor do modo degradado
+    embedding_fallbacks = 0
 
-            self._client = genai.Client(
-                vertexai=True,
-                project=settings.google_cloud_project,
-                location=settings.google_cloud_region,
-            )
-        return self._client
-
-    async def _generate_embedding(self, text: str) -> List[float]:
-        """Gera embedding para um texto usando Gemini."""
+    def __init__(
+        self,
+        provider: Optional[EmbeddingProvider] = None,
+        fallback: Optional[EmbeddingProvider] = None,
+        backend: Optional[MemoryBackend] = None,
+    ):
+        self.backend = backend or get_memory_backend(settings.memory_backend)
+        self.provider = provider or get_embedding_provider(settings.embedding_provider)
+        self.fallback = fallback or get_fallback_provider(settings.embedding_fallback_provider)
+        self._embedding_model = self.provider.model
+
+    @property
+    def embedding_model(self) -> str:
+        """Modelo usado para os embeddings novos (gravado em `embedding_model`)."""
+        return self._embedding_model
+
+    async def embed_batch(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Gera embeddings para vários textos num único pedido (sem fallback)."""
+        return await self.provider.embed(texts, model=model)
+
+    async def _generate_embedding(self, text: str) -> Tuple[Optional[List[float]], Optional[str]]:
+        """Gera embedding para um texto: (vetor, modelo), ou (None, None) se falhar."""
+        embeddings, model = await self._generate_embeddings([text])
+        if embeddings[0] is None:
+            return None, None
+        return embeddings[0], model
+
+    @tracing.traced("embedding")
+    async def _generate_embeddings(
+        self, texts: List[str]
+    ) -> Tuple[List[Optional[List[float]]], Optional[str]]:
+        """
+        Gera embeddings para vários textos num único pedido.
+
+        Returns:
+            (vetores, modelo que os gerou). Se o fornecedor principal falhar,
+            usa o do modo degradado, se configurado (o ReEmbedder recalcula
+            esses vetores mais tarde); sem ele, os vetores ficam None
+            (pendentes) e o modelo None. Vetores de norma zero (ex.: texto
+            só com palavras funcionais no fornecedor local) também ficam None.
+        """
+        if not texts:
+            return [], self._embedding_model
         try:
-            client = await self._get_client()
-            result = await client.aio.models.embed_content(
-                model=self._embedding_model,
-                contents=text,
-            )
-            return result.embeddings[0].values
+            return _without_zero_vectors(await self.embed_batch(texts)), self._embedding_model
         except Exception as e:
-            logger.error("Erro ao gerar embedding", error=str(e))
-            return [0.0] * 768
+            error = e
+
+        if self.fallback is not None:
+            try:
+                embeddings = await self.fallback.embed(texts)
+            except Exception as e:
+                logger.error("Erro no fornecedor de embeddings degradado", error=str(e))
+            else:
+                MemoryStore.embedding_fallbacks += len(texts)
+                logger.warning(
+                    "Embeddings gerados em modo degradado",
+                    error=str(error),
+                    model=self.fallback.model,
+                    count=len(texts),
+                )
+                return _without_zero_vectors(embeddings), self.fallback.model
+
+        MemoryStore.embedding_failures += len(texts)
+        logger.error("Erro ao gerar embeddings", error=str(error), count=len(texts))
+        return [None for _ in texts], None
 
+    # Formato de texto do pgvector (usado pela importação em massa)
+    to_vector = staticmethod(to_vector)
+
+    @tracing.traced("memory.ensure_user_exists")
     async def ensure_user_exists(self, user_id: str, name: Optional[str] = None) -> None:
         """Garante que o perfil do utilizador existe."""
-        existing = await DatabaseConnection.fetchrow(
-            "SELECT id FROM user_profiles WHERE user_id = $1", user_id
-        )
-        if not existing:
-            await DatabaseConnection.execute(
-                """
-                INSERT INTO user_profiles (user_id, name)
-                VALUES ($1, $2)
-                ON CONFLICT (user_id) DO NOTHING
-                """,
-                user_id,
-                name,
-            )
+        if not await self.backend.user_exists(user_id):
+            await self.backend.create_user(user_id, name)
             logger.info("Perfil de utilizador criado", user_id=user_id)
 
+    @tracing.traced("memory.add_memory")
     async def add_memory(
         self,
         user_id: str,
@@ -137,26 +184,18 @@ class MemoryStore:
 
         # Gerar embedding para busca semântica
         embedding_text = f"{category} {entity_type} {entity_name or ''} {content}"
-        embedding = await self._generate_embedding(embedding_text)
-
-        # Converter embedding para string PostgreSQL
-        embedding_str = f"[{','.join(map(str, embedding))}]"
-
-        row = await DatabaseConnection.fetchrow(
-            """
-            INSERT INTO user_memories
-            (user_id, category, entity_type, entity_name, content, importance, embedding, metadata)
-            VALUES ($1, $2, $3, $4, $5, $6, $7::vector, $8)
-            RETURNING id, created_at, updated_at
-            """,
+        embedding, model = await self._generate_embedding(embedding_text)
+
+        row = await self.backend.insert_memory(
             user_id,
             category,
             entity_type,
             entity_name,
             content,
             importance,
-            embedding_str,
-            json.dumps(metadata or {}),
+            embedding,
+            metadata or {},
+            model,
         )
 
         logger.info(
@@ -187,37 +226,9 @@ class MemoryStore:
         entity_name: Optional[str],
     ) -> Optional[Memory]:
         """Encontra memória similar existente."""
-        if entity_name:
-            row = await DatabaseConnection.fetchrow(
-                """
-                SELECT id, content, importance, metadata, created_at, updated_at
-                FROM user_memories
-                WHERE user_id = $1
-                  AND category = $2
-                  AND entity_type = $3
-                  AND entity_name = $4
-                  AND is_active = TRUE
-                """,
-                user_id,
-                category,
-                entity_type,
-                entity_name,
-            )
-        else:
-            row = await DatabaseConnection.fetchrow(
-                """
-                SELECT id, content, importance, metadata, created_at, updated_at
-                FROM user_memories
-                WHERE user_id = $1
-                  AND category = $2
-                  AND entity_type = $3
-                  AND entity_name IS NULL
-                  AND is_active = TRUE
-                """,
-                user_id,
-                category,
-                entity_type,
-            )
+        row = await self.backend.find_similar_memory(
+            user_id, category, entity_type, entity_name or None
+        )
 
         if row:
             return Memory(
@@ -234,6 +245,7 @@ class MemoryStore:
             )
         return None
 
+    @tracing.traced("memory.update_memory")
     async def update_memory(
         self,
         memory_id: int,
@@ -241,52 +253,31 @@ class MemoryStore:
         importance: Optional[int] = None,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> Optional[Memory]:
-        """Atualiza uma memória existente."""
-        updates = []
-        params = []
-        param_count = 1
+        """Atualiza uma memória existente (campos None ficam inalterados)."""
+        if content is None and importance is None and metadata is None:
+            return None
 
+        embedding = None
+        embedding_model = self._embedding_model
+        embedding_pending = False
         if content is not None:
-            updates.append(f"content = ${param_count}")
-            params.append(content)
-            param_count += 1
-
             # Atualizar embedding
-            row = await DatabaseConnection.fetchrow(
-                "SELECT category, entity_type, entity_name FROM user_memories WHERE id = $1",
-                memory_id,
-            )
+            row = await self.backend.memory_embedding_source(memory_id)
             if row:
                 embedding_text = f"{row['category']} {row['entity_type']} {row['entity_name'] or ''} {content}"
-                embedding = await self._generate_embedding(embedding_text)
-                embedding_str = f"[{','.join(map(str, embedding))}]"
-                updates.append(f"embedding = ${param_count}::vector")
-                params.append(embedding_str)
-                param_count += 1
-
-        if importance is not None:
-            updates.append(f"importance = ${param_count}")
-            params.append(importance)
-            param_count += 1
-
-        if metadata is not None:
-            updates.append(f"metadata = ${param_count}")
-            params.append(json.dumps(metadata))
-            param_count += 1
-
-        if not updates:
-            return None
-
-        params.append(memory_id)
-        query = f"""
-            UPDATE user_memories
-            SET {', '.join(updates)}
-            WHERE id = ${param_count}
-            RETURNING id, user_id, category, entity_type, entity_name, content,
-                      importance, metadata, created_at, updated_at
-        """
+                embedding, embedding_model = await self._generate_embedding(embedding_text)
+                # O embedding antigo já não corresponde ao conteúdo
+                embedding_pending = embedding is None
 
-        row = await DatabaseConnection.fetchrow(query, *params)
+        row = await self.backend.update_memory(
+            memory_id,
+            content,
+            embedding,
+            importance,
+            metadata,
+            embedding_model,
+            embedding_pending,
+        )
 
         if row:
             logger.info("Memória atualizada", memory_id=memory_id)
@@ -304,52 +295,54 @@ class MemoryStore:
             )
         return None
 
+    @tracing.traced("memory.delete_memory")
     async def delete_memory(self, memory_id: int) -> bool:
         """Marca uma memória como inativa (soft delete)."""
-        result = await DatabaseConnection.execute(
-            "UPDATE user_memories SET is_active = FALSE WHERE id = $1",
-            memory_id,
-        )
-        deleted = result == "UPDATE 1"
+        deleted = await self.backend.deactivate_memory(memory_id) is not None
         if deleted:
             logger.info("Memória eliminada", memory_id=memory_id)
         return deleted
 
+    @tracing.traced("memory.search_memories")
     async def search_memories(
         self,
         user_id: str,
         query: str,
         category: Optional[str] = None,
         limit: int = 10,
-        min_similarity: float = 0.5,
+        min_similarity: Optional[float] = None,
     ) -> List[Memory]:
-        """Busca memórias semanticamente similares."""
-        embedding = await self._generate_embedding(query)
-        embedding_str = f"[{','.join(map(str, embedding))}]"
-
-        category_filter = ""
-        params = [user_id, embedding_str, min_similarity, limit]
-
-        if category:
-            category_filter = "AND category = $5"
-            params.append(category)
-
-        rows = await DatabaseConnection.fetch(
-            f"""
-            SELECT
-                id, user_id, category, entity_type, entity_name, content,
-                importance, metadata, created_at, updated_at,
-                1 - (embedding <=> $2::vector) as similarity
-            FROM user_memories
-            WHERE user_id = $1
-              AND is_active = TRUE
-              AND 1 - (embedding <=> $2::vector) >= $3
-              {category_filter}
-            ORDER BY similarity DESC
-            LIMIT $4
-            """,
-            *params,
-        )
+        """
+        Busca memórias semanticamente similares.
+
+        Se o embedding da query falhar, usa pesquisa por texto. Se a pesquisa
+        semântica não encher `limit`, completa com memórias de embedding
+        pendente encontradas por texto. Em modo degradado (embedding da query
+        gerado pelo fornecedor de reserva) só as memórias gravadas também em
+        modo degradado são comparáveis, pelo que o texto completa com todas.
+        """
+        embedding, model = await self._generate_embedding(query)
+        degraded = self.fallback is not None and model == self.fallback.model
+        if min_similarity is None:
+            # Limiar por omissão do fornecedor que gerou o embedding da query
+            min_similarity = (self.fallback if degraded else self.provider).min_similarity
+
+        if embedding is None:
+            rows = await self._search_lexical(user_id, query, category, limit, pending_only=False)
+        else:
+            rows = await self.backend.search_memories(
+                user_id, embedding, min_similarity, limit, category or None, model
+            )
+            if len(rows) < limit:
+                found = {row["id"] for row in rows}
+                pending = await self._search_lexical(
+                    user_id,
+                    query,
+                    category,
+                    limit - len(rows),
+                    pending_only=not degraded,
+                )
+                rows = list(rows) + [row for row in pending if row["id"] not in found]
 
         memories = []
         for row in rows:
@@ -374,27 +367,31 @@ class MemoryStore:
             user_id=user_id,
             query=query[:50],
             results=len(memories),
+            lexical=embedding is None,
+            degraded=degraded,
         )
         return memories
 
+    async def _search_lexical(
+        self,
+        user_id: str,
+        query: str,
+        category: Optional[str],
+        limit: int,
+        pending_only: bool,
+    ) -> list:
+        """Pesquisa por texto (sem embeddings)."""
+        return await self.backend.search_lexical(
+            user_id, query, limit, category or None, pending_only
+        )
+
+    @tracing.traced("memory.get_user_profile")
     async def get_user_profile(self, user_id: str) -> Dict[str, Any]:
         """Obtém o perfil consolidado do utilizador com todas as memórias ativas."""
         await self.ensure_user_exists(user_id)
 
-        profile_row = await DatabaseConnection.fetchrow(
-            "SELECT name, location, created_at FROM user_profiles WHERE user_id = $1",
-            user_id,
-        )
-
-        memories = await DatabaseConnection.fetch(
-            """
-            SELECT category, entity_type, entity_name, content, importance
-            FROM user_memories
-            WHERE user_id = $1 AND is_active = TRUE
-            ORDER BY category, importance DESC
-            """,
-            user_id,
-        )
+        profile_row = await self.backend.get_profile(user_id)
+        memories = await self.backend.profile_memories(user_id)
 
         # Organizar memórias por categoria
         categorized: Dict[str, List[Dict]] = {}
@@ -421,6 +418,7 @@ class MemoryStore:
             "memorias": categorized,
         }
 
+    @tracing.traced("memory.save_episode")
     async def save_episode(
         self,
         user_id: str,
@@ -435,52 +433,56 @@ class MemoryStore:
         """Guarda um episódio de conversa."""
         await self.ensure_user_exists(user_id)
 
-        embedding = await self._generate_embedding(summary)
-        embedding_str = f"[{','.join(map(str, embedding))}]"
-
-        row = await DatabaseConnection.fetchrow(
-            """
-            INSERT INTO conversation_episodes
-            (user_id, session_id, summary, key_topics, emotional_tone,
-             embedding, started_at, duration_minutes, metadata)
-            VALUES ($1, $2, $3, $4, $5, $6::vector, $7, $8, $9)
-            RETURNING id
-            """,
+        embedding, model = await self._generate_embedding(summary)
+
+        episode_id = await self.backend.insert_episode(
             user_id,
             session_id,
             summary,
             key_topics,
             emotional_tone,
-            embedding_str,
+            embedding,
             started_at,
             duration_minutes,
-            json.dumps(metadata or {}),
+            metadata or {},
+            model,
         )
 
         logger.info(
             "Episódio de conversa guardado",
             user_id=user_id,
             session_id=session_id,
-            episode_id=row["id"],
+            episode_id=episode_id,
         )
-        return row["id"]
+        return episode_id
 
+    @tracing.traced("memory.save_episodes")
+    async def save_episodes(self, episodes: List[Dict[str, Any]]) -> int:
+        """
+        Guarda vários episódios de uma vez (embeddings num só pedido e
+        inserção numa única transação no backend).
+
+        Cada episódio tem as chaves de `save_episode` mais `ended_at`.
+        """
+        if not episodes:
+            return 0
+
+        embeddings, model = await self._generate_embeddings([ep["summary"] for ep in episodes])
+        await self.backend.insert_episodes(
+            [
+                {**ep, "embedding": embedding, "model": model if embedding is not None else None}
+                for ep, embedding in zip(episodes, embeddings)
+            ]
+        )
+        logger.info("Episódios de conversa guardados", count=len(episodes))
+        return len(episodes)
+
+    @tracing.traced("memory.get_recent_episodes")
     async def get_recent_episodes(
         self, user_id: str, limit: int = 5
     ) -> List[Dict[str, Any]]:
         """Obtém os episódios de conversa mais recentes."""
-        rows = await DatabaseConnection.fetch(
-            """
-            SELECT session_id, summary, key_topics, emotional_tone,
-                   started_at, ended_at, duration_minutes
-            FROM conversation_episodes
-            WHERE user_id = $1
-            ORDER BY ended_at DESC
-            LIMIT $2
-            """,
-            user_id,
-            limit,
-        )
+        rows = await self.backend.recent_episodes(user_id, limit)
 
         return [
             {
@@ -0,0 +1,175 @@
+"""Migrações versionadas do schema (sql/migrations/NNNN_nome.sql).
+
+Cada ficheiro é aplicado uma única vez, numa transação, e registado em
+`schema_migrations`. No arranque:
+
+- se não houver migrações pendentes (o caso normal), o worker segue logo
+  para servir: duas queries de leitura, sem DDL nem locks
+- se houver, os workers serializam-se num advisory lock; o primeiro aplica
+  as pendentes e os restantes, ao obter o lock, já não encontram nada
+
+Uso manual:
+    python -m src.database.migrations            # aplica as pendentes
+    python -m src.database.migrations --status   # lista o estado
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import time
+from typing import Optional, Dict, Any, List
+
+import asyncpg
+import structlog
+
+from src.config import settings
+
+logger = structlog.get_logger(__name__)
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "sql", "migrations"
+)
+# Chave do advisory lock das migrações (partilhada por todos os workers)
+MIGRATION_LOCK_ID = 0x456D7061
+
+_FILENAME = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+
+CREATE_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum VARCHAR(64) NOT NULL,
+        duration_ms INTEGER,
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class Migration:
+    """Um ficheiro de migração."""
+
+    def __init__(self, version: int, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, "r", encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Migrações do diretório, ordenadas por versão."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(
+                Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename))
+            )
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Versões de migração duplicadas em {directory}")
+    return migrations
+
+
+async def applied_versions(conn: asyncpg.Connection) -> Optional[Dict[int, str]]:
+    """Versões aplicadas e respetivos checksums (None se a tabela não existir)."""
+    if await conn.fetchval("SELECT to_regclass('schema_migrations')") is None:
+        return None
+    rows = await conn.fetch("SELECT version, checksum FROM schema_migrations")
+    return {row["version"]: row["checksum"] for row in rows}
+
+
+def _pending(migrations: List[Migration], applied: Optional[Dict[int, str]]) -> List[Migration]:
+    applied = applied or {}
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is not None and checksum != migration.checksum:
+            logger.warning(
+                "Migração aplicada foi alterada desde então",
+                version=migration.version,
+                name=migration.name,
+            )
+    return [m for m in migrations if m.version not in applied]
+
+
+async def migrate(
+    conn: asyncpg.Connection,
+    migrations: Optional[List[Migration]] = None,
+    lock_timeout_s: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Aplica as migrações pendentes.
+
+    Returns:
+        Relatório com as versões aplicadas, a versão atual e a duração
+    """
+    started = time.perf_counter()
+    migrations = load_migrations() if migrations is None else migrations
+    lock_timeout_s = settings.migration_lock_timeout_s if lock_timeout_s is None else lock_timeout_s
+    report: Dict[str, Any] = {"applied": [], "locked": False}
+
+    pending = _pending(migrations, await applied_versions(conn))
+    if pending:
+        report["locked"] = True
+        await asyncio.wait_for(
+            conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID),
+            timeout=lock_timeout_s,
+        )
+        try:
+            # Outro worker pode ter aplicado as migrações enquanto esperávamos
+            await conn.execute(CREATE_VERSION_TABLE)
+            pending = _pending(migrations, await applied_versions(conn))
+            for migration in pending:
+                applied_started = time.perf_counter()
+                async with conn.transaction():
+                    await conn.execute(migration.sql)
+                    duration_ms = int((time.perf_counter() - applied_started) * 1000)
+                    await conn.execute(
+                        """
+                        INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+                        VALUES ($1, $2, $3, $4)
+                        """,
+                        migration.version,
+                        migration.name,
+                        migration.checksum,
+                        duration_ms,
+                    )
+                report["applied"].append(migration.version)
+                logger.info(
+                    "Migração aplicada",
+                    version=migration.version,
+                    name=migration.name,
+                    duration_ms=duration_ms,
+                )
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+
+    report["version"] = migrations[-1].version if migrations else 0
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+async def _main(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(settings.postgres_dsn)
+    try:
+        migrations = load_migrations()
+        if args.status:
+            applied = await applied_versions(conn) or {}
+            for migration in migrations:
+                state = "aplicada" if migration.version in applied else "pendente"
+                print(f"{migration.version:04d} {migration.name}: {state}")
+            return
+        report = await migrate(conn, migrations)
+        print(report)
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrações do schema EmpatIA")
+    parser.add_argument("--status", action="store_true", help="lista as migrações e o estado")
+    asyncio.run(_main(parser.parse_args()))
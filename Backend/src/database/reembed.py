@@ -0,0 +1,271 @@
+"""Re-embedding em background de memórias e episódios.
+
+Trata as linhas com embedding de outro modelo e as pendentes (embedding
+NULL porque o Vertex falhou quando foram gravadas).
+
+Cada linha guarda o modelo que gerou o seu embedding (`embedding_model`).
+Quando `EMBEDDING_MODEL` muda, as pesquisas passam a considerar apenas as
+linhas do modelo novo e este worker recalcula as restantes:
+
+- páginas por keyset (`id > último id`) das linhas de outro modelo
+- embeddings de cada página num só pedido, com limite de textos por segundo
+  e backoff se o Vertex falhar
+- escrita da página com um único UPDATE e gravação do checkpoint
+  (`reembed_checkpoints`) na mesma transação, pelo que um reinício retoma
+  a partir da última página gravada
+
+Com vários workers, só um processa de cada vez (advisory lock); os outros
+voltam a tentar a cada `reembed_poll_interval_s`.
+
+Uso manual (uma passagem completa):
+    python -m src.database.reembed
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+
+import structlog
+
+from src.config import settings
+from src.vertex import priority, Priority
+from .connection import DatabaseConnection
+from .memory_store import MemoryStore
+
+logger = structlog.get_logger(__name__)
+
+# Chave do advisory lock do re-embedding
+REEMBED_LOCK_ID = 0x456D7062
+# Backoff entre tentativas de embedding falhadas
+RETRY_BASE_S = 2
+RETRY_MAX_S = 300
+
+# Tabela -> statements (página, update, contagem de pendentes)
+TABLES: Dict[str, Dict[str, str]] = {
+    "user_memories": {
+        "page": "reembed_memories_page",
+        "update": "reembed_memories_update",
+        "remaining": "reembed_memories_remaining",
+    },
+    "conversation_episodes": {
+        "page": "reembed_episodes_page",
+        "update": "reembed_episodes_update",
+        "remaining": "reembed_episodes_remaining",
+    },
+}
+
+
+class ReEmbedder:
+    """Worker de re-embedding retomável (ver docstring do módulo)."""
+
+    def __init__(
+        self,
+        memory_store: Optional[MemoryStore] = None,
+        target_model: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_texts_per_s: Optional[float] = None,
+        poll_interval_s: Optional[float] = None,
+    ):
+        self.memory_store = memory_store or MemoryStore()
+        self.target_model = target_model or self.memory_store.embedding_model
+        self.batch_size = batch_size or settings.reembed_batch_size
+        self.max_texts_per_s = max_texts_per_s or settings.reembed_max_texts_per_s
+        self.poll_interval_s = (
+            settings.reembed_poll_interval_s if poll_interval_s is None else poll_interval_s
+        )
+
+        self._task: Optional[asyncio.Task] = None
+        self._next_call_at = 0.0
+        self.running = False
+        # Backlog de embeddings pendentes; só o worker com o lock o mede
+        # (os outros reportam 0, para a soma entre workers ser correta)
+        self.pending: Dict[str, int] = {"memories": 0, "episodes": 0}
+
+        # Métricas
+        self.rows_done = 0
+        self.batches = 0
+        self.embed_errors = 0
+
+    def start(self) -> None:
+        """Inicia o loop periódico em background."""
+        if self._task is None and self.poll_interval_s > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        with DatabaseConnection.operation("reembed"), priority(Priority.BACKGROUND):
+            while True:
+                try:
+                    await self.run_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("Erro no re-embedding", error=str(e))
+                await asyncio.sleep(self.poll_interval_s)
+
+    async def run_once(self) -> int:
+        """
+        Uma passagem por todas as tabelas, se nenhum outro worker estiver a fazê-lo.
+
+        Returns:
+            Linhas re-embebidas nesta passagem
+        """
+        async with DatabaseConnection.acquire("reembed_lock") as lock_conn:
+            if not await lock_conn.fetchval("SELECT pg_try_advisory_lock($1)", REEMBED_LOCK_ID):
+                self.pending = {"memories": 0, "episodes": 0}
+                return 0
+            self.running = True
+            try:
+                await self.refresh_pending()
+                total = 0
+                for table in TABLES:
+                    total += await self.run_table(table)
+                if total:
+                    await self.refresh_pending()
+                return total
+            finally:
+                self.running = False
+                await lock_conn.execute("SELECT pg_advisory_unlock($1)", REEMBED_LOCK_ID)
+
+    async def run_table(self, table: str) -> int:
+        """Re-embebe as linhas de uma tabela a partir do checkpoint."""
+        statements = TABLES[table]
+        checkpoint = await DatabaseConnection.fetchrow_prepared(
+            "reembed_checkpoint_get", table, self.target_model
+        )
+        resuming = checkpoint is not None and checkpoint["completed_at"] is None
+        last_id = checkpoint["last_id"] if resuming else 0
+        rows_done = checkpoint["rows_done"] if resuming else 0
+        processed = 0
+
+        while True:
+            rows = await DatabaseConnection.fetch_prepared(
+                statements["page"], last_id, self.target_model, self.batch_size
+            )
+            if not rows:
+                break
+            if processed == 0:
+                logger.info(
+                    "Re-embedding em curso",
+                    table=table,
+                    model=self.target_model,
+                    from_id=last_id,
+                )
+
+            embeddings = await self._embed([row["text"] for row in rows])
+            ids = [row["id"] for row in rows]
+            # Vetores de norma zero não são gravados: as linhas ficam pendentes
+            updates = [(row_id, e) for row_id, e in zip(ids, embeddings) if any(e)]
+            async with DatabaseConnection.acquire(statements["update"]) as conn:
+                async with conn.transaction():
+                    await (await conn.prepared(statements["update"])).fetch(
+                        [row_id for row_id, _ in updates],
+                        self.target_model,
+                        [f"[{','.join(map(str, embedding))}]" for _, embedding in updates],
+                    )
+                    await (await conn.prepared("reembed_checkpoint_save")).fetch(
+                        table, self.target_model, ids[-1], rows_done + len(rows), None
+                    )
+
+            last_id = ids[-1]
+            rows_done += len(rows)
+            processed += len(rows)
+            self.rows_done += len(rows)
+            self.batches += 1
+
+        # Passagem concluída: a próxima recomeça do início (linhas que
+        # entretanto ficaram de outro modelo, ex.: embeddings falhados)
+        if processed or resuming:
+            await DatabaseConnection.execute_prepared(
+                "reembed_checkpoint_save",
+                table,
+                self.target_model,
+                last_id,
+                rows_done,
+                datetime.now(timezone.utc),
+            )
+            logger.info("Re-embedding concluído", table=table, model=self.target_model, rows=rows_done)
+        return processed
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings de uma página, respeitando o débito máximo e com backoff."""
+        attempt = 0
+        while True:
+            delay = self._next_call_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_call_at = time.monotonic() + len(texts) / self.max_texts_per_s
+            try:
+                return await self.memory_store.embed_batch(texts, model=self.target_model)
+            except Exception as e:
+                self.embed_errors += 1
+                backoff = min(RETRY_MAX_S, RETRY_BASE_S * 2 ** attempt)
+                attempt += 1
+                logger.warning(
+                    "Erro ao gerar embeddings para re-embedding",
+                    error=str(e),
+                    retry_in_s=backoff,
+                )
+                # Durante uma falha do Vertex o backlog cresce: manter o gauge atual
+                try:
+                    await self.refresh_pending()
+                except Exception:
+                    pass
+                await asyncio.sleep(backoff)
+
+    async def refresh_pending(self) -> Dict[str, int]:
+        """Atualiza o gauge de embeddings pendentes."""
+        row = await DatabaseConnection.fetchrow_prepared("embeddings_pending_count")
+        pending = {"memories": row["memories"], "episodes": row["episodes"]}
+        total = sum(pending.values())
+        if total > sum(self.pending.values()) and total >= settings.embedding_pending_warn:
+            logger.warning("Backlog de embeddings pendentes a crescer", **pending)
+        self.pending = pending
+        return pending
+
+    @property
+    def pending_total(self) -> int:
+        return sum(self.pending.values())
+
+    async def remaining(self) -> Dict[str, int]:
+        """Linhas ainda com embedding de outro modelo, por tabela."""
+        return {
+            table: await DatabaseConnection.fetchval_prepared(
+                statements["remaining"], self.target_model
+            )
+            for table, statements in TABLES.items()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "target_model": self.target_model,
+            "rows_done": self.rows_done,
+            "batches": self.batches,
+            "embed_errors": self.embed_errors,
+            "pending": self.pending,
+        }
+
+
+async def _main() -> None:
+    reembedder = ReEmbedder()
+    try:
+        await DatabaseConnection.migrate()
+        with priority(Priority.BACKGROUND):
+            rows = await reembedder.run_once()
+        print({"rows": rows, **await reembedder.remaining()})
+    finally:
+        await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,214 @@
+"""Réplicas de leitura do PostgreSQL: health checks, lag e read-your-writes."""
+
+import asyncio
+import itertools
+import time
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+import asyncpg
+from asyncpg import Pool
+import structlog
+
+from src.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# Erros próprios da réplica (inacessível, a arrancar ou conflito com a
+# recuperação do standby): a leitura é repetida no primário
+REPLICA_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.SerializationError,
+)
+
+
+class Replica:
+    """Uma réplica de leitura e o seu estado de saúde."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.pool: Optional[Pool] = None
+        self.healthy = False
+        self.lag_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reads = 0
+        self.failures = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "lag_s": self.lag_s,
+            "reads": self.reads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+def parse_replica_hosts(value: str) -> List[Replica]:
+    """Lê "host1:5433,host2" (porta por omissão: a do primário)."""
+    replicas = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        replicas.append(Replica(host, int(port) if port else settings.postgres_port))
+    return replicas
+
+
+class ReplicaRouter:
+    """
+    Encaminha leituras para réplicas saudáveis (round-robin).
+
+    Um health check periódico mede o lag de replicação de cada réplica;
+    réplicas inacessíveis ou com lag acima de `max_lag_s` deixam de receber
+    leituras até recuperarem. Depois de uma escrita, as leituras desse
+    utilizador vão para o primário durante `sticky_s` (ou mais, se o lag da
+    réplica for maior), para que a sessão veja logo o que acabou de gravar.
+    Sem réplica elegível, `pick()` retorna None e a leitura vai ao primário.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        create_pool: Callable[[Replica], Awaitable[Pool]],
+        max_lag_s: Optional[float] = None,
+        check_interval_s: Optional[float] = None,
+        sticky_s: Optional[float] = None,
+    ):
+        self.replicas = replicas
+        self._create_pool = create_pool
+        self.max_lag_s = settings.postgres_replica_max_lag_s if max_lag_s is None else max_lag_s
+        self.check_interval_s = (
+            settings.postgres_replica_check_interval_s
+            if check_interval_s is None
+            else check_interval_s
+        )
+        self.sticky_s = settings.postgres_read_your_writes_s if sticky_s is None else sticky_s
+
+        self._last_write: Dict[str, float] = {}
+        self._round_robin = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.reads_replica = 0
+        self.reads_primary_sticky = 0
+        self.reads_primary_fallback = 0
+
+    async def start(self) -> None:
+        """Abre os pools das réplicas, faz o primeiro check e inicia o loop."""
+        await self.check()
+        if self._task is None and self.check_interval_s > 0:
+            self._task = asyncio.create_task(self._check_loop())
+        logger.info(
+            "Réplicas de leitura configuradas",
+            replicas=[r.name for r in self.replicas],
+            healthy=sum(r.healthy for r in self.replicas),
+        )
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            if replica.pool is not None:
+                await replica.pool.close()
+                replica.pool = None
+            replica.healthy = False
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval_s)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("Erro no health check das réplicas", error=str(e))
+
+    async def check(self) -> None:
+        """Verifica todas as réplicas e esquece escritas fora da janela."""
+        await asyncio.gather(*(self._check_replica(r) for r in self.replicas))
+        cutoff = time.monotonic() - self._sticky_window()
+        self._last_write = {u: t for u, t in self._last_write.items() if t > cutoff}
+
+    async def _check_replica(self, replica: Replica) -> None:
+        was_healthy = replica.healthy
+        try:
+            if replica.pool is None:
+                replica.pool = await self._create_pool(replica)
+            async with replica.pool.acquire(timeout=settings.postgres_acquire_timeout_s) as conn:
+                lag = await (await conn.prepared("replica_lag")).fetchval(
+                    timeout=settings.postgres_acquire_timeout_s
+                )
+            replica.lag_s = float(lag or 0)
+            replica.last_error = None
+            replica.healthy = replica.lag_s <= self.max_lag_s
+        except Exception as e:
+            replica.healthy = False
+            replica.last_error = str(e)
+
+        if replica.healthy != was_healthy:
+            log = logger.info if replica.healthy else logger.warning
+            log(
+                "Réplica de leitura disponível" if replica.healthy else "Réplica de leitura indisponível",
+                replica=replica.name,
+                lag_s=replica.lag_s,
+                error=replica.last_error,
+            )
+
+    def _sticky_window(self) -> float:
+        lags = [r.lag_s for r in self.replicas if r.healthy and r.lag_s is not None]
+        return max([self.sticky_s, *lags])
+
+    def mark_write(self, user_id: str) -> None:
+        """Regista uma escrita do utilizador (as leituras seguintes vão ao primário)."""
+        self._last_write[user_id] = time.monotonic()
+
+    def pick(self, user_id: Optional[str]) -> Optional[Replica]:
+        """Réplica para uma leitura, ou None para ler do primário."""
+        written = self._last_write.get(user_id) if user_id else None
+        if written is not None and time.monotonic() - written < self._sticky_window():
+            self.reads_primary_sticky += 1
+            return None
+
+        healthy = [r for r in self.replicas if r.healthy and r.pool is not None]
+        if not healthy:
+            self.reads_primary_fallback += 1
+            return None
+        replica = healthy[next(self._round_robin) % len(healthy)]
+        replica.reads += 1
+        self.reads_replica += 1
+        return replica
+
+    def mark_failed(self, replica: Replica, error: Exception) -> None:
+        """Tira uma réplica de serviço após um erro de conexão (volta no próximo check)."""
+        replica.failures += 1
+        replica.last_error = str(error)
+        if replica.healthy:
+            replica.healthy = False
+            logger.warning(
+                "Réplica de leitura falhou, a usar o primário",
+                replica=replica.name,
+                error=str(error),
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "reads_replica": self.reads_replica,
+            "reads_primary_sticky": self.reads_primary_sticky,
+            "reads_primary_fallback": self.reads_primary_fallback,
+            "sticky_users": len(self._last_write),
+            "replicas": {r.name: r.snapshot() for r in self.replicas},
+        }
+
@@ -0,0 +1,346 @@
+"""Registo central de statements SQL nomeados e de forma fixa.
+
+Todas as queries de memórias, perfis, episódios, transcrições e da fila de
+episódios estão aqui, com texto fixo (sem SQL dinâmico). Cada conexão do pool
+prepara-as uma vez (ver `PreparedConnection`), pelo que cada chamada envia
+apenas o nome do statement e os parâmetros: sem parse/plan por pedido.
+
+Parâmetros opcionais usam `COALESCE($n, coluna)` ou `($n IS NULL OR ...)`
+em vez de variar o texto da query.
+"""
+
+from typing import Dict, FrozenSet
+
+STATEMENTS: Dict[str, str] = {
+    # ------------------------------------------------------------------
+    # Perfis
+    # ------------------------------------------------------------------
+    "user_exists": """
+        SELECT id FROM user_profiles WHERE user_id = $1
+    """,
+    "user_create": """
+        INSERT INTO user_profiles (user_id, name)
+        VALUES ($1, $2)
+        ON CONFLICT (user_id) DO NOTHING
+    """,
+    "users_create_many": """
+        INSERT INTO user_profiles (user_id)
+        SELECT unnest($1::varchar[])
+        ON CONFLICT (user_id) DO NOTHING
+    """,
+    "profile_get": """
+        SELECT name, location, created_at FROM user_profiles WHERE user_id = $1
+    """,
+    "profile_memories": """
+        SELECT category, entity_type, entity_name, content, importance
+        FROM user_memories
+        WHERE user_id = $1 AND is_active = TRUE
+        ORDER BY category, importance DESC
+    """,
+    # ------------------------------------------------------------------
+    # Memórias
+    # ------------------------------------------------------------------
+    "memory_insert": """
+        INSERT INTO user_memories
+        (user_id, category, entity_type, entity_name, content, importance, embedding,
+         metadata, embedding_model)
+        VALUES ($1, $2, $3, $4, $5, $6, $7::vector, $8, $9)
+        RETURNING id, created_at, updated_at
+    """,
+    "memory_find_similar": """
+        SELECT id, content, importance, metadata, created_at, updated_at
+        FROM user_memories
+        WHERE user_id = $1
+          AND category = $2
+          AND entity_type = $3
+          AND entity_name IS NOT DISTINCT FROM $4
+          AND is_active = TRUE
+    """,
+    "memory_embedding_source": """
+        SELECT category, entity_type, entity_name FROM user_memories WHERE id = $1
+    """,
+    "memory_update": """
+        UPDATE user_memories
+        SET content = COALESCE($2, content),
+            -- $7: conteúdo alterado mas o embedding falhou -> fica pendente
+            embedding = CASE WHEN $7::boolean THEN NULL ELSE COALESCE($3::vector, embedding) END,
+            embedding_model = CASE
+                WHEN $7::boolean THEN NULL
+                WHEN $3::vector IS NULL THEN embedding_model
+                ELSE $6::varchar
+            END,
+            importance = COALESCE($4, importance),
+            metadata = COALESCE($5::jsonb, metadata)
+        WHERE id = $1
+        RETURNING id, user_id, category, entity_type, entity_name, content,
+                  importance, metadata, created_at, updated_at
+    """,
+    "memory_deactivate": """
+        UPDATE user_memories SET is_active = FALSE WHERE id = $1 RETURNING user_id
+    """,
+    "memory_search": """
+        SELECT
+            id, user_id, category, entity_type, entity_name, content,
+            importance, metadata, created_at, updated_at,
+            1 - (embedding <=> $2::vector) as similarity
+        FROM user_memories
+        WHERE user_id = $1
+          AND is_active = TRUE
+          AND 1 - (embedding <=> $2::vector) >= $3
+          AND ($5::varchar IS NULL OR category = $5)
+          -- Durante um re-embedding só são comparáveis os vetores do modelo atual
+          AND embedding_model = $6::varchar
+        ORDER BY similarity DESC
+        LIMIT $4
+    """,
+    # Pesquisa por texto (português), para quando não há embedding da query
+    # ou para as memórias com embedding pendente. Os termos são combinados
+    # com OR; a "similaridade" é o ts_rank normalizado (0-1).
+    "memory_search_lexical": """
+        WITH q AS (
+            SELECT replace(plainto_tsquery('portuguese', $2)::text, '&', '|') AS text
+        )
+        SELECT
+            id, user_id, category, entity_type, entity_name, content,
+            importance, metadata, created_at, updated_at,
+            ts_rank(
+                to_tsvector('portuguese', coalesce(entity_name, '') || ' ' || content),
+                q.text::tsquery,
+                32
+            ) AS similarity
+        FROM user_memories, q
+        WHERE user_id = $1
+          AND is_active = TRUE
+          AND q.text <> ''
+          AND to_tsvector('portuguese', coalesce(entity_name, '') || ' ' || content)
+              @@ q.text::tsquery
+          AND ($4::varchar IS NULL OR category = $4)
+          AND (NOT $5::boolean OR embedding_model IS NULL)
+        ORDER BY similarity DESC, importance DESC
+        LIMIT $3
+    """,
+    # ------------------------------------------------------------------
+    # Importação/exportação em massa (ver bulk.py)
+    # ------------------------------------------------------------------
+    # Junta um lote da staging: a última linha de cada chave ganha, memórias
+    # ativas com a mesma chave são atualizadas e as restantes inseridas
+    "import_merge": """
+        WITH batch AS (
+            SELECT DISTINCT ON (user_id, category, entity_type, entity_name) *
+            FROM memory_import_staging
+            WHERE batch_id = $1::uuid
+            ORDER BY user_id, category, entity_type, entity_name, ord DESC
+        ), updated AS (
+            UPDATE user_memories m
+            SET content = b.content,
+                importance = b.importance,
+                metadata = b.metadata,
+                embedding = b.embedding::vector,
+                embedding_model = CASE WHEN b.embedding IS NULL THEN NULL ELSE $2::varchar END
+            FROM batch b
+            WHERE m.user_id = b.user_id
+              AND m.category = b.category
+              AND m.entity_type = b.entity_type
+              AND m.entity_name IS NOT DISTINCT FROM b.entity_name
+              AND m.is_active = TRUE
+            RETURNING m.user_id, m.category, m.entity_type, m.entity_name
+        ), inserted AS (
+            INSERT INTO user_memories
+            (user_id, category, entity_type, entity_name, content, importance, embedding,
+             metadata, embedding_model)
+            SELECT b.user_id, b.category, b.entity_type, b.entity_name, b.content,
+                   b.importance, b.embedding::vector, b.metadata,
+                   CASE WHEN b.embedding IS NULL THEN NULL ELSE $2::varchar END
+            FROM batch b
+            WHERE NOT EXISTS (
+                SELECT 1 FROM updated u
+                WHERE u.user_id = b.user_id
+                  AND u.category = b.category
+                  AND u.entity_type = b.entity_type
+                  AND u.entity_name IS NOT DISTINCT FROM b.entity_name
+            )
+            RETURNING id
+        )
+        SELECT (SELECT COUNT(*) FROM inserted) AS inserted,
+               (SELECT COUNT(*) FROM updated) AS updated
+    """,
+    "import_clear": """
+        DELETE FROM memory_import_staging WHERE batch_id = $1::uuid
+    """,
+    "export_user_ids": """
+        SELECT user_id FROM user_profiles ORDER BY user_id
+    """,
+    "memory_export": """
+        SELECT category, entity_type, entity_name, content, importance,
+               metadata, created_at, updated_at
+        FROM user_memories
+        WHERE user_id = $1 AND is_active = TRUE
+        ORDER BY id
+    """,
+    # ------------------------------------------------------------------
+    # Episódios
+    # ------------------------------------------------------------------
+    "episode_insert": """
+        INSERT INTO conversation_episodes
+        (user_id, session_id, summary, key_topics, emotional_tone,
+         embedding, started_at, duration_minutes, metadata, embedding_model)
+        VALUES ($1, $2, $3, $4, $5, $6::vector, $7, $8, $9, $10)
+        RETURNING id
+    """,
+    # Idempotente por sessão: um job repetido não duplica o episódio
+    "episode_insert_once": """
+        INSERT INTO conversation_episodes
+        (user_id, session_id, summary, key_topics, emotional_tone,
+         embedding, started_at, ended_at, duration_minutes, metadata, embedding_model)
+        SELECT $1::varchar, $2::varchar, $3::text, $4::text[], $5::varchar,
+               $6::vector, $7::timestamptz, $8::timestamptz, $9::int, $10::jsonb,
+               $11::varchar
+        WHERE NOT EXISTS (
+            SELECT 1 FROM conversation_episodes WHERE session_id = $2
+        )
+    """,
+    "episodes_recent": """
+        SELECT session_id, summary, key_topics, emotional_tone,
+               started_at, ended_at, duration_minutes
+        FROM conversation_episodes
+        WHERE user_id = $1
+        ORDER BY ended_at DESC
+        LIMIT $2
+    """,
+    # ------------------------------------------------------------------
+    # Transcrições
+    # ------------------------------------------------------------------
+    "transcript_insert_many": """
+        INSERT INTO conversation_transcripts
+        (session_id, user_id, seq, speaker, text, created_at)
+        SELECT $1::varchar, $2::varchar, t.seq, t.speaker, t.text, t.created_at
+        FROM unnest($3::int[], $4::varchar[], $5::text[], $6::timestamptz[])
+            AS t(seq, speaker, text, created_at)
+        ON CONFLICT (session_id, seq) DO NOTHING
+    """,
+    # ------------------------------------------------------------------
+    # Fila de episódios (session_jobs)
+    # ------------------------------------------------------------------
+    "job_enqueue": """
+        INSERT INTO session_jobs (user_id, session_id, payload)
+        VALUES ($1, $2, $3::jsonb)
+        ON CONFLICT (session_id) DO NOTHING
+    """,
+    "job_claim": """
+        UPDATE session_jobs
+        SET status = 'running', locked_at = NOW(), attempts = attempts + 1
+        WHERE id IN (
+            SELECT id FROM session_jobs
+            WHERE (status = 'pending' AND available_at <= NOW())
+               OR (status = 'running' AND locked_at < NOW() - $2::float8 * INTERVAL '1 second')
+            ORDER BY id
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, payload, attempts
+    """,
+    "job_delete_many": """
+        DELETE FROM session_jobs WHERE id = ANY($1::bigint[])
+    """,
+    "job_reschedule": """
+        UPDATE session_jobs
+        SET status = $2, last_error = $3, locked_at = NULL,
+            available_at = NOW() + $4::float8 * INTERVAL '1 second'
+        WHERE id = $1
+    """,
+    "job_defer": """
+        UPDATE session_jobs
+        SET status = 'pending', attempts = GREATEST(attempts - 1, 0), last_error = $2,
+            locked_at = NULL, available_at = NOW() + $3::float8 * INTERVAL '1 second',
+            payload = jsonb_set(payload, '{deferrals}', to_jsonb($4::int))
+        WHERE id = $1
+    """,
+    # Jobs que um worker pode reclamar já (os mesmos critérios de job_claim)
+    "jobs_claimable_count": """
+        SELECT COUNT(*) FROM session_jobs
+        WHERE (status = 'pending' AND available_at <= NOW())
+           OR (status = 'running' AND locked_at < NOW() - $1::float8 * INTERVAL '1 second')
+    """,
+    # ------------------------------------------------------------------
+    # Re-embedding (ver reembed.py): páginas por keyset de linhas cujo
+    # embedding não é do modelo de destino
+    # ------------------------------------------------------------------
+    "reembed_memories_page": """
+        SELECT id, category || ' ' || entity_type || ' ' || COALESCE(entity_name, '')
+                   || ' ' || content AS text
+        FROM user_memories
+        WHERE id > $1 AND embedding_model IS DISTINCT FROM $2
+        ORDER BY id
+        LIMIT $3
+    """,
+    "reembed_episodes_page": """
+        SELECT id, COALESCE(summary, '') AS text
+        FROM conversation_episodes
+        WHERE id > $1 AND embedding_model IS DISTINCT FROM $2
+        ORDER BY id
+        LIMIT $3
+    """,
+    "reembed_memories_update": """
+        UPDATE user_memories m
+        SET embedding = v.embedding::vector, embedding_model = $2
+        FROM unnest($1::int[], $3::text[]) AS v(id, embedding)
+        WHERE m.id = v.id
+          -- Não sobrepor uma escrita feita entretanto já com o modelo novo
+          AND m.embedding_model IS DISTINCT FROM $2
+    """,
+    "reembed_episodes_update": """
+        UPDATE conversation_episodes e
+        SET embedding = v.embedding::vector, embedding_model = $2
+        FROM unnest($1::int[], $3::text[]) AS v(id, embedding)
+        WHERE e.id = v.id
+          AND e.embedding_model IS DISTINCT FROM $2
+    """,
+    "reembed_memories_remaining": """
+        SELECT COUNT(*) FROM user_memories WHERE embedding_model IS DISTINCT FROM $1
+    """,
+    "reembed_episodes_remaining": """
+        SELECT COUNT(*) FROM conversation_episodes WHERE embedding_model IS DISTINCT FROM $1
+    """,
+    # Backlog de embeddings pendentes (falhas do Vertex), via índices parciais
+    "embeddings_pending_count": """
+        SELECT
+            (SELECT COUNT(*) FROM user_memories WHERE embedding_model IS NULL) AS memories,
+            (SELECT COUNT(*) FROM conversation_episodes WHERE embedding_model IS NULL) AS episodes
+    """,
+    "reembed_checkpoint_get": """
+        SELECT last_id, rows_done, completed_at
+        FROM reembed_checkpoints
+        WHERE table_name = $1 AND target_model = $2
+    """,
+    "reembed_checkpoint_save": """
+        INSERT INTO reembed_checkpoints (table_name, target_model, last_id, rows_done, completed_at)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (table_name, target_model) DO UPDATE
+        SET last_id = EXCLUDED.last_id,
+            rows_done = EXCLUDED.rows_done,
+            completed_at = EXCLUDED.completed_at,
+            updated_at = NOW()
+    """,
+    # ------------------------------------------------------------------
+    # Réplicas de leitura
+    # ------------------------------------------------------------------
+    # Lag de replicação em segundos (0 se o standby já aplicou tudo o que recebeu)
+    "replica_lag": """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery()
+              OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END::float8
+    """,
+}
+
+# Statements lidos nas réplicas (`fetch_read`/`fetchrow_read` e verificação de
+# lag): as conexões das réplicas preparam só estes, não as escritas.
+REPLICA_STATEMENTS: FrozenSet[str] = frozenset({
+    "profile_get",
+    "profile_memories",
+    "memory_search",
+    "memory_search_lexical",
+    "episodes_recent",
+    "replica_lag",
+})
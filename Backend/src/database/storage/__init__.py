@@ -0,0 +1,36 @@
+"""Backends de armazenamento do MemoryStore (PostgreSQL ou em memória)."""
+
+from typing import Dict
+
+from .base import MemoryBackend
+from .postgres import PostgresMemoryBackend
+from .memory import InMemoryMemoryBackend
+
+_backends: Dict[str, MemoryBackend] = {}
+
+
+def get_memory_backend(name: str) -> MemoryBackend:
+    """
+    Backend do processo pelo nome de configuração ("postgres" ou "memory").
+
+    A mesma instância é partilhada por todos os `MemoryStore` (agente, tools,
+    pipeline de episódios), como acontece com o pool de conexões.
+    """
+    backend = _backends.get(name)
+    if backend is None:
+        if name == "postgres":
+            backend = PostgresMemoryBackend()
+        elif name == "memory":
+            backend = InMemoryMemoryBackend()
+        else:
+            raise ValueError(f"Backend de memórias desconhecido: {name}")
+        _backends[name] = backend
+    return backend
+
+
+__all__ = [
+    "MemoryBackend",
+    "PostgresMemoryBackend",
+    "InMemoryMemoryBackend",
+    "get_memory_backend",
+]
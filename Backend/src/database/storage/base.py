@@ -0,0 +1,139 @@
+"""Interface de armazenamento de memórias, perfis e episódios.
+
+O `MemoryStore` trata dos embeddings, da deduplicação e de converter linhas
+em objetos; o backend só guarda e consulta. As linhas devolvidas são
+mapeamentos com as mesmas colunas das tabelas (`row["content"]`, ...), seja
+um `asyncpg.Record` ou um `dict`.
+
+Semântica comum a todos os backends (verificada por
+`test_memory_backends.py`):
+
+- `delete` é soft delete: a memória fica inativa e deixa de aparecer em
+  perfis, pesquisas e deduplicação, mas continua atualizável por id
+- a deduplicação compara utilizador, categoria, tipo e nome da entidade
+  (nome None só iguala None), entre memórias ativas
+- a pesquisa semântica usa similaridade de cosseno >= `min_similarity`, só
+  entre vetores do mesmo modelo, por ordem decrescente de similaridade
+- os episódios recentes vêm por `ended_at` decrescente; a gravação em lote
+  é idempotente por `session_id`
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Mapping
+
+
+class MemoryBackend:
+    """Operações de armazenamento usadas pelo `MemoryStore`."""
+
+    name: str
+
+    async def user_exists(self, user_id: str) -> bool:
+        raise NotImplementedError
+
+    async def create_user(self, user_id: str, name: Optional[str] = None) -> None:
+        """Cria o perfil (sem efeito se já existir)."""
+        raise NotImplementedError
+
+    async def get_profile(self, user_id: str) -> Optional[Mapping[str, Any]]:
+        """Linha do perfil: name, location, created_at."""
+        raise NotImplementedError
+
+    async def profile_memories(self, user_id: str) -> List[Mapping[str, Any]]:
+        """Memórias ativas por categoria e importância decrescente."""
+        raise NotImplementedError
+
+    async def insert_memory(
+        self,
+        user_id: str,
+        category: str,
+        entity_type: str,
+        entity_name: Optional[str],
+        content: str,
+        importance: int,
+        embedding: Optional[List[float]],
+        metadata: Dict[str, Any],
+        model: Optional[str],
+    ) -> Mapping[str, Any]:
+        """Insere uma memória; devolve id, created_at e updated_at."""
+        raise NotImplementedError
+
+    async def find_similar_memory(
+        self, user_id: str, category: str, entity_type: str, entity_name: Optional[str]
+    ) -> Optional[Mapping[str, Any]]:
+        """Memória ativa com a mesma chave de deduplicação."""
+        raise NotImplementedError
+
+    async def memory_embedding_source(self, memory_id: int) -> Optional[Mapping[str, Any]]:
+        """category, entity_type e entity_name de uma memória."""
+        raise NotImplementedError
+
+    async def update_memory(
+        self,
+        memory_id: int,
+        content: Optional[str],
+        embedding: Optional[List[float]],
+        importance: Optional[int],
+        metadata: Optional[Dict[str, Any]],
+        model: Optional[str],
+        embedding_pending: bool,
+    ) -> Optional[Mapping[str, Any]]:
+        """
+        Atualiza os campos não None. Com `embedding_pending` o embedding e o
+        modelo ficam NULL (conteúdo novo sem embedding).
+        """
+        raise NotImplementedError
+
+    async def deactivate_memory(self, memory_id: int) -> Optional[str]:
+        """Soft delete; devolve o user_id (None se a memória não existir)."""
+        raise NotImplementedError
+
+    async def search_memories(
+        self,
+        user_id: str,
+        embedding: List[float],
+        min_similarity: float,
+        limit: int,
+        category: Optional[str],
+        model: str,
+    ) -> List[Mapping[str, Any]]:
+        """Pesquisa semântica (linhas com a coluna `similarity`)."""
+        raise NotImplementedError
+
+    async def search_lexical(
+        self,
+        user_id: str,
+        query: str,
+        limit: int,
+        category: Optional[str],
+        pending_only: bool,
+    ) -> List[Mapping[str, Any]]:
+        """Pesquisa por texto, qualquer termo (com `pending_only`, só memórias sem embedding)."""
+        raise NotImplementedError
+
+    async def insert_episode(
+        self,
+        user_id: str,
+        session_id: str,
+        summary: str,
+        key_topics: List[str],
+        emotional_tone: str,
+        embedding: Optional[List[float]],
+        started_at: datetime,
+        duration_minutes: int,
+        metadata: Dict[str, Any],
+        model: Optional[str],
+    ) -> int:
+        """Insere um episódio (ended_at = agora); devolve o id."""
+        raise NotImplementedError
+
+    async def insert_episodes(self, episodes: List[Dict[str, Any]]) -> None:
+        """
+        Insere vários episódios numa transação, criando os utilizadores em
+        falta; episódios de uma sessão já gravada são ignorados.
+
+        Cada episódio tem as chaves de `insert_episode` mais `ended_at`.
+        """
+        raise NotImplementedError
+
+    async def recent_episodes(self, user_id: str, limit: int) -> List[Mapping[str, Any]]:
+        raise NotImplementedError
@@ -0,0 +1,419 @@
+"""Backend em memória (um só processo, sem persistência).
+
+Para testes, benchmarks e modo de nó único sem PostgreSQL
+(`MEMORY_BACKEND=memory`). Os dados perdem-se ao terminar o processo.
+
+Estruturas:
+
+- memórias e episódios em dicts por id, com índices por utilizador e pela
+  chave de deduplicação (utilizador, categoria, tipo, nome) das ativas
+- vetores numa matriz NumPy contígua (uma linha por memória, capacidade
+  dobrada quando enche) com as normas pré-calculadas, pelo que a pesquisa
+  de um utilizador é um único produto matriz-vetor sobre as suas linhas
+
+Todas as operações são síncronas por dentro (sem `await` a meio), pelo que
+são atómicas no event loop.
+"""
+
+import math
+import re
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Mapping, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.embeddings.local import normalize_text, STOPWORDS
+from .base import MemoryBackend
+
+_WORD = re.compile(r"\w+")
+
+DedupKey = Tuple[str, str, str, Optional[str]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _timestamptz(value: Optional[datetime]) -> Optional[datetime]:
+    """Como uma coluna TIMESTAMPTZ: datas sem fuso são hora local, devolvidas em UTC."""
+    return value.astimezone(timezone.utc) if value is not None else None
+
+
+def _terms(text: str) -> set:
+    """Termos para a pesquisa por texto (sem acentos, stopwords nem plural)."""
+    terms = set()
+    for word in _WORD.findall(normalize_text(text)):
+        if word in STOPWORDS:
+            continue
+        terms.add(word[:-1] if len(word) > 4 and word.endswith("s") else word)
+    return terms
+
+
+class VectorArray:
+    """Matriz de vetores float32 com crescimento por duplicação e normas em cache."""
+
+    def __init__(self, dimensions: int, capacity: int = 1024):
+        self.dimensions = dimensions
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.norms = np.zeros(capacity, dtype=np.float32)
+        self.size = 0
+
+    def add(self) -> int:
+        """Reserva uma linha (vazia) e devolve o índice."""
+        if self.size == len(self.vectors):
+            capacity = len(self.vectors) * 2
+            self.vectors = np.resize(self.vectors, (capacity, self.dimensions))
+            self.vectors[self.size:] = 0
+            self.norms = np.resize(self.norms, capacity)
+            self.norms[self.size:] = 0
+        self.size += 1
+        return self.size - 1
+
+    def set(self, slot: int, vector: List[float]) -> None:
+        self.vectors[slot] = vector
+        self.norms[slot] = np.linalg.norm(self.vectors[slot])
+
+    def cosine(self, slots: List[int], query: np.ndarray) -> np.ndarray:
+        """Similaridade de cosseno entre a query e as linhas indicadas."""
+        query_norm = np.linalg.norm(query)
+        index = np.asarray(slots, dtype=np.int64)
+        dots = self.vectors[index] @ query
+        norms = self.norms[index] * query_norm
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(norms > 0, dots / norms, 0.0)
+
+
+class InMemoryMemoryBackend(MemoryBackend):
+    """Memórias em estruturas Python/NumPy (ver docstring do módulo)."""
+
+    name = "memory"
+
+    def __init__(self, dimensions: Optional[int] = None):
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._memories: Dict[int, Dict[str, Any]] = {}
+        self._memories_by_user: Dict[str, List[int]] = {}
+        self._dedup: Dict[DedupKey, int] = {}
+        self._episodes: Dict[int, Dict[str, Any]] = {}
+        self._episodes_by_user: Dict[str, List[int]] = {}
+        self._episode_sessions: set = set()
+        self._vectors = VectorArray(dimensions or settings.embedding_dimensions)
+        self._next_user_id = 1
+        self._next_memory_id = 1
+        self._next_episode_id = 1
+
+    # ------------------------------------------------------------------
+    # Perfis
+    # ------------------------------------------------------------------
+    async def user_exists(self, user_id: str) -> bool:
+        return user_id in self._users
+
+    async def create_user(self, user_id: str, name: Optional[str] = None) -> None:
+        self._create_user(user_id, name)
+
+    def _create_user(self, user_id: str, name: Optional[str] = None) -> None:
+        if user_id in self._users:
+            return
+        now = _now()
+        self._users[user_id] = {
+            "id": self._next_user_id,
+            "name": name,
+            "location": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._next_user_id += 1
+
+    async def get_profile(self, user_id: str) -> Optional[Mapping[str, Any]]:
+        user = self._users.get(user_id)
+        if user is None:
+            return None
+        return {key: user[key] for key in ("name", "location", "created_at")}
+
+    async def profile_memories(self, user_id: str) -> List[Mapping[str, Any]]:
+        rows = [m for m in self._user_memories(user_id) if m["is_active"]]
+        rows.sort(key=lambda m: (m["category"], -m["importance"], m["id"]))
+        return [
+            {
+                key: m[key]
+                for key in ("category", "entity_type", "entity_name", "content", "importance")
+            }
+            for m in rows
+        ]
+
+    # ------------------------------------------------------------------
+    # Memórias
+    # ------------------------------------------------------------------
+    def _user_memories(self, user_id: str) -> List[Dict[str, Any]]:
+        return [self._memories[i] for i in self._memories_by_user.get(user_id, [])]
+
+    @staticmethod
+    def _dedup_key(memory: Mapping[str, Any]) -> DedupKey:
+        return (
+            memory["user_id"],
+            memory["category"],
+            memory["entity_type"],
+            memory["entity_name"],
+        )
+
+    @staticmethod
+    def _row(memory: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+        """Cópia da memória sem campos internos (como uma linha da tabela)."""
+        row = {k: v for k, v in memory.items() if k != "slot"}
+        row["metadata"] = dict(memory["metadata"])
+        row.update(extra)
+        return row
+
+    async def insert_memory(
+        self,
+        user_id: str,
+        category: str,
+        entity_type: str,
+        entity_name: Optional[str],
+        content: str,
+        importance: int,
+        embedding: Optional[List[float]],
+        metadata: Dict[str, Any],
+        model: Optional[str],
+    ) -> Mapping[str, Any]:
+        if user_id not in self._users:
+            raise LookupError(f"Utilizador inexistente: {user_id}")
+        now = _now()
+        memory = {
+            "id": self._next_memory_id,
+            "user_id": user_id,
+            "category": category,
+            "entity_type": entity_type,
+            "entity_name": entity_name,
+            "content": content,
+            "importance": importance,
+            "metadata": dict(metadata),
+            "embedding_model": None,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+            "slot": self._vectors.add(),
+        }
+        self._next_memory_id += 1
+        self._set_embedding(memory, embedding, model)
+
+        self._memories[memory["id"]] = memory
+        self._memories_by_user.setdefault(user_id, []).append(memory["id"])
+        self._dedup[self._dedup_key(memory)] = memory["id"]
+        return {"id": memory["id"], "created_at": now, "updated_at": now}
+
+    def _set_embedding(
+        self, memory: Dict[str, Any], embedding: Optional[List[float]], model: Optional[str]
+    ) -> None:
+        if embedding is None:
+            memory["embedding_model"] = None
+            self._vectors.set(memory["slot"], np.zeros(self._vectors.dimensions))
+        else:
+            memory["embedding_model"] = model
+            self._vectors.set(memory["slot"], embedding)
+
+    async def find_similar_memory(
+        self, user_id: str, category: str, entity_type: str, entity_name: Optional[str]
+    ) -> Optional[Mapping[str, Any]]:
+        memory_id = self._dedup.get((user_id, category, entity_type, entity_name))
+        if memory_id is None:
+            return None
+        memory = self._memories[memory_id]
+        return {
+            key: (dict(memory[key]) if key == "metadata" else memory[key])
+            for key in ("id", "content", "importance", "metadata", "created_at", "updated_at")
+        }
+
+    async def memory_embedding_source(self, memory_id: int) -> Optional[Mapping[str, Any]]:
+        memory = self._memories.get(memory_id)
+        if memory is None:
+            return None
+        return {key: memory[key] for key in ("category", "entity_type", "entity_name")}
+
+    async def update_memory(
+        self,
+        memory_id: int,
+        content: Optional[str],
+        embedding: Optional[List[float]],
+        importance: Optional[int],
+        metadata: Optional[Dict[str, Any]],
+        model: Optional[str],
+        embedding_pending: bool,
+    ) -> Optional[Mapping[str, Any]]:
+        memory = self._memories.get(memory_id)
+        if memory is None:
+            return None
+        if content is not None:
+            memory["content"] = content
+        if embedding_pending:
+            self._set_embedding(memory, None, None)
+        elif embedding is not None:
+            self._set_embedding(memory, embedding, model)
+        if importance is not None:
+            memory["importance"] = importance
+        if metadata is not None:
+            memory["metadata"] = dict(metadata)
+        memory["updated_at"] = _now()
+        return {
+            key: (dict(memory[key]) if key == "metadata" else memory[key])
+            for key in (
+                "id", "user_id", "category", "entity_type", "entity_name", "content",
+                "importance", "metadata", "created_at", "updated_at",
+            )
+        }
+
+    async def deactivate_memory(self, memory_id: int) -> Optional[str]:
+        memory = self._memories.get(memory_id)
+        if memory is None:
+            return None
+        memory["is_active"] = False
+        memory["updated_at"] = _now()
+        key = self._dedup_key(memory)
+        if self._dedup.get(key) == memory_id:
+            del self._dedup[key]
+        return memory["user_id"]
+
+    async def search_memories(
+        self,
+        user_id: str,
+        embedding: List[float],
+        min_similarity: float,
+        limit: int,
+        category: Optional[str],
+        model: str,
+    ) -> List[Mapping[str, Any]]:
+        candidates = [
+            m
+            for m in self._user_memories(user_id)
+            if m["is_active"]
+            and m["embedding_model"] == model
+            and (category is None or m["category"] == category)
+        ]
+        if not candidates:
+            return []
+        similarities = self._vectors.cosine(
+            [m["slot"] for m in candidates], np.asarray(embedding, dtype=np.float32)
+        )
+        ranked = sorted(
+            (
+                (float(similarity), memory)
+                for similarity, memory in zip(similarities, candidates)
+                if similarity >= min_similarity
+            ),
+            key=lambda pair: -pair[0],
+        )
+        return [
+            self._row(memory, similarity=similarity)
+            for similarity, memory in ranked[:limit]
+        ]
+
+    async def search_lexical(
+        self,
+        user_id: str,
+        query: str,
+        limit: int,
+        category: Optional[str],
+        pending_only: bool,
+    ) -> List[Mapping[str, Any]]:
+        terms = _terms(query)
+        if not terms:
+            return []
+        ranked = []
+        for memory in self._user_memories(user_id):
+            if not memory["is_active"]:
+                continue
+            if category is not None and memory["category"] != category:
+                continue
+            if pending_only and memory["embedding_model"] is not None:
+                continue
+            document = _terms(f"{memory['entity_name'] or ''} {memory['content']}")
+            hits = len(terms & document)
+            if hits:
+                # Escala de ts_rank com normalização 32: rank / (rank + 1)
+                rank = hits / (1 + math.log(1 + len(document)))
+                ranked.append((rank / (rank + 1), memory))
+        ranked.sort(key=lambda pair: (-pair[0], -pair[1]["importance"]))
+        return [self._row(memory, similarity=rank) for rank, memory in ranked[:limit]]
+
+    # ------------------------------------------------------------------
+    # Episódios
+    # ------------------------------------------------------------------
+    def _insert_episode(self, episode: Dict[str, Any]) -> int:
+        if episode["user_id"] not in self._users:
+            raise LookupError(f"Utilizador inexistente: {episode['user_id']}")
+        episode_id = self._next_episode_id
+        self._next_episode_id += 1
+        self._episodes[episode_id] = {
+            "id": episode_id,
+            "user_id": episode["user_id"],
+            "session_id": episode["session_id"],
+            "summary": episode["summary"],
+            "key_topics": list(episode["key_topics"]),
+            "emotional_tone": episode["emotional_tone"],
+            "started_at": _timestamptz(episode["started_at"]),
+            "ended_at": _timestamptz(episode.get("ended_at")) or _now(),
+            "duration_minutes": episode["duration_minutes"],
+            "metadata": dict(episode.get("metadata") or {}),
+            "embedding": episode["embedding"],
+            "embedding_model": episode["model"] if episode["embedding"] is not None else None,
+        }
+        self._episodes_by_user.setdefault(episode["user_id"], []).append(episode_id)
+        self._episode_sessions.add(episode["session_id"])
+        return episode_id
+
+    async def insert_episode(
+        self,
+        user_id: str,
+        session_id: str,
+        summary: str,
+        key_topics: List[str],
+        emotional_tone: str,
+        embedding: Optional[List[float]],
+        started_at: datetime,
+        duration_minutes: int,
+        metadata: Dict[str, Any],
+        model: Optional[str],
+    ) -> int:
+        return self._insert_episode(
+            {
+                "user_id": user_id,
+                "session_id": session_id,
+                "summary": summary,
+                "key_topics": key_topics,
+                "emotional_tone": emotional_tone,
+                "embedding": embedding,
+                "started_at": started_at,
+                "duration_minutes": duration_minutes,
+                "metadata": metadata,
+                "model": model,
+            }
+        )
+
+    async def insert_episodes(self, episodes: List[Dict[str, Any]]) -> None:
+        for episode in episodes:
+            self._create_user(episode["user_id"])
+        for episode in episodes:
+            # Idempotente por sessão: um job repetido não duplica o episódio
+            if episode["session_id"] not in self._episode_sessions:
+                self._insert_episode(episode)
+
+    async def recent_episodes(self, user_id: str, limit: int) -> List[Mapping[str, Any]]:
+        episodes = [self._episodes[i] for i in self._episodes_by_user.get(user_id, [])]
+        episodes.sort(key=lambda e: (e["ended_at"], e["id"]), reverse=True)
+        return [
+            {
+                key: (list(e[key]) if key == "key_topics" else e[key])
+                for key in (
+                    "session_id", "summary", "key_topics", "emotional_tone",
+                    "started_at", "ended_at", "duration_minutes",
+                )
+            }
+            for e in episodes[:limit]
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._users),
+            "memories": sum(m["is_active"] for m in self._memories.values()),
+            "episodes": len(self._episodes),
+        }
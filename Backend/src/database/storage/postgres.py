@@ -0,0 +1,203 @@
+"""Backend PostgreSQL + pgvector (statements preparados de `statements.py`)."""
+
+import json
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Mapping
+
+from ..connection import DatabaseConnection
+from .base import MemoryBackend
+
+
+def to_vector(embedding: Optional[List[float]]) -> Optional[str]:
+    """Embedding no formato de texto do pgvector (None = pendente)."""
+    if embedding is None:
+        return None
+    return f"[{','.join(map(str, embedding))}]"
+
+
+class PostgresMemoryBackend(MemoryBackend):
+    """
+    Memórias em PostgreSQL: leituras de perfil, pesquisa e episódios podem
+    ir a réplicas; cada escrita marca o utilizador para read-your-writes.
+    """
+
+    name = "postgres"
+
+    async def user_exists(self, user_id: str) -> bool:
+        return await DatabaseConnection.fetchrow_prepared("user_exists", user_id) is not None
+
+    async def create_user(self, user_id: str, name: Optional[str] = None) -> None:
+        await DatabaseConnection.execute_prepared("user_create", user_id, name)
+        DatabaseConnection.mark_write(user_id)
+
+    async def get_profile(self, user_id: str) -> Optional[Mapping[str, Any]]:
+        return await DatabaseConnection.fetchrow_read("profile_get", user_id, user_id=user_id)
+
+    async def profile_memories(self, user_id: str) -> List[Mapping[str, Any]]:
+        return await DatabaseConnection.fetch_read("profile_memories", user_id, user_id=user_id)
+
+    async def insert_memory(
+        self,
+        user_id: str,
+        category: str,
+        entity_type: str,
+        entity_name: Optional[str],
+        content: str,
+        importance: int,
+        embedding: Optional[List[float]],
+        metadata: Dict[str, Any],
+        model: Optional[str],
+    ) -> Mapping[str, Any]:
+        row = await DatabaseConnection.fetchrow_prepared(
+            "memory_insert",
+            user_id,
+            category,
+            entity_type,
+            entity_name,
+            content,
+            importance,
+            to_vector(embedding),
+            json.dumps(metadata),
+            model,
+        )
+        DatabaseConnection.mark_write(user_id)
+        return row
+
+    async def find_similar_memory(
+        self, user_id: str, category: str, entity_type: str, entity_name: Optional[str]
+    ) -> Optional[Mapping[str, Any]]:
+        # entity_name NULL compara com IS NOT DISTINCT FROM (mesmo statement)
+        return await DatabaseConnection.fetchrow_prepared(
+            "memory_find_similar", user_id, category, entity_type, entity_name
+        )
+
+    async def memory_embedding_source(self, memory_id: int) -> Optional[Mapping[str, Any]]:
+        return await DatabaseConnection.fetchrow_prepared("memory_embedding_source", memory_id)
+
+    async def update_memory(
+        self,
+        memory_id: int,
+        content: Optional[str],
+        embedding: Optional[List[float]],
+        importance: Optional[int],
+        metadata: Optional[Dict[str, Any]],
+        model: Optional[str],
+        embedding_pending: bool,
+    ) -> Optional[Mapping[str, Any]]:
+        # Statement fixo: COALESCE mantém as colunas cujo parâmetro é NULL
+        row = await DatabaseConnection.fetchrow_prepared(
+            "memory_update",
+            memory_id,
+            content,
+            to_vector(embedding),
+            importance,
+            json.dumps(metadata) if metadata is not None else None,
+            model,
+            embedding_pending,
+        )
+        if row:
+            DatabaseConnection.mark_write(row["user_id"])
+        return row
+
+    async def deactivate_memory(self, memory_id: int) -> Optional[str]:
+        user_id = await DatabaseConnection.fetchval_prepared("memory_deactivate", memory_id)
+        if user_id is not None:
+            DatabaseConnection.mark_write(user_id)
+        return user_id
+
+    async def search_memories(
+        self,
+        user_id: str,
+        embedding: List[float],
+        min_similarity: float,
+        limit: int,
+        category: Optional[str],
+        model: str,
+    ) -> List[Mapping[str, Any]]:
+        return await DatabaseConnection.fetch_read(
+            "memory_search",
+            user_id,
+            to_vector(embedding),
+            min_similarity,
+            limit,
+            category,
+            model,
+            user_id=user_id,
+        )
+
+    async def search_lexical(
+        self,
+        user_id: str,
+        query: str,
+        limit: int,
+        category: Optional[str],
+        pending_only: bool,
+    ) -> List[Mapping[str, Any]]:
+        return await DatabaseConnection.fetch_read(
+            "memory_search_lexical",
+            user_id,
+            query,
+            limit,
+            category,
+            pending_only,
+            user_id=user_id,
+        )
+
+    async def insert_episode(
+        self,
+        user_id: str,
+        session_id: str,
+        summary: str,
+        key_topics: List[str],
+        emotional_tone: str,
+        embedding: Optional[List[float]],
+        started_at: datetime,
+        duration_minutes: int,
+        metadata: Dict[str, Any],
+        model: Optional[str],
+    ) -> int:
+        row = await DatabaseConnection.fetchrow_prepared(
+            "episode_insert",
+            user_id,
+            session_id,
+            summary,
+            key_topics,
+            emotional_tone,
+            to_vector(embedding),
+            started_at,
+            duration_minutes,
+            json.dumps(metadata),
+            model,
+        )
+        DatabaseConnection.mark_write(user_id)
+        return row["id"]
+
+    async def insert_episodes(self, episodes: List[Dict[str, Any]]) -> None:
+        user_ids = sorted({ep["user_id"] for ep in episodes})
+        async with DatabaseConnection.acquire() as conn:
+            async with conn.transaction():
+                await (await conn.prepared("users_create_many")).fetch(user_ids)
+                # Idempotente por sessão: um job repetido não duplica o episódio
+                await (await conn.prepared("episode_insert_once")).executemany(
+                    [
+                        (
+                            ep["user_id"],
+                            ep["session_id"],
+                            ep["summary"],
+                            ep["key_topics"],
+                            ep["emotional_tone"],
+                            to_vector(ep["embedding"]),
+                            ep["started_at"],
+                            ep["ended_at"],
+                            ep["duration_minutes"],
+                            json.dumps(ep.get("metadata") or {}),
+                            ep["model"],
+                        )
+                        for ep in episodes
+                    ],
+                )
+        for user_id in user_ids:
+            DatabaseConnection.mark_write(user_id)
+
+    async def recent_episodes(self, user_id: str, limit: int) -> List[Mapping[str, Any]]:
+        return await DatabaseConnection.fetch_read("episodes_recent", user_id, limit, user_id=user_id)
@@ -0,0 +1,29 @@
+"""Fornecedores de embeddings (Vertex AI ou local, sem rede)."""
+
+from typing import Optional
+
+from .providers import EmbeddingProvider, VertexEmbeddingProvider
+from .local import LocalEmbeddingProvider
+
+
+def get_embedding_provider(name: str) -> EmbeddingProvider:
+    """Fornecedor pelo nome de configuração ("vertex" ou "local")."""
+    if name == "vertex":
+        return VertexEmbeddingProvider()
+    if name == "local":
+        return LocalEmbeddingProvider()
+    raise ValueError(f"Fornecedor de embeddings desconhecido: {name}")
+
+
+def get_fallback_provider(name: str) -> Optional[EmbeddingProvider]:
+    """Fornecedor do modo degradado (None se não estiver configurado)."""
+    return get_embedding_provider(name) if name else None
+
+
+__all__ = [
+    "EmbeddingProvider",
+    "VertexEmbeddingProvider",
+    "LocalEmbeddingProvider",
+    "get_embedding_provider",
+    "get_fallback_provider",
+]
@@ -0,0 +1,100 @@
+"""Embeddings locais determinísticos (n-gramas de caracteres com hashing).
+
+Não precisam de rede nem de modelo: cada texto é normalizado (minúsculas,
+sem acentos), partido em n-gramas de caracteres e palavras, e cada n-grama
+soma ±1 numa de `dimensions` posições escolhida por hash (crc32, estável
+entre processos). O vetor é normalizado (norma L2 = 1), pelo que a
+similaridade de cosseno mede a sobreposição de n-gramas entre textos: uma
+pesquisa "quase lexical", tolerante a plurais e erros de escrita.
+
+Usos: testes e benchmarks reprodutíveis sem rede (`EMBEDDING_PROVIDER=local`)
+e modo degradado quando o Vertex falha (`EMBEDDING_FALLBACK_PROVIDER=local`).
+Não substitui a qualidade semântica de um modelo real.
+"""
+
+import re
+import unicodedata
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from .providers import EmbeddingProvider
+
+_WORD = re.compile(r"\w+")
+# Palavras funcionais (já sem acentos) ignoradas: não distinguem memórias
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de do da dos das em no na nos nas ao aos por pelo "
+    "pela para com sem e ou que se ja nao mais muito quando como foi era ser tem "
+    "ha eu ele ela eles elas me te lhe seu sua meu minha".split()
+)
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos ("Avó" -> "avo")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """Projeção de n-gramas de caracteres com hashing (ver docstring do módulo)."""
+
+    # Textos com poucas palavras em comum já ficam perto de 0.2
+    min_similarity = 0.2
+
+    def __init__(
+        self,
+        dimensions: Optional[int] = None,
+        ngram_range: Tuple[int, int] = (3, 4),
+    ):
+        self.dimensions = dimensions or settings.embedding_dimensions
+        self.ngram_range = ngram_range
+        # Versão no nome: mudar o algoritmo obriga a re-embeber
+        self.model = f"local-ngram-v1-{self.dimensions}"
+
+    def _features(self, text: str) -> List[str]:
+        """Palavras e n-gramas de caracteres de cada palavra (com limites)."""
+        features = []
+        low, high = self.ngram_range
+        for word in _WORD.findall(normalize_text(text)):
+            if word in STOPWORDS:
+                continue
+            features.append(word)
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        """Matriz (len(texts), dimensions) de float32 com linhas normalizadas."""
+        rows: List[int] = []
+        hashes: List[int] = []
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            rows.extend([row] * len(features))
+            hashes.extend(zlib.crc32(f.encode("utf-8")) for f in features)
+
+        count = len(texts)
+        if not hashes:
+            return np.zeros((count, self.dimensions), dtype=np.float32)
+
+        hashed = np.asarray(hashes, dtype=np.uint64)
+        buckets = (hashed % self.dimensions).astype(np.int64)
+        # Um bit do hash dá o sinal: colisões tendem a anular-se
+        signs = np.where((hashed >> 31) & 1, -1.0, 1.0)
+        flat = np.asarray(rows, dtype=np.int64) * self.dimensions + buckets
+        matrix = np.bincount(flat, weights=signs, minlength=count * self.dimensions)
+        matrix = matrix.reshape(count, self.dimensions)
+        # Frequência sublinear: uma palavra repetida não domina o texto
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        # Texto sem palavras: vetor nulo (o MemoryStore guarda-o como pendente)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix.astype(np.float32)
+
+    async def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        if model is not None and model != self.model:
+            raise ValueError(f"Modelo de embeddings não suportado localmente: {model}")
+        return self.embed_sync(texts).tolist()
@@ -0,0 +1,44 @@
+"""Interface dos fornecedores de embeddings e fornecedor Vertex AI."""
+
+from typing import List, Optional
+
+from google.genai import types
+
+from src.config import settings
+from src.vertex import get_api, get_client
+
+
+class EmbeddingProvider:
+    """
+    Gera embeddings de `dimensions` floats para lotes de textos.
+
+    `model` é o identificador gravado em `embedding_model` junto de cada
+    vetor: só vetores do mesmo modelo são comparados na pesquisa.
+    """
+
+    model: str
+    dimensions: int
+    # Similaridade mínima por omissão na pesquisa (depende da escala do modelo)
+    min_similarity: float = 0.5
+
+    async def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Embeddings dos textos, pela mesma ordem (levanta exceção se falhar)."""
+        raise NotImplementedError
+
+
+class VertexEmbeddingProvider(EmbeddingProvider):
+    """Embeddings do Vertex AI, através do cliente e limitador partilhados."""
+
+    def __init__(self, model: Optional[str] = None, dimensions: Optional[int] = None):
+        self.model = model or settings.embedding_model
+        self.dimensions = dimensions or settings.embedding_dimensions
+
+    async def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        # Pedido sujeito ao limitador do Vertex, com a prioridade do contexto
+        async with get_api("embeddings").call():
+            result = await get_client().aio.models.embed_content(
+                model=model or self.model,
+                contents=texts,
+                config=types.EmbedContentConfig(output_dimensionality=self.dimensions),
+            )
+        return [embedding.values for embedding in result.embeddings]
@@ -0,0 +1,6 @@
+"""Observabilidade - métricas leves em processo."""
+
+from .metrics import Histogram
+from . import tracing
+
+__all__ = ["Histogram", "tracing"]
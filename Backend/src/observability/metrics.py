@@ -0,0 +1,65 @@
+"""Métricas leves em memória (histogramas com buckets fixos)."""
+
+import bisect
+from typing import Dict, Any, List, Optional, Sequence
+
+# Buckets por omissão em milissegundos (adequados a latências de áudio e I/O)
+DEFAULT_BUCKETS_MS = (
+    1, 2, 5, 10, 20, 40, 60, 100, 150, 250, 400, 600, 1000, 2500, 5000, 10000,
+)
+
+
+class Histogram:
+    """Histograma de buckets fixos com contagem, soma, mínimo e máximo."""
+
+    __slots__ = ("buckets", "counts", "count", "total", "min", "max")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        # Último bucket corresponde a valores acima do maior limite (+Inf)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        """Regista uma observação."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimativa do percentil q (0-1) pelo limite superior do bucket."""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                if index < len(self.buckets):
+                    return min(self.buckets[index], self.max)
+                return self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Retorna um resumo serializável em JSON."""
+        return {
+            "count": self.count,
+            "avg": _round(self.total / self.count) if self.count else None,
+            "min": _round(self.min),
+            "max": _round(self.max),
+            "p50": _round(self.percentile(0.50)),
+            "p95": _round(self.percentile(0.95)),
+            "p99": _round(self.percentile(0.99)),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    """Arredonda valores para relatórios legíveis."""
+    return round(value, 3) if value is not None else None
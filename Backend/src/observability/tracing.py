@@ -0,0 +1,458 @@
+"""Tracing leve: spans por contextvars e decomposição da latência por turno.
+
+Cada conexão WebSocket amostrada (`TRACING_ENABLED`, `TRACING_SAMPLE_RATE`)
+abre um `Trace`. Os spans criados dentro dela (`with span("db.query")`,
+`@traced("memory.search_memories")`) herdam o pai pelo contexto asyncio,
+pelo que as tasks filhas (envio de áudio, tools) ficam no mesmo trace sem
+passar parâmetros. Fora de um trace, `span()` e `traced()` custam uma
+leitura de contextvar.
+
+Um turno começa no último chunk de entrada com voz do utilizador e a janela
+de silêncio termina no primeiro frame de resposta enviado ao cliente. No fim
+do turno (`turn_complete`/`interrupted`) a janela é decomposta:
+
+- tempo próprio de cada span dentro da janela (tool, memória, embeddings,
+  espera pelo limitador do Vertex, espera por conexão e query PostgreSQL)
+- `model`: o resto do tempo antes do primeiro áudio do Gemini (VAD do
+  servidor e inferência)
+- `output`: do primeiro áudio do Gemini ao primeiro frame enviado
+- `critical_path`: a sequência desses segmentos ao longo da janela
+
+Spans e turnos vão para o exportador configurado (`TRACING_EXPORTER`: file,
+log ou none), ou para um definido com `set_exporter()`.
+"""
+
+import functools
+import itertools
+import json
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Callable
+
+import structlog
+
+from src.config import settings
+from .metrics import Histogram
+
+logger = structlog.get_logger(__name__)
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+_span_ids = itertools.count(1)
+
+# Marcas de um turno
+MARK_MODEL = "model"  # Primeira mensagem do Gemini no turno (áudio ou tool call)
+MARK_AUDIO_OUT = "audio_out"  # Primeiro áudio do Gemini
+MARK_AUDIO_SENT = "audio_sent"  # Primeiro frame enviado ao cliente
+
+
+class Span:
+    """Operação medida dentro de um trace."""
+
+    __slots__ = (
+        "name", "trace", "parent", "turn", "span_id", "attributes",
+        "start_ns", "end_ns", "error",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace: "Trace",
+        parent: Optional["Span"],
+        attributes: Dict[str, Any],
+    ):
+        self.name = name
+        self.trace = trace
+        self.parent = parent
+        # Turno em curso quando o span começou (herdado do pai)
+        if parent is None:
+            self.turn = None
+        elif parent is trace.root:
+            self.turn = trace.turn
+        else:
+            self.turn = parent.turn
+        self.span_id = next(_span_ids)
+        self.attributes = attributes
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        """Acrescenta atributos ao span."""
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Termina o span e exporta-o."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.perf_counter_ns()
+        if error is not None:
+            self.error = type(error).__name__
+        if self.turn is not None and not self.turn.closed:
+            self.turn.spans.append(self)
+        self.trace.export(self.record())
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "type": "span",
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "turn": self.turn.turn_id if self.turn else None,
+            "start_us": self.trace.wall_us(self.start_ns),
+            "ms": round(self.duration_ms, 3),
+            "error": self.error,
+            **self.attributes,
+        }
+
+
+class Turn:
+    """Um turno da conversa: do fim da fala do utilizador ao fim da resposta."""
+
+    def __init__(self, turn_id: int, voice_end_ns: Optional[int]):
+        self.turn_id = turn_id
+        self.voice_end_ns = voice_end_ns
+        self.opened_ns = time.perf_counter_ns()
+        self.marks: Dict[str, int] = {}
+        self.spans: List[Span] = []
+        self.closed = False
+
+    def mark(self, name: str) -> None:
+        """Regista a primeira ocorrência de uma marca no turno."""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter_ns()
+
+    def breakdown(self, root: Span, end_ns: int) -> Dict[str, Any]:
+        """Decompõe a janela de silêncio pelos spans e pelo tempo do modelo."""
+        model_ns = self.marks.get(MARK_MODEL, self.opened_ns)
+        if self.voice_end_ns is not None and self.voice_end_ns <= model_ns:
+            start = self.voice_end_ns
+        else:
+            start = self.opened_ns
+        audio_out = self.marks.get(MARK_AUDIO_OUT)
+        end = self.marks.get(MARK_AUDIO_SENT, audio_out or end_ns)
+        window = (start, max(start, end))
+
+        def clip(span: Span) -> Tuple[int, int]:
+            span_end = span.end_ns if span.end_ns is not None else end_ns
+            return max(span.start_ns, window[0]), min(span_end, window[1])
+
+        # Tempo próprio de cada span (sem o dos filhos) dentro da janela
+        children: Dict[int, List[Span]] = {}
+        for span in self.spans:
+            if span.parent is not None:
+                children.setdefault(span.parent.span_id, []).append(span)
+        breakdown: Dict[str, float] = {}
+        for span in self.spans:
+            begin, finish = clip(span)
+            own = max(0, finish - begin)
+            for child in children.get(span.span_id, []):
+                child_begin, child_end = clip(child)
+                own -= max(0, child_end - child_begin)
+            if own > 0:
+                breakdown[span.name] = breakdown.get(span.name, 0.0) + own / 1e6
+
+        # Caminho crítico: spans de topo em sequência; os intervalos entre eles
+        # são tempo do modelo, e do primeiro áudio do Gemini ao envio é saída
+        output_start = max(window[0], min(audio_out, window[1])) if audio_out else window[1]
+        segments: List[Tuple[str, int, int]] = []
+        cursor = window[0]
+        top = sorted((s for s in self.spans if s.parent is root), key=lambda s: s.start_ns)
+        for span in top:
+            begin, finish = clip(span)
+            finish = min(finish, output_start)
+            if finish <= cursor:
+                continue
+            begin = max(begin, cursor)
+            if begin > cursor:
+                segments.append(("model", cursor, begin))
+            segments.append((span.name, begin, finish))
+            cursor = finish
+        if output_start > cursor:
+            segments.append(("model", cursor, output_start))
+        if window[1] > output_start:
+            segments.append(("output", output_start, window[1]))
+
+        for name in ("model", "output"):
+            total = sum(b - a for n, a, b in segments if n == name)
+            if total:
+                breakdown[name] = total / 1e6
+
+        return {
+            "turn": self.turn_id,
+            "voice": self.voice_end_ns is not None,
+            "silence_ms": round((window[1] - window[0]) / 1e6, 3),
+            "breakdown_ms": {name: round(ms, 3) for name, ms in sorted(breakdown.items())},
+            "critical_path": [
+                {"name": n, "at_ms": round((a - window[0]) / 1e6, 3), "ms": round((b - a) / 1e6, 3)}
+                for n, a, b in segments
+            ],
+        }
+
+
+class Trace:
+    """Trace de uma conexão: span raiz, turnos e exportação."""
+
+    def __init__(self, name: str, exporter: "SpanExporter", **attributes):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.exporter = exporter
+        self._wall_offset_ns = time.time_ns() - time.perf_counter_ns()
+        self.turn: Optional[Turn] = None
+        self.turns = 0
+        self._last_voice_ns: Optional[int] = None
+        self.root = Span(name, self, None, attributes)
+
+    def wall_us(self, perf_ns: int) -> int:
+        """Converte um instante `perf_counter_ns` para epoch em microssegundos."""
+        return (perf_ns + self._wall_offset_ns) // 1000
+
+    def activate(self) -> Token:
+        """Torna o span raiz o pai dos spans criados neste contexto."""
+        return _current.set(self.root)
+
+    def audio_in(self, voiced: bool) -> None:
+        """Chunk de entrada do utilizador (o último com voz inicia o próximo turno)."""
+        if voiced:
+            self._last_voice_ns = time.perf_counter_ns()
+
+    def mark(self, name: str, open_turn: bool = True) -> None:
+        """Marca do turno em curso; a primeira mensagem do modelo abre o turno."""
+        if self.turn is None:
+            if not open_turn:
+                return
+            self.turns += 1
+            self.turn = Turn(self.turns, self._last_voice_ns)
+            self._last_voice_ns = None
+            self.turn.mark(MARK_MODEL)
+        self.turn.mark(name)
+
+    def end_turn(self, event: str) -> Optional[Dict[str, Any]]:
+        """Fecha o turno em curso e exporta a decomposição da latência."""
+        turn, self.turn = self.turn, None
+        if turn is None:
+            return None
+        summary = {
+            "type": "turn",
+            "trace_id": self.trace_id,
+            "event": event,
+            **turn.breakdown(self.root, time.perf_counter_ns()),
+            **{k: v for k, v in self.root.attributes.items() if k in ("session_id", "user_id")},
+        }
+        turn.closed = True
+        tracing_metrics.observe(summary)
+        self.export(summary)
+        logger.info(
+            "Latência do turno",
+            turn=summary["turn"],
+            silence_ms=summary["silence_ms"],
+            breakdown_ms=summary["breakdown_ms"],
+            session_id=summary.get("session_id"),
+        )
+        return summary
+
+    def export(self, record: Dict[str, Any]) -> None:
+        try:
+            self.exporter.export(record)
+        except Exception as e:
+            logger.debug("Erro ao exportar trace", error=str(e))
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """Termina o trace (fecha o turno em curso e o span raiz)."""
+        if self.turn is not None:
+            self.end_turn("closed")
+        self.root.end(error)
+        self.exporter.flush()
+
+
+class _NoopSpan:
+    """Span usado fora de um trace: não mede nem exporta."""
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Any]:
+    """Mede o bloco como filho do span atual (no-op fora de um trace)."""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    current = Span(name, parent.trace, parent, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    else:
+        current.end()
+    finally:
+        _current.reset(token)
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Span sem ativação no contexto (ex.: a vida de um async generator)."""
+    parent = _current.get()
+    if parent is None:
+        return None
+    return Span(name, parent.trace, parent, attributes)
+
+
+def traced(name: str) -> Callable:
+    """Decorador de funções assíncronas: um span por chamada."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace do contexto atual, se houver."""
+    current = _current.get()
+    return current.trace if current is not None else None
+
+
+def start_trace(name: str, **attributes) -> Optional[Trace]:
+    """Abre um trace se o tracing estiver ativo e a conexão for amostrada."""
+    if not settings.tracing_enabled or random.random() >= settings.tracing_sample_rate:
+        return None
+    return Trace(name, get_exporter(), **attributes)
+
+
+# ----------------------------------------------------------------------
+# Exportadores
+# ----------------------------------------------------------------------
+class SpanExporter:
+    """Destino dos spans e dos resumos de turno (um dict JSON por registo)."""
+
+    def export(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class NullExporter(SpanExporter):
+    """Descarta tudo (só ficam as métricas agregadas e o log dos turnos)."""
+
+    def export(self, record: Dict[str, Any]) -> None:
+        pass
+
+
+class FileExporter(SpanExporter):
+    """Acrescenta os registos a um ficheiro JSON lines (escrita com buffer)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", buffering=1024 * 1024, encoding="utf-8")
+
+    def export(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, default=str) + "\n")
+        if record["type"] == "turn":
+            # Os turnos são raros: ficam logo visíveis para quem segue o ficheiro
+            self._file.flush()
+
+    def flush(self) -> None:
+        if not self._file.closed:
+            self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class LogExporter(SpanExporter):
+    """Envia os registos para o log estruturado (nível debug para os spans)."""
+
+    def export(self, record: Dict[str, Any]) -> None:
+        if record["type"] == "turn":
+            return  # Já registado por Trace.end_turn
+        logger.debug("Span", **record)
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def get_exporter() -> SpanExporter:
+    """Exportador do processo (criado a partir de `TRACING_EXPORTER`)."""
+    global _exporter
+    if _exporter is None:
+        kind = settings.tracing_exporter
+        if kind == "file":
+            _exporter = FileExporter(settings.tracing_file)
+        elif kind == "log":
+            _exporter = LogExporter()
+        elif kind in ("none", ""):
+            _exporter = NullExporter()
+        else:
+            raise ValueError(f"Exportador de tracing desconhecido: {kind}")
+    return _exporter
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Substitui o exportador do processo (exportadores próprios e testes)."""
+    global _exporter
+    if _exporter is not None and _exporter is not exporter:
+        _exporter.close()
+    _exporter = exporter
+
+
+def shutdown() -> None:
+    """Escreve o que falta e fecha o exportador."""
+    set_exporter(None)
+
+
+# ----------------------------------------------------------------------
+# Métricas agregadas dos turnos (por processo)
+# ----------------------------------------------------------------------
+class TracingMetrics:
+    """Histogramas do silêncio por turno e de cada componente da decomposição."""
+
+    def __init__(self):
+        self.turns = 0
+        self.silence_ms = Histogram()
+        self.breakdown_ms: Dict[str, Histogram] = {}
+
+    def observe(self, summary: Dict[str, Any]) -> None:
+        self.turns += 1
+        self.silence_ms.observe(summary["silence_ms"])
+        for name, ms in summary["breakdown_ms"].items():
+            histogram = self.breakdown_ms.get(name)
+            if histogram is None:
+                histogram = self.breakdown_ms[name] = Histogram()
+            histogram.observe(ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "silence_ms": self.silence_ms.snapshot(),
+            "breakdown_ms": {
+                name: self.breakdown_ms[name].snapshot() for name in sorted(self.breakdown_ms)
+            },
+        }
+
+
+tracing_metrics = TracingMetrics()
@@ -0,0 +1,207 @@
+"""Controlo de admissão: limites de sessões concorrentes e fila de espera."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+
+import structlog
+
+from src.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# Close codes enviados ao cliente quando a admissão é recusada
+CLOSE_CODE_BUSY = 1013  # Try Again Later
+CLOSE_CODE_USER_LIMIT = 1008  # Policy Violation
+
+# Prioridades na fila (menor = primeiro)
+PRIORITY_RECONNECT = 0
+PRIORITY_NORMAL = 1
+
+
+class AdmissionRejected(Exception):
+    """A conexão não foi admitida; contém o close code e o motivo."""
+
+    def __init__(self, code: int, reason: str):
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Limita o número de sessões concorrentes (global e por utilizador).
+
+    Quando não há capacidade, as conexões esperam numa fila curta com
+    timeout; utilizadores que desconectaram recentemente (reconexões) passam
+    à frente. Assim, um pico de tráfego traduz-se em rejeições claras em vez
+    de degradar todas as sessões ativas (pool PostgreSQL e quota Vertex).
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_sessions_per_user: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        queue_timeout_s: Optional[float] = None,
+        reconnect_window_s: Optional[float] = None,
+    ):
+        self.max_sessions = settings.max_sessions if max_sessions is None else max_sessions
+        self.max_sessions_per_user = (
+            settings.max_sessions_per_user if max_sessions_per_user is None else max_sessions_per_user
+        )
+        self.queue_size = settings.admission_queue_size if queue_size is None else queue_size
+        self.queue_timeout_s = (
+            settings.admission_queue_timeout_s if queue_timeout_s is None else queue_timeout_s
+        )
+        self.reconnect_window_s = (
+            settings.admission_reconnect_window_s if reconnect_window_s is None else reconnect_window_s
+        )
+
+        self.active = 0
+        self.per_user: Dict[str, int] = {}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._recent_disconnects: Dict[str, float] = {}
+
+        # Contadores
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.rejected_busy = 0
+        self.rejected_user_limit = 0
+        self.rejected_timeout = 0
+
+    def _has_capacity(self) -> bool:
+        return self.max_sessions <= 0 or self.active < self.max_sessions
+
+    def _user_at_limit(self, user_id: str) -> bool:
+        return (
+            self.max_sessions_per_user > 0
+            and self.per_user.get(user_id, 0) >= self.max_sessions_per_user
+        )
+
+    def _grant(self, user_id: str) -> None:
+        self.active += 1
+        self.per_user[user_id] = self.per_user.get(user_id, 0) + 1
+        self.admitted_total += 1
+
+    def is_reconnect(self, user_id: str) -> bool:
+        """Indica se o utilizador desconectou dentro da janela de reconexão."""
+        disconnected_at = self._recent_disconnects.get(user_id)
+        return (
+            disconnected_at is not None
+            and time.monotonic() - disconnected_at <= self.reconnect_window_s
+        )
+
+    async def acquire(
+        self,
+        user_id: str,
+        reconnect: bool = False,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Admite uma sessão ou lança AdmissionRejected.
+
+        Args:
+            user_id: Utilizador da conexão
+            reconnect: Força prioridade de reconexão
+            on_queued: Callback chamado com a posição quando a conexão espera
+        """
+        if self._user_at_limit(user_id):
+            self.rejected_user_limit += 1
+            raise AdmissionRejected(
+                CLOSE_CODE_USER_LIMIT, "Demasiadas sessões para este utilizador"
+            )
+
+        # Os que esperam e já podem entrar vão primeiro; os que continuam na
+        # fila com capacidade livre estão no limite do utilizador
+        self._wake_waiters()
+        if self._has_capacity():
+            self._grant(user_id)
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_busy += 1
+            raise AdmissionRejected(CLOSE_CODE_BUSY, "Servidor ocupado, tente novamente")
+
+        priority = PRIORITY_RECONNECT if reconnect or self.is_reconnect(user_id) else PRIORITY_NORMAL
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), user_id, future))
+        self.queued_total += 1
+
+        try:
+            if on_queued:
+                await on_queued(len(self._waiters))
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Admitido no mesmo instante em que expirou o timeout
+                return
+            self._remove_waiter(future)
+            self.rejected_timeout += 1
+            raise AdmissionRejected(CLOSE_CODE_BUSY, "Tempo de espera esgotado, tente novamente")
+        except BaseException:
+            # Conexão abandonada enquanto esperava
+            if future.done() and not future.cancelled():
+                self.release(user_id, disconnected=False)
+            else:
+                self._remove_waiter(future)
+            raise
+
+    def _remove_waiter(self, future: asyncio.Future) -> None:
+        """Retira uma conexão da fila de espera."""
+        future.cancel()
+        self._waiters = [entry for entry in self._waiters if entry[3] is not future]
+        heapq.heapify(self._waiters)
+
+    def release(self, user_id: str, disconnected: bool = True) -> None:
+        """Liberta a sessão de um utilizador e admite o próximo da fila."""
+        self.active = max(0, self.active - 1)
+        count = self.per_user.get(user_id, 0) - 1
+        if count > 0:
+            self.per_user[user_id] = count
+        else:
+            self.per_user.pop(user_id, None)
+        if disconnected:
+            self._recent_disconnects[user_id] = time.monotonic()
+            self._prune_disconnects()
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        """Admite conexões em espera enquanto houver capacidade."""
+        skipped = []
+        while self._waiters and self._has_capacity():
+            entry = heapq.heappop(self._waiters)
+            _, _, user_id, future = entry
+            if future.done():
+                continue
+            if self._user_at_limit(user_id):
+                skipped.append(entry)
+                continue
+            self._grant(user_id)
+            future.set_result(True)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def _prune_disconnects(self) -> None:
+        cutoff = time.monotonic() - self.reconnect_window_s
+        if len(self._recent_disconnects) > 1000:
+            self._recent_disconnects = {
+                user_id: at for user_id, at in self._recent_disconnects.items() if at >= cutoff
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Carga atual do servidor."""
+        return {
+            "active_sessions": self.active,
+            "max_sessions": self.max_sessions,
+            "load": round(self.active / self.max_sessions, 3) if self.max_sessions > 0 else None,
+            "waiting": len(self._waiters),
+            "admitted_total": self.admitted_total,
+            "queued_total": self.queued_total,
+            "rejected_busy": self.rejected_busy,
+            "rejected_user_limit": self.rejected_user_limit,
+            "rejected_timeout": self.rejected_timeout,
+        }
@@ -0,0 +1,170 @@
+"""Codecs de transporte de áudio no WebSocket (PCM ou Opus)."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any
+
+import numpy as np
+import structlog
+
+from src.config import settings
+from src.observability import Histogram
+
+logger = structlog.get_logger(__name__)
+
+try:
+    import opuslib
+except Exception:  # opuslib lança Exception genérica se a libopus não existir
+    opuslib = None
+
+OPUS_AVAILABLE = opuslib is not None
+
+# Formatos PCM do Gemini Live
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+BYTES_PER_SAMPLE = 2
+
+# Durações de frame aceites pelo encoder Opus (ms)
+OPUS_FRAME_DURATIONS_MS = (10, 20, 40, 60)
+
+# Pool partilhado para o trabalho de codec, fora do event loop
+_codec_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Obtém (ou cria) o executor partilhado dos codecs."""
+    global _codec_executor
+    if _codec_executor is None:
+        _codec_executor = ThreadPoolExecutor(
+            max_workers=settings.audio_codec_threads,
+            thread_name_prefix="audio-codec",
+        )
+    return _codec_executor
+
+
+def is_voiced(pcm: bytes, threshold: int) -> bool:
+    """True se algum sample PCM 16 bits atinge a amplitude `threshold`."""
+    samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // BYTES_PER_SAMPLE)
+    return samples.size > 0 and int(np.abs(samples, dtype=np.int32).max()) >= threshold
+
+
+class PcmCodec:
+    """Transporte PCM raw (por omissão): sem conversão, apenas métricas."""
+
+    name = "pcm"
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.wire_bytes_in = 0
+        self.wire_bytes_out = 0
+        self.pcm_bytes_in = 0
+        self.pcm_bytes_out = 0
+        self.cpu_ms_total = 0.0
+        self.decode_ms = Histogram()
+        self.encode_ms = Histogram()
+
+    async def decode(self, data: bytes) -> bytes:
+        """Converte um pacote recebido do cliente em PCM 16 kHz."""
+        self.wire_bytes_in += len(data)
+        self.pcm_bytes_in += len(data)
+        return data
+
+    async def encode(self, pcm: bytes) -> bytes:
+        """Converte um frame PCM 24 kHz no formato enviado ao cliente."""
+        self.wire_bytes_out += len(pcm)
+        self.pcm_bytes_out += len(pcm)
+        return pcm
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de largura de banda e custo de CPU da sessão."""
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        return {
+            "codec": self.name,
+            "wire_bytes_in": self.wire_bytes_in,
+            "wire_bytes_out": self.wire_bytes_out,
+            "pcm_bytes_in": self.pcm_bytes_in,
+            "pcm_bytes_out": self.pcm_bytes_out,
+            "kbps_in": round(self.wire_bytes_in * 8 / elapsed / 1000, 1),
+            "kbps_out": round(self.wire_bytes_out * 8 / elapsed / 1000, 1),
+            "cpu_ms_total": round(self.cpu_ms_total, 3),
+            "decode_ms": self.decode_ms.snapshot(),
+            "encode_ms": self.encode_ms.snapshot(),
+        }
+
+
+class OpusCodec(PcmCodec):
+    """
+    Transporte Opus: o cliente envia e recebe pacotes Opus (um por mensagem).
+
+    A descodificação/codificação corre no executor partilhado; cada conexão
+    chama o seu codec sequencialmente, pelo que o estado do encoder e do
+    decoder nunca é usado por duas threads ao mesmo tempo.
+    """
+
+    name = "opus"
+
+    def __init__(self, frame_ms: int):
+        super().__init__()
+        if frame_ms not in OPUS_FRAME_DURATIONS_MS:
+            raise ValueError(f"Duração de frame inválida para Opus: {frame_ms}ms")
+        self.frame_samples = OUTPUT_SAMPLE_RATE * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * BYTES_PER_SAMPLE
+        # Máximo de amostras num pacote Opus (120 ms a 16 kHz)
+        self.max_decode_samples = INPUT_SAMPLE_RATE * 120 // 1000
+
+        self._decoder = opuslib.Decoder(INPUT_SAMPLE_RATE, 1)
+        self._encoder = opuslib.Encoder(OUTPUT_SAMPLE_RATE, 1, opuslib.APPLICATION_VOIP)
+        self._encoder.bitrate = settings.audio_opus_bitrate
+
+    def _decode_sync(self, data: bytes):
+        started = time.thread_time()
+        pcm = self._decoder.decode(data, self.max_decode_samples)
+        return pcm, (time.thread_time() - started) * 1000
+
+    def _encode_sync(self, pcm: bytes):
+        started = time.thread_time()
+        if len(pcm) < self.frame_bytes:
+            # Frame parcial (fim de turno): completar com silêncio
+            pcm = pcm + b"\x00" * (self.frame_bytes - len(pcm))
+        packet = self._encoder.encode(pcm, self.frame_samples)
+        return packet, (time.thread_time() - started) * 1000
+
+    async def decode(self, data: bytes) -> bytes:
+        loop = asyncio.get_running_loop()
+        pcm, cpu_ms = await loop.run_in_executor(_get_executor(), self._decode_sync, data)
+        self.wire_bytes_in += len(data)
+        self.pcm_bytes_in += len(pcm)
+        self.cpu_ms_total += cpu_ms
+        self.decode_ms.observe(cpu_ms)
+        return pcm
+
+    async def encode(self, pcm: bytes) -> bytes:
+        loop = asyncio.get_running_loop()
+        packet, cpu_ms = await loop.run_in_executor(_get_executor(), self._encode_sync, pcm)
+        self.wire_bytes_out += len(packet)
+        self.pcm_bytes_out += len(pcm)
+        self.cpu_ms_total += cpu_ms
+        self.encode_ms.observe(cpu_ms)
+        return packet
+
+
+def create_codec(requested: Optional[str]) -> PcmCodec:
+    """Negoceia o codec pedido pelo cliente, com fallback para PCM."""
+    if requested == OpusCodec.name:
+        if not settings.audio_opus_enabled:
+            logger.info("Opus pedido mas desativado na configuração, a usar PCM")
+        elif not OPUS_AVAILABLE:
+            logger.warning("Opus pedido mas libopus não está disponível, a usar PCM")
+        else:
+            try:
+                return OpusCodec(frame_ms=settings.audio_output_frame_ms)
+            except Exception as e:  # ValueError (duração de frame) ou OpusError
+                logger.error(
+                    "Não foi possível criar o codec Opus, a usar PCM",
+                    frame_ms=settings.audio_output_frame_ms,
+                    error=str(e),
+                )
+    elif requested not in (None, PcmCodec.name):
+        logger.warning("Codec desconhecido pedido pelo cliente", codec=requested)
+    return PcmCodec()
@@ -0,0 +1,212 @@
+"""Pipeline de saída de áudio: agregação em frames e backpressure por cliente."""
+
+import asyncio
+import time
+from enum import Enum
+from typing import Optional, Dict, Any, Tuple
+
+from websockets.server import WebSocketServerProtocol
+import structlog
+
+from src.config import settings
+from src.observability import Histogram
+from src.observability.tracing import MARK_AUDIO_SENT, Trace
+from src.server.audio_codec import PcmCodec, OUTPUT_SAMPLE_RATE, BYTES_PER_SAMPLE
+from src.server.framing import FrameTracker
+
+logger = structlog.get_logger(__name__)
+
+# Close code 1013 (Try Again Later) para clientes demasiado lentos
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+
+class SlowClientPolicy(str, Enum):
+    """Política aplicada quando o buffer de saída de um cliente enche."""
+
+    DROP = "drop"  # Descarta os frames mais antigos e continua
+    DISCONNECT = "disconnect"  # Fecha a conexão (o cliente pode reconectar)
+
+
+class AudioOutputPipeline:
+    """
+    Agrega os parts PCM do Gemini em frames de duração fixa e envia-os
+    para o cliente numa task própria, através de um buffer limitado.
+
+    O loop de receção do Gemini apenas chama `push()` (não bloqueante), pelo
+    que um cliente lento nunca atrasa `live_session.receive()`.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocketServerProtocol,
+        frame_ms: Optional[int] = None,
+        buffer_ms: Optional[int] = None,
+        policy: Optional[str] = None,
+        sample_rate: int = OUTPUT_SAMPLE_RATE,
+        codec: Optional[PcmCodec] = None,
+        framer: Optional[FrameTracker] = None,
+        trace: Optional[Trace] = None,
+    ):
+        self.websocket = websocket
+        self.codec = codec or PcmCodec()
+        self.framer = framer
+        self.trace = trace
+        self.frame_ms = frame_ms or settings.audio_output_frame_ms
+        self.frame_bytes = sample_rate * BYTES_PER_SAMPLE * self.frame_ms // 1000
+        self.max_frames = max(1, (buffer_ms or settings.audio_output_buffer_ms) // self.frame_ms)
+        self.policy = SlowClientPolicy(policy or settings.audio_output_slow_client_policy)
+
+        self._pending = bytearray()
+        self._queue: asyncio.Queue[Optional[Tuple[bytes, float, Any]]] = asyncio.Queue(
+            maxsize=self.max_frames
+        )
+        self._writer_task: Optional[asyncio.Task] = None
+        self._overflowed = False
+
+        # Métricas por conexão
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_dropped = 0
+        self.frames_discarded = 0
+        self.max_queue_depth = 0
+        self.send_lag_ms = Histogram()
+
+    def start(self) -> None:
+        """Inicia a task de escrita no socket."""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+
+    def push(self, data: bytes) -> None:
+        """Acrescenta áudio do modelo e enfileira os frames completos."""
+        if self._overflowed:
+            return
+        self._pending.extend(data)
+        while len(self._pending) >= self.frame_bytes:
+            frame = bytes(self._pending[: self.frame_bytes])
+            del self._pending[: self.frame_bytes]
+            self._enqueue(frame)
+
+    def flush(self) -> None:
+        """Envia o frame parcial pendente (ex.: no fim de um turno)."""
+        if self._pending and not self._overflowed:
+            # Garantir alinhamento a amostras de 16-bit
+            usable = len(self._pending) - (len(self._pending) % BYTES_PER_SAMPLE)
+            if usable:
+                self._enqueue(bytes(self._pending[:usable]))
+        self._pending.clear()
+
+    def clear(self) -> None:
+        """Descarta todo o áudio ainda não enviado (ex.: interrupção do utilizador)."""
+        self._pending.clear()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is None:
+                # Preservar o sinal de paragem
+                self._queue.put_nowait(None)
+                break
+            self.frames_discarded += 1
+
+    def _enqueue(self, frame: bytes) -> None:
+        """Enfileira um frame aplicando a política de cliente lento."""
+        # A etiqueta do protocolo de frames é fixada no enfileiramento (turno)
+        tag = self.framer.output_tag() if self.framer else None
+        item = (frame, time.perf_counter(), tag)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if self.policy == SlowClientPolicy.DISCONNECT:
+                self._handle_overflow()
+                return
+            # DROP: descartar o frame mais antigo para dar lugar ao novo
+            try:
+                self._queue.get_nowait()
+                self.frames_dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+            self._queue.put_nowait(item)
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def _handle_overflow(self) -> None:
+        """Fecha a conexão de um cliente que ficou demasiado atrasado."""
+        self._overflowed = True
+        self._pending.clear()
+        self.frames_dropped += 1
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self.frames_dropped += 1
+        logger.warning(
+            "Cliente demasiado lento, a fechar conexão",
+            buffered_ms=self.max_frames * self.frame_ms,
+        )
+        asyncio.create_task(
+            self.websocket.close(SLOW_CLIENT_CLOSE_CODE, "Cliente demasiado lento")
+        )
+
+    async def _writer(self) -> None:
+        """Envia os frames enfileirados para o cliente."""
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    break
+                frame, enqueued_at, tag = item
+                payload = await self.codec.encode(frame)
+                if self.framer:
+                    payload = self.framer.pack_output(payload, tag)
+                await self.websocket.send(payload)
+                if self.trace:
+                    self.trace.mark(MARK_AUDIO_SENT, open_turn=False)
+                self.send_lag_ms.observe((time.perf_counter() - enqueued_at) * 1000)
+                self.frames_sent += 1
+                self.bytes_sent += len(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Escrita de áudio terminada", reason=str(e))
+
+    async def close(self, drain_timeout: float = 2.0) -> None:
+        """Envia o áudio pendente e termina a task de escrita."""
+        if self._writer_task is None:
+            return
+        self.flush()
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            # Buffer cheio: não vale a pena esperar pelo resto
+            self.clear()
+            self._queue.put_nowait(None)
+        try:
+            await asyncio.wait_for(self._writer_task, timeout=drain_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._writer_task.cancel()
+        self._writer_task = None
+
+    @property
+    def writer_running(self) -> bool:
+        """Indica se a task de escrita no socket está ativa."""
+        return self._writer_task is not None and not self._writer_task.done()
+
+    def queue_depth(self) -> int:
+        """Frames na fila à espera de envio."""
+        return self._queue.qsize()
+
+    def buffered_bytes(self) -> int:
+        """Áudio PCM em memória à espera de envio."""
+        return len(self._pending) + self._queue.qsize() * self.frame_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de envio desta conexão."""
+        return {
+            "frame_ms": self.frame_ms,
+            "policy": self.policy.value,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "frames_dropped": self.frames_dropped,
+            "frames_discarded": self.frames_discarded,
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "send_lag_ms": self.send_lag_ms.snapshot(),
+        }
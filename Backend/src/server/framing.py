@@ -0,0 +1,215 @@
+"""Protocolo binário de frames de áudio com sequência e timestamps.
+
+Cada mensagem binária (quando negociado com `?framing=1`) começa com um
+cabeçalho de 20 bytes, little-endian:
+
+    version  u8   Versão do protocolo (1)
+    type     u8   Tipo de frame (FrameType)
+    flags    u16  Flags (FRAME_FLAG_*)
+    seq      u32  Número de sequência, por direção
+    ts_us    i64  Cliente -> servidor: timestamp de captura (relógio do cliente)
+                  Servidor -> cliente: timestamp de captura do último frame
+                  com voz do utilizador a que este turno responde
+    turn_id  u32  Identificador do turno do agente
+
+Seguido do payload de áudio (PCM ou Opus, conforme o codec negociado).
+"""
+
+import struct
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Optional, Dict, Any, Tuple
+
+import structlog
+
+from src.observability import Histogram
+
+logger = structlog.get_logger(__name__)
+
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<BBHIqI")
+FRAME_HEADER_SIZE = FRAME_HEADER.size
+
+# O frame contém voz segundo o VAD do cliente
+FRAME_FLAG_VOICE = 0x0001
+# Primeiro frame de áudio de um turno do agente
+FRAME_FLAG_TURN_START = 0x0002
+
+SEQ_MODULO = 2**32
+
+
+class FrameType(IntEnum):
+    """Tipos de frame binário."""
+
+    AUDIO = 1
+
+
+@dataclass
+class FrameHeader:
+    """Cabeçalho de um frame binário."""
+
+    type: int
+    seq: int
+    timestamp_us: int
+    turn_id: int
+    flags: int = 0
+    version: int = FRAME_VERSION
+
+    def pack(self) -> bytes:
+        """Serializa o cabeçalho."""
+        return FRAME_HEADER.pack(
+            self.version, self.type, self.flags, self.seq % SEQ_MODULO,
+            self.timestamp_us, self.turn_id % SEQ_MODULO,
+        )
+
+
+def unpack_frame(message: bytes) -> Tuple[FrameHeader, bytes]:
+    """Separa cabeçalho e payload de uma mensagem binária."""
+    if len(message) < FRAME_HEADER_SIZE:
+        raise ValueError(f"Frame demasiado curto: {len(message)} bytes")
+    version, frame_type, flags, seq, timestamp_us, turn_id = FRAME_HEADER.unpack_from(message)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Versão de frame não suportada: {version}")
+    header = FrameHeader(
+        type=frame_type, seq=seq, timestamp_us=timestamp_us,
+        turn_id=turn_id, flags=flags, version=version,
+    )
+    return header, message[FRAME_HEADER_SIZE:]
+
+
+class FrameTracker:
+    """
+    Estado do protocolo de frames de uma conexão.
+
+    Deteta frames perdidos/reordenados, calcula o jitter de chegada
+    (RFC 3550) e mede a latência conversacional:
+
+    - `server_response_ms`: chegada do último frame com voz até ao envio do
+      primeiro frame de resposta (relógio do servidor)
+    - `mouth_to_ear_ms`: captura do último frame com voz até ao início da
+      reprodução no cliente, reportado via `playback_started` (relógio do
+      cliente nas duas pontas, pelo que não depende de sincronização)
+    """
+
+    def __init__(self):
+        # Entrada (cliente -> servidor)
+        self.frames_received = 0
+        self.frames_lost = 0
+        self.frames_reordered = 0
+        self._expected_seq: Optional[int] = None
+        self._last_transit_ms: Optional[float] = None
+        self.jitter_ms = 0.0
+
+        # Último frame com voz do utilizador (ou último frame, sem VAD no cliente)
+        self._last_voice_capture_us = 0
+        self._last_voice_arrival: Optional[float] = None
+        self._client_uses_vad = False
+        # VAD do cliente para o último frame (None se o cliente não usa VAD)
+        self.last_input_voice: Optional[bool] = None
+
+        # Saída (servidor -> cliente)
+        self.turn_id = 1
+        self._out_seq = 0
+        self._turn_reply_to_us: Optional[int] = None
+        self._turn_voice_arrival: Optional[float] = None
+        self._last_sent_turn = 0
+
+        self.server_response_ms = Histogram()
+        self.mouth_to_ear_ms = Histogram()
+
+    def on_input(self, message: bytes) -> bytes:
+        """Processa um frame recebido e retorna o payload de áudio (vazio se descartado)."""
+        header, payload = unpack_frame(message)
+        arrival = time.perf_counter()
+        self.frames_received += 1
+
+        # Perdas e reordenação pela sequência
+        if self._expected_seq is None or header.seq == self._expected_seq:
+            self._expected_seq = (header.seq + 1) % SEQ_MODULO
+        elif (header.seq - self._expected_seq) % SEQ_MODULO < SEQ_MODULO // 2:
+            self.frames_lost += (header.seq - self._expected_seq) % SEQ_MODULO
+            self._expected_seq = (header.seq + 1) % SEQ_MODULO
+        else:
+            # Frame atrasado (já contado como perdido): descartar, porque o
+            # áudio seguinte já foi enviado ao modelo
+            self.frames_reordered += 1
+            self.frames_lost = max(0, self.frames_lost - 1)
+            return b""
+
+        # Jitter de chegada (RFC 3550), em ms
+        transit_ms = arrival * 1000 - header.timestamp_us / 1000
+        if self._last_transit_ms is not None:
+            delta = abs(transit_ms - self._last_transit_ms)
+            self.jitter_ms += (delta - self.jitter_ms) / 16
+        self._last_transit_ms = transit_ms
+
+        if header.flags & FRAME_FLAG_VOICE:
+            self._client_uses_vad = True
+        if self._client_uses_vad:
+            self.last_input_voice = bool(header.flags & FRAME_FLAG_VOICE)
+        if header.flags & FRAME_FLAG_VOICE or not self._client_uses_vad:
+            self._last_voice_capture_us = header.timestamp_us
+            self._last_voice_arrival = arrival
+
+        return payload
+
+    def output_tag(self) -> Tuple[int, int, Optional[float]]:
+        """Etiqueta (turn_id, reply_to_us, chegada) de um frame de saída enfileirado."""
+        if self._turn_reply_to_us is None:
+            # Primeiro frame do turno: fixar o frame de voz a que responde
+            self._turn_reply_to_us = self._last_voice_capture_us
+            self._turn_voice_arrival = self._last_voice_arrival
+        return self.turn_id, self._turn_reply_to_us, self._turn_voice_arrival
+
+    def pack_output(self, payload: bytes, tag: Tuple[int, int, Optional[float]]) -> bytes:
+        """Acrescenta o cabeçalho a um frame de saída, no momento do envio."""
+        turn_id, reply_to_us, voice_arrival = tag
+        flags = 0
+        if turn_id != self._last_sent_turn:
+            # Primeiro frame enviado deste turno
+            self._last_sent_turn = turn_id
+            flags |= FRAME_FLAG_TURN_START
+            if voice_arrival is not None:
+                self.server_response_ms.observe(
+                    (time.perf_counter() - voice_arrival) * 1000
+                )
+        header = FrameHeader(
+            type=FrameType.AUDIO, seq=self._out_seq, timestamp_us=reply_to_us,
+            turn_id=turn_id, flags=flags,
+        )
+        self._out_seq += 1
+        return header.pack() + payload
+
+    def next_turn(self) -> None:
+        """Avança para o próximo turno do agente (turn_complete/interrupted)."""
+        if self._turn_reply_to_us is None:
+            # Turno sem áudio: manter o mesmo identificador
+            return
+        self.turn_id += 1
+        self._turn_reply_to_us = None
+        self._turn_voice_arrival = None
+
+    def on_playback(self, message: Dict[str, Any]) -> None:
+        """Regista um `playback_started` reportado pelo cliente."""
+        try:
+            reply_to_us = int(message["reply_to_us"])
+            played_at_us = int(message["timestamp_us"])
+        except (KeyError, TypeError, ValueError):
+            logger.warning("playback_started inválido", message=message)
+            return
+        if reply_to_us > 0 and played_at_us >= reply_to_us:
+            self.mouth_to_ear_ms.observe((played_at_us - reply_to_us) / 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de transporte e latência da conexão."""
+        return {
+            "frames_received": self.frames_received,
+            "frames_lost": self.frames_lost,
+            "frames_reordered": self.frames_reordered,
+            "jitter_ms": round(self.jitter_ms, 3),
+            "frames_sent": self._out_seq,
+            "turns": self.turn_id - (0 if self._turn_reply_to_us is not None else 1),
+            "server_response_ms": self.server_response_ms.snapshot(),
+            "mouth_to_ear_ms": self.mouth_to_ear_ms.snapshot(),
+        }
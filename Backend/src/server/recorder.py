@@ -0,0 +1,453 @@
+"""Gravação das sessões (áudio e eventos) em segmentos mapeados em memória.
+
+Cada conexão gravada escreve numa diretoria própria,
+`RECORDING_DIR/AAAA-MM-DD/<session_id>-<connection_id>/`, uma sequência de
+segmentos `seg-000001.rec`, `seg-000002.rec`, ... Cada segmento é
+pré-alocado com `RECORDING_SEGMENT_MB` e mapeado em memória (mmap): gravar um
+chunk é uma cópia para a página mapeada, sem syscalls nem espera de disco no
+caminho de áudio. A alocação do segmento seguinte (a meio do atual), o fecho
+do anterior e a remoção dos antigos correm numa thread, pelo que a rotação
+só troca o mapeamento. Como o mapeamento é partilhado com o ficheiro, o que foi
+gravado sobrevive a um crash do processo.
+
+Layout de um segmento (little-endian):
+
+    cabeçalho (128 bytes)
+        magic       8s   b"EMPREC01"
+        version     u16
+        reserved    u16
+        index       u32  Número do segmento (1, 2, ...)
+        started_at  f64  Início da gravação (epoch, igual em todos os segmentos)
+        session_id  48s  UTF-8, preenchido com zeros
+    registos, até ao primeiro tipo 0 (espaço pré-alocado por usar)
+        kind        u8   RecordKind
+        flags       u8
+        reserved    u16
+        length      u32  Bytes do payload
+        t_us        i64  Microssegundos desde o início da gravação
+        payload     PCM 16 bits (16 kHz na entrada, 24 kHz na saída) ou JSON
+
+O payload é escrito antes do cabeçalho do registo, pelo que um registo
+visível está sempre completo. Só os `RECORDING_MAX_SEGMENTS` segmentos mais
+recentes de cada conexão são mantidos (os minutos antes de uma queixa), e as
+gravações com mais de `RECORDING_RETENTION_HOURS` são apagadas.
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import shutil
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from enum import IntEnum
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, List, Set, Tuple
+
+import structlog
+
+from src.config import settings
+
+logger = structlog.get_logger(__name__)
+
+SEGMENT_MAGIC = b"EMPREC01"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct("<8sHHId48s")
+SEGMENT_HEADER_SIZE = 128
+RECORD_HEADER = struct.Struct("<BBHIq")
+
+# Limpeza de gravações antigas no máximo uma vez por este intervalo
+PRUNE_INTERVAL_S = 600.0
+
+
+# Segmento aberto: (caminho, descritor, mapeamento, tamanho)
+Segment = Tuple[Path, int, mmap.mmap, int]
+
+
+class RecordKind(IntEnum):
+    """Tipos de registo de uma gravação."""
+
+    END = 0  # Espaço pré-alocado por usar
+    AUDIO_IN = 1  # PCM do cliente (depois de descodificado)
+    AUDIO_OUT = 2  # PCM do modelo (antes da agregação em frames)
+    EVENT = 3  # Evento em JSON: {"event": ..., **dados}
+
+
+@dataclass
+class Record:
+    """Registo lido de uma gravação."""
+
+    kind: RecordKind
+    t_us: int
+    payload: bytes
+
+    def event(self) -> Dict[str, Any]:
+        """Evento descodificado (apenas para registos EVENT)."""
+        return json.loads(self.payload)
+
+
+class SessionRecorder:
+    """
+    Grava o áudio de entrada/saída e os eventos de uma conexão em segmentos
+    mmap com rotação.
+
+    Os métodos de gravação são síncronos e não bloqueiam; um erro de I/O
+    (disco cheio, permissões) desativa a gravação desta conexão sem afetar
+    a conversa. Com um event loop a correr, o I/O de ficheiros da rotação
+    corre numa thread; sem ele (ferramentas, testes) é feito na hora.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        session_id: str,
+        segment_bytes: Optional[int] = None,
+        max_segments: Optional[int] = None,
+    ):
+        self.directory = Path(directory)
+        self.session_id = session_id
+        self.segment_bytes = segment_bytes or settings.recording_segment_mb * 1024 * 1024
+        self.max_segments = max_segments or settings.recording_max_segments
+        self.started_at = time.time()
+        self._start_ns = time.monotonic_ns()
+
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._size = 0
+        self._offset = 0
+        self._index = 0
+        self._segments: List[Path] = []
+        # Próximo segmento, a ser alocado numa thread
+        self._spare: Optional[asyncio.Future] = None
+        self._io_tasks: Set[asyncio.Future] = set()
+        self.enabled = True
+
+        # Métricas
+        self.records = 0
+        self.bytes_written = 0
+        self.segments_deleted = 0
+        # Rotações sem segmento pré-alocado (alocação no caminho de áudio)
+        self.sync_rotations = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._index += 1
+        self._use_segment(self._allocate(self._index, SEGMENT_HEADER_SIZE))
+
+    def audio_in(self, data: bytes) -> None:
+        """Grava áudio recebido do cliente."""
+        self._write(RecordKind.AUDIO_IN, data)
+
+    def audio_out(self, data: bytes) -> None:
+        """Grava áudio de resposta do modelo."""
+        self._write(RecordKind.AUDIO_OUT, data)
+
+    def event(self, name: str, /, **data) -> None:
+        """Grava um marcador de evento (tool call, interrupção, fim de turno...)."""
+        self._write(
+            RecordKind.EVENT,
+            json.dumps({"event": name, **data}, default=str).encode("utf-8"),
+        )
+
+    def _write(self, kind: RecordKind, payload: bytes) -> None:
+        if not self.enabled:
+            return
+        length = len(payload)
+        needed = RECORD_HEADER.size + length
+        try:
+            if self._offset + needed > self._size:
+                self._rotate(needed)
+            start = self._offset + RECORD_HEADER.size
+            self._map[start:start + length] = payload
+            RECORD_HEADER.pack_into(
+                self._map, self._offset, kind, 0, 0, length,
+                (time.monotonic_ns() - self._start_ns) // 1000,
+            )
+        except (OSError, ValueError) as e:
+            logger.warning(
+                "Gravação da sessão desativada após erro",
+                session_id=self.session_id,
+                directory=str(self.directory),
+                error=str(e),
+            )
+            self._close_segment()
+            self._discard_spare()
+            self.enabled = False
+            return
+        self._offset += needed
+        self.records += 1
+        self.bytes_written += needed
+        # A meio do segmento, alocar o seguinte fora do event loop
+        if self._spare is None and self._offset * 2 >= self._size:
+            self._prepare_spare()
+
+    def _allocate(self, index: int, needed: int) -> Segment:
+        """Cria e mapeia um segmento (bloqueante: fallocate do tamanho todo)."""
+        path = self.directory / f"seg-{index:06d}.rec"
+        # Um registo maior do que um segmento ocupa um segmento à medida
+        size = max(self.segment_bytes, SEGMENT_HEADER_SIZE + needed)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+            segment_map = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+        SEGMENT_HEADER.pack_into(
+            segment_map, 0, SEGMENT_MAGIC, SEGMENT_VERSION, 0, index,
+            self.started_at, self.session_id.encode("utf-8")[:48],
+        )
+        return path, fd, segment_map, size
+
+    def _use_segment(self, segment: Segment) -> None:
+        path, fd, segment_map, size = segment
+        self._fd, self._map, self._size = fd, segment_map, size
+        self._offset = SEGMENT_HEADER_SIZE
+        self._segments.append(path)
+
+    def _prepare_spare(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sem event loop: a rotação aloca na hora
+        self._index += 1
+        self._spare = loop.run_in_executor(None, self._allocate, self._index, 0)
+
+    def _discard_spare(self) -> None:
+        """Fecha e apaga o segmento pré-alocado (quando terminar de ser criado)."""
+        spare, self._spare = self._spare, None
+        if spare is None:
+            return
+
+        def discard(future: asyncio.Future) -> None:
+            if future.cancelled() or future.exception() is not None:
+                return
+            path, fd, segment_map, _ = future.result()
+            self._offload(_finish_segment, fd, segment_map, 0, [path])
+
+        spare.add_done_callback(discard)
+        self._io_tasks.add(spare)
+        spare.add_done_callback(self._io_done)
+
+    def _offload(self, function, *args) -> None:
+        """Corre I/O de ficheiros numa thread (ou já, sem event loop)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            function(*args)
+            return
+        future = loop.run_in_executor(None, function, *args)
+        self._io_tasks.add(future)
+        future.add_done_callback(self._io_done)
+
+    def _io_done(self, future: asyncio.Future) -> None:
+        self._io_tasks.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(
+                "Erro de I/O na gravação da sessão",
+                directory=str(self.directory),
+                error=str(future.exception()),
+            )
+
+    def _close_segment(self) -> None:
+        """Fecha o segmento atual, libertando o espaço pré-alocado por usar."""
+        if self._fd is None:
+            return
+        fd, segment_map, used = self._fd, self._map, self._offset
+        self._fd = self._map = None
+        self._offload(_finish_segment, fd, segment_map, used, [])
+
+    def _rotate(self, needed: int) -> None:
+        spare, self._spare = self._spare, None
+        segment: Optional[Segment] = None
+        if spare is not None:
+            if (
+                spare.done()
+                and spare.exception() is None
+                and spare.result()[3] >= SEGMENT_HEADER_SIZE + needed
+            ):
+                segment = spare.result()
+            else:
+                # Ainda a ser alocado (ou pequeno para este registo)
+                self._spare = spare
+                self._discard_spare()
+
+        # Fechar o atual e manter só os segmentos mais recentes, numa thread
+        stale = []
+        while len(self._segments) >= self.max_segments:
+            stale.append(self._segments.pop(0))
+            self.segments_deleted += 1
+        fd, segment_map, used = self._fd, self._map, self._offset
+        self._fd = self._map = None
+        self._offload(_finish_segment, fd, segment_map, used, stale)
+
+        if segment is None:
+            self.sync_rotations += 1
+            self._index += 1
+            segment = self._allocate(self._index, needed)
+        self._use_segment(segment)
+
+    def close(self) -> None:
+        """Termina a gravação."""
+        if not self.enabled:
+            return
+        self.event("recording_closed")
+        self._close_segment()
+        self._discard_spare()
+        self.enabled = False
+
+    async def aclose(self) -> None:
+        """Termina a gravação e espera pelo I/O em curso (segmentos fechados)."""
+        self.close()
+        while self._io_tasks:
+            await asyncio.gather(*self._io_tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas desta gravação."""
+        return {
+            "directory": str(self.directory),
+            "records": self.records,
+            "bytes_written": self.bytes_written,
+            "segments": len(self._segments),
+            "segments_deleted": self.segments_deleted,
+            "sync_rotations": self.sync_rotations,
+            "enabled": self.enabled,
+        }
+
+
+def _finish_segment(
+    fd: int, segment_map: Optional[mmap.mmap], used: int, stale: List[Path]
+) -> None:
+    """Fecha um segmento, liberta o espaço por usar e apaga segmentos antigos."""
+    if segment_map is not None:
+        segment_map.close()
+    try:
+        os.ftruncate(fd, used)
+    finally:
+        os.close(fd)
+    for path in stale:
+        path.unlink(missing_ok=True)
+
+
+_last_prune = 0.0
+_prune_task: Optional[asyncio.Task] = None
+
+
+async def open_recorder(
+    session_id: str, user_id: str, connection_id: str
+) -> Optional[SessionRecorder]:
+    """Abre a gravação de uma conexão, se a configuração a pedir (I/O numa thread)."""
+    if not settings.recording_enabled:
+        return None
+    user_ids = {u.strip() for u in settings.recording_user_ids.split(",") if u.strip()}
+    if user_ids and user_id not in user_ids:
+        return None
+
+    root = Path(settings.recording_dir)
+    _schedule_prune(root)
+
+    directory = root / datetime.now().strftime("%Y-%m-%d") / f"{session_id}-{connection_id[:8]}"
+    try:
+        recorder = await asyncio.to_thread(SessionRecorder, directory, session_id)
+    except OSError as e:
+        logger.warning("Não foi possível iniciar a gravação da sessão", error=str(e))
+        return None
+    logger.info("Gravação da sessão iniciada", session_id=session_id, directory=str(directory))
+    return recorder
+
+
+def _schedule_prune(root: Path) -> None:
+    """Lança a limpeza de gravações antigas numa thread, fora do event loop."""
+    global _last_prune, _prune_task
+    now = time.monotonic()
+    if now - _last_prune < PRUNE_INTERVAL_S or (_prune_task and not _prune_task.done()):
+        return
+    _last_prune = now
+    _prune_task = asyncio.get_running_loop().create_task(
+        asyncio.to_thread(prune_recordings, root, settings.recording_retention_hours)
+    )
+    _prune_task.add_done_callback(_prune_done)
+
+
+def _prune_done(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Erro ao apagar gravações antigas", error=str(task.exception()))
+
+
+def prune_recordings(root: Path, retention_hours: float) -> int:
+    """
+    Apaga as gravações com mais de `retention_hours`; devolve quantas.
+
+    Bloqueante (percorre e apaga diretorias): no servidor corre numa thread.
+    """
+    if retention_hours <= 0 or not root.is_dir():
+        return 0
+    cutoff = time.time() - retention_hours * 3600
+    removed = 0
+    for day in root.iterdir():
+        if not day.is_dir():
+            continue
+        try:
+            recordings = list(day.iterdir())
+        except OSError:
+            continue
+        for recording in recordings:
+            try:
+                if recording.stat().st_mtime < cutoff:
+                    shutil.rmtree(recording, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+        try:
+            if not any(day.iterdir()):
+                day.rmdir()
+        except OSError:
+            # Outro worker começou entretanto uma gravação neste dia
+            continue
+    if removed:
+        logger.info("Gravações antigas apagadas", removed=removed, retention_hours=retention_hours)
+    return removed
+
+
+def read_recording(directory: Path) -> Iterator[Record]:
+    """Lê os registos de uma gravação, por ordem, de todos os segmentos."""
+    for path in sorted(Path(directory).glob("seg-*.rec")):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < SEGMENT_HEADER_SIZE:
+            continue
+        magic, version, _, _, _, _ = SEGMENT_HEADER.unpack_from(data)
+        if magic == bytes(len(SEGMENT_MAGIC)):
+            continue  # Segmento seguinte ainda a ser pré-alocado
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            raise ValueError(f"Segmento de gravação inválido: {path}")
+        offset = SEGMENT_HEADER_SIZE
+        while offset + RECORD_HEADER.size <= len(data):
+            kind, _, _, length, t_us = RECORD_HEADER.unpack_from(data, offset)
+            if kind == RecordKind.END:
+                break
+            start = offset + RECORD_HEADER.size
+            yield Record(RecordKind(kind), t_us, data[start:start + length])
+            offset = start + length
+
+
+def recording_info(directory: Path) -> Dict[str, Any]:
+    """Metadados de uma gravação (a partir do primeiro segmento mantido)."""
+    segments = sorted(Path(directory).glob("seg-*.rec"))
+    if not segments:
+        raise FileNotFoundError(f"Sem segmentos de gravação em {directory}")
+    with open(segments[0], "rb") as f:
+        _, _, _, index, started_at, session_id = SEGMENT_HEADER.unpack(
+            f.read(SEGMENT_HEADER.size)
+        )
+    return {
+        "session_id": session_id.rstrip(b"\0").decode("utf-8"),
+        "started_at": started_at,
+        "segments": len(segments),
+        # Os segmentos mais antigos foram apagados pela rotação
+        "truncated": index > 1,
+    }
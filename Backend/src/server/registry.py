@@ -0,0 +1,193 @@
+"""Registo de conexões/sessões com contabilidade de recursos e reaper."""
+
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, Set, TYPE_CHECKING
+
+import structlog
+
+from src.agent.empatia_agent import agent
+from src.config import settings
+
+if TYPE_CHECKING:
+    from src.server.websocket_server import WebSocketConnection
+
+logger = structlog.get_logger(__name__)
+
+# Close code para sessões fechadas por inatividade
+CLOSE_CODE_IDLE = 1000
+
+
+class SessionRegistry:
+    """
+    Conexões ativas deste processo, indexadas por `connection_id` (e não por
+    `user_id`), para que o mesmo utilizador possa ter vários dispositivos
+    ligados ao mesmo tempo.
+
+    Um reaper periódico fecha:
+    - conexões sem atividade há mais de `session_idle_timeout_s`
+    - conexões zombie: já inativas/fechadas mas ainda registadas (handler
+      preso) há mais de `zombie_grace_s`, cancelando a task do handler
+    - sessões do agente sem conexão e sem estar em espera de reconexão
+
+    Assim um worker de longa duração não acumula memória nem conexões Live.
+    """
+
+    def __init__(
+        self,
+        idle_timeout_s: Optional[float] = None,
+        interval_s: Optional[float] = None,
+        zombie_grace_s: Optional[float] = None,
+    ):
+        self.idle_timeout_s = (
+            settings.session_idle_timeout_s if idle_timeout_s is None else idle_timeout_s
+        )
+        self.interval_s = settings.reaper_interval_s if interval_s is None else interval_s
+        self.zombie_grace_s = settings.zombie_grace_s if zombie_grace_s is None else zombie_grace_s
+
+        self._connections: Dict[str, "WebSocketConnection"] = {}
+        self._by_user: Dict[str, Set[str]] = {}
+        self._orphans: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # Contadores do reaper
+        self.reaped_idle = 0
+        self.reaped_zombie = 0
+        self.reaped_orphan_sessions = 0
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def connections(self) -> List["WebSocketConnection"]:
+        """Cópia da lista de conexões ativas."""
+        return list(self._connections.values())
+
+    def for_user(self, user_id: str) -> List["WebSocketConnection"]:
+        """Conexões (dispositivos) ativas de um utilizador."""
+        return [self._connections[cid] for cid in self._by_user.get(user_id, ())]
+
+    def add(self, connection: "WebSocketConnection") -> None:
+        self._connections[connection.connection_id] = connection
+        self._by_user.setdefault(connection.user_id, set()).add(connection.connection_id)
+
+    def remove(self, connection: "WebSocketConnection") -> None:
+        self._connections.pop(connection.connection_id, None)
+        user_connections = self._by_user.get(connection.user_id)
+        if user_connections is not None:
+            user_connections.discard(connection.connection_id)
+            if not user_connections:
+                del self._by_user[connection.user_id]
+
+    def start(self) -> None:
+        """Inicia o reaper periódico."""
+        if self._task is None and self.interval_s > 0:
+            self._task = asyncio.create_task(self._reap_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error("Erro no reaper de sessões", error=str(e))
+
+    async def reap(self) -> Dict[str, int]:
+        """Uma passagem do reaper; retorna o que foi fechado."""
+        now = time.monotonic()
+        idle, zombies = [], []
+        for connection in self.connections():
+            if not connection.is_active or connection.is_closed():
+                if connection.closed_at is None:
+                    connection.closed_at = now
+                elif now - connection.closed_at > self.zombie_grace_s:
+                    zombies.append(connection)
+            elif self.idle_timeout_s > 0 and now - connection.last_activity > self.idle_timeout_s:
+                idle.append(connection)
+
+        for connection in idle:
+            logger.info(
+                "A fechar sessão inativa",
+                connection_id=connection.connection_id,
+                user_id=connection.user_id,
+                idle_s=round(now - connection.last_activity),
+            )
+            await connection.close_idle(CLOSE_CODE_IDLE, "Sessão inativa")
+        self.reaped_idle += len(idle)
+
+        for connection in zombies:
+            logger.warning(
+                "A remover conexão zombie",
+                connection_id=connection.connection_id,
+                user_id=connection.user_id,
+            )
+            if connection.task and not connection.task.done():
+                connection.task.cancel()
+            self.remove(connection)
+        self.reaped_zombie += len(zombies)
+
+        orphans = await self._reap_orphan_sessions(now)
+
+        if idle or zombies or orphans:
+            logger.info(
+                "Reaper de sessões",
+                idle=len(idle),
+                zombies=len(zombies),
+                orphan_sessions=orphans,
+            )
+        return {"idle": len(idle), "zombies": len(zombies), "orphan_sessions": orphans}
+
+    async def _reap_orphan_sessions(self, now: float) -> int:
+        """Termina sessões do agente sem conexão (vistas em duas passagens)."""
+        attached = {
+            connection.session.session_id
+            for connection in self._connections.values()
+            if connection.session
+        }
+        candidates = {
+            session_id
+            for session_id, session in agent.active_sessions.items()
+            if session.parked_at is None and session_id not in attached
+        }
+        # Só reclamar órfãs já vistas na passagem anterior (evita corridas)
+        confirmed = [sid for sid in candidates if sid in self._orphans]
+        self._orphans = {sid: self._orphans.get(sid, now) for sid in candidates}
+        for session_id in confirmed:
+            logger.warning("A terminar sessão órfã", session_id=session_id)
+            self._orphans.pop(session_id, None)
+            await agent.end_session(session_id)
+        self.reaped_orphan_sessions += len(confirmed)
+        return len(confirmed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totais de recursos das conexões ativas (somáveis entre workers)."""
+        totals = {
+            "registry_connections": len(self._connections),
+            "registry_users": len(self._by_user),
+            "registry_bytes_in": 0,
+            "registry_bytes_out": 0,
+            "registry_input_queue_depth": 0,
+            "registry_output_queue_depth": 0,
+            "registry_open_tasks": 0,
+            "registry_memory_bytes": 0,
+            "reaped_idle": self.reaped_idle,
+            "reaped_zombie": self.reaped_zombie,
+            "reaped_orphan_sessions": self.reaped_orphan_sessions,
+        }
+        for connection in self._connections.values():
+            usage = connection.resource_usage()
+            totals["registry_bytes_in"] += usage["bytes_in"]
+            totals["registry_bytes_out"] += usage["bytes_out"]
+            totals["registry_input_queue_depth"] += usage["input_queue_depth"]
+            totals["registry_output_queue_depth"] += usage["output_queue_depth"]
+            totals["registry_open_tasks"] += usage["open_tasks"]
+            totals["registry_memory_bytes"] += usage["memory_bytes"]
+        return totals
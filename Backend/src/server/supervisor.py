@@ -0,0 +1,176 @@
+"""Supervisor multi-processo: N workers no mesmo porto com SO_REUSEPORT."""
+
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional
+
+import structlog
+
+from src.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# Um worker que sobrevive este tempo deixa de contar como falha consecutiva
+WORKER_STABLE_AFTER_S = 60
+WORKER_MAX_BACKOFF_S = 30
+
+
+@dataclass
+class WorkerSlot:
+    """Estado de um worker gerido pelo supervisor."""
+
+    index: int
+    process: Optional[multiprocessing.Process] = None
+    started_at: float = 0.0
+    failures: int = 0
+    restart_at: float = 0.0
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+
+class WorkerSupervisor:
+    """
+    Lança N processos worker (fork), cada um com o seu event loop, pool de
+    conexões PostgreSQL e agente, todos ligados a `settings.websocket_port`
+    com SO_REUSEPORT para o kernel distribuir as conexões.
+
+    O supervisor reinicia workers que terminem inesperadamente (com backoff),
+    coordena o encerramento gracioso e agrega as métricas que os workers
+    publicam numa queue partilhada.
+    """
+
+    def __init__(
+        self,
+        worker_target: Callable[[int, multiprocessing.Queue], None],
+        num_workers: int,
+    ):
+        self.worker_target = worker_target
+        self.num_workers = num_workers
+        self._ctx = multiprocessing.get_context("fork")
+        self.metrics_queue = self._ctx.Queue(maxsize=1000)
+        self.slots: List[WorkerSlot] = [WorkerSlot(index=i) for i in range(num_workers)]
+        self._stopping = False
+        self._last_metrics_log = time.monotonic()
+
+    def _spawn(self, slot: WorkerSlot) -> None:
+        """Lança (ou relança) o processo de um slot."""
+        slot.process = self._ctx.Process(
+            target=self.worker_target,
+            args=(slot.index, self.metrics_queue),
+            name=f"empatia-worker-{slot.index}",
+        )
+        slot.process.start()
+        slot.started_at = time.monotonic()
+        slot.metrics = {}
+        logger.info("Worker iniciado", worker=slot.index, pid=slot.process.pid)
+
+    def _handle_signal(self, signum, frame):
+        logger.info(f"Sinal {signum} recebido pelo supervisor, a encerrar workers...")
+        self._stopping = True
+
+    def run(self) -> None:
+        """Loop principal do supervisor (bloqueante)."""
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+
+        logger.info(
+            "Supervisor a iniciar workers",
+            workers=self.num_workers,
+            port=settings.websocket_port,
+            pid=os.getpid(),
+        )
+        for slot in self.slots:
+            self._spawn(slot)
+
+        while not self._stopping:
+            self._collect_metrics(timeout=0.5)
+            self._check_workers()
+            if time.monotonic() - self._last_metrics_log >= settings.metrics_interval_s:
+                self._log_aggregated_metrics()
+
+        self._shutdown_workers()
+
+    def _check_workers(self) -> None:
+        """Reinicia workers que terminaram sem o supervisor pedir."""
+        now = time.monotonic()
+        for slot in self.slots:
+            process = slot.process
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                uptime = now - slot.started_at
+                slot.failures = 0 if uptime >= WORKER_STABLE_AFTER_S else slot.failures + 1
+                backoff = min(WORKER_MAX_BACKOFF_S, 2 ** max(slot.failures - 1, 0))
+                slot.restart_at = now + (backoff if slot.failures else 0)
+                logger.warning(
+                    "Worker terminou inesperadamente",
+                    worker=slot.index,
+                    pid=process.pid,
+                    exitcode=process.exitcode,
+                    uptime_s=round(uptime, 1),
+                    restart_in_s=round(slot.restart_at - now, 1),
+                )
+                process.close()
+                slot.process = None
+                slot.metrics = {}
+
+            if now >= slot.restart_at:
+                self._spawn(slot)
+
+    def _collect_metrics(self, timeout: float) -> None:
+        """Lê os snapshots de métricas publicados pelos workers."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                snapshot = self.metrics_queue.get(timeout=remaining)
+            except queue.Empty:
+                return
+            index = snapshot.get("worker")
+            if index is not None and 0 <= index < len(self.slots):
+                self.slots[index].metrics = snapshot
+
+    def aggregated_metrics(self) -> Dict[str, Any]:
+        """Soma as métricas numéricas do último snapshot de cada worker."""
+        totals: Dict[str, Any] = {}
+        alive = 0
+        for slot in self.slots:
+            if slot.process is not None and slot.process.is_alive():
+                alive += 1
+            for key, value in slot.metrics.items():
+                if key in ("worker", "pid"):
+                    continue
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] = totals.get(key, 0) + value
+        totals["workers_alive"] = alive
+        totals["workers"] = self.num_workers
+        return totals
+
+    def _log_aggregated_metrics(self) -> None:
+        self._last_metrics_log = time.monotonic()
+        logger.info("Métricas agregadas dos workers", **self.aggregated_metrics())
+
+    def _shutdown_workers(self) -> None:
+        """Pede encerramento gracioso a todos os workers e aguarda."""
+        running = [s.process for s in self.slots if s.process is not None and s.process.is_alive()]
+        for process in running:
+            os.kill(process.pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + settings.worker_shutdown_timeout_s
+        for process in running:
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+
+        for process in running:
+            if process.is_alive():
+                logger.warning("Worker não terminou a tempo, a forçar", pid=process.pid)
+                process.kill()
+                process.join()
+
+        self._log_aggregated_metrics()
+        logger.info("Supervisor encerrado", workers=len(running))
@@ -2,7 +2,10 @@
 
 import asyncio
 import json
-from typing import Optional, Dict
+import random
+import time
+from http import HTTPStatus
+from typing import Optional, Dict, Any
 import uuid
 
 import websockets
@@ -11,9 +14,26 @@ import structlog
 
 from src.agent.empatia_agent import agent, EmpatIASession
 from src.config import settings
+from src.database import DatabaseConnection, MemoryStore
+from src.server.admission import AdmissionController, AdmissionRejected
+from src.observability import tracing
+from src.observability.tracing import MARK_AUDIO_OUT, MARK_MODEL
+from src.server.audio_codec import create_codec, is_voiced
+from src.server.audio_output import AudioOutputPipeline
+from src.server.framing import FrameTracker
+from src.server.recorder import SessionRecorder, open_recorder
+from src.server.registry import SessionRegistry
+from src.vertex import api_stats, api_totals
 
 logger = structlog.get_logger(__name__)
 
+# Close code 1012 (Service Restart): o cliente deve reconectar
+CLOSE_CODE_SERVICE_RESTART = 1012
+# A sessão foi retomada por outra conexão do mesmo utilizador
+CLOSE_CODE_SESSION_TAKEN_OVER = 4001
+# Tempo máximo para a conexão antiga largar a sessão numa retoma
+TAKEOVER_TIMEOUT_S = 5.0
+
 
 class AudioStreamQueue:
     """Queue assíncrona para buffering de áudio."""
@@ -21,10 +41,12 @@ class AudioStreamQueue:
     def __init__(self):
         self.queue = asyncio.Queue()
         self.closed = False
+        self.bytes_queued = 0
 
     async def put(self, data: bytes):
         """Adiciona dados de áudio à queue."""
         if not self.closed:
+            self.bytes_queued += len(data)
             await self.queue.put(data)
 
     async def __aiter__(self):
@@ -32,6 +54,7 @@ class AudioStreamQueue:
         while not self.closed:
             try:
                 data = await asyncio.wait_for(self.queue.get(), timeout=0.5)
+                self.bytes_queued -= len(data)
                 yield data
             except asyncio.TimeoutError:
                 continue
@@ -44,23 +67,83 @@ class AudioStreamQueue:
 class WebSocketConnection:
     """Representa uma conexão WebSocket ativa."""
 
-    def __init__(self, websocket: WebSocketServerProtocol, user_id: str):
+    def __init__(
+        self,
+        websocket: WebSocketServerProtocol,
+        user_id: str,
+        codec: Optional[str] = None,
+        framing: bool = False,
+        resume_session_id: Optional[str] = None,
+    ):
         self.websocket = websocket
         self.user_id = user_id
+        self.connection_id = uuid.uuid4().hex
+        self.resume_session_id = resume_session_id
         self.session: Optional[EmpatIASession] = None
         self.audio_input_queue = AudioStreamQueue()
+        self.codec = create_codec(codec)
+        # Protocolo binário com cabeçalho (opcional); sem ele, áudio em bytes simples
+        self.framer = FrameTracker() if framing else None
+        # Tracing de latência (TRACING_ENABLED, amostrado por conexão)
+        self.trace = tracing.start_trace(
+            "ws.connection",
+            user_id=user_id,
+            connection_id=self.connection_id,
+            codec=self.codec.name,
+            framing=framing,
+        )
+        self.audio_output = AudioOutputPipeline(
+            websocket, codec=self.codec, framer=self.framer, trace=self.trace
+        )
         self.is_active = True
+        self._end_requested = False
+        # A sessão passou para outra conexão (reconexão com esta ainda aberta)
+        self._handed_over = False
+        # Gravação para replay/debugging (RECORDING_ENABLED)
+        self.recorder: Optional[SessionRecorder] = None
+
+        # Contabilidade para o registo de sessões / reaper. A atividade é voz
+        # do utilizador, mensagens de controlo ou áudio de resposta
+        self.created_at = time.monotonic()
+        self.last_activity = self.created_at
+        self.closed_at: Optional[float] = None
+        self.messages_in = 0
+        self.task: Optional[asyncio.Task] = None
+        self._stream_task: Optional[asyncio.Task] = None
 
     async def handle(self):
         """Processa mensagens do cliente e stream de áudio."""
+        self.task = asyncio.current_task()
+        stream_task = None
+        if self.trace:
+            # Spans criados nesta task e nas filhas (stream, tools) ficam no trace
+            self.trace.activate()
         try:
-            # Criar sessão
-            self.session = await agent.create_session(self.user_id)
+            # Retomar a sessão anterior (reconexão) ou criar uma nova
+            resumed = False
+            if self.resume_session_id:
+                self.session = agent.resume_session(self.resume_session_id, self.user_id)
+                resumed = self.session is not None
+            if not self.session:
+                self.session = await agent.create_session(self.user_id)
+
+            if self.trace:
+                self.trace.root.set(session_id=self.session.session_id, resumed=resumed)
+            self.recorder = await open_recorder(self.session.session_id, self.user_id, self.connection_id)
+            if self.recorder:
+                self.recorder.event(
+                    "session_started",
+                    user_id=self.user_id,
+                    resumed=resumed,
+                    codec=self.codec.name,
+                    framing=bool(self.framer),
+                )
 
             logger.info(
                 "Conexão WebSocket estabelecida",
                 user_id=self.user_id,
                 session_id=self.session.session_id,
+                resumed=resumed,
             )
 
             # Enviar confirmação de sessão
@@ -69,18 +152,47 @@ class WebSocketConnection:
                     "type": "session_created",
                     "session_id": self.session.session_id,
                     "user_id": self.user_id,
+                    "resumed": resumed,
+                    "audio_codec": self.codec.name,
+                    "framing": 1 if self.framer else 0,
                 }
             )
 
             # Iniciar task de streaming do agente
             stream_task = asyncio.create_task(self._stream_agent_audio())
+            self._stream_task = stream_task
 
             # Processar mensagens do cliente
             audio_chunks_received = 0
             async for message in self.websocket:
+                self.messages_in += 1
                 if isinstance(message, bytes):
-                    # Dados de áudio PCM
+                    # Dados de áudio (PCM raw ou pacote Opus, conforme o codec)
+                    try:
+                        if self.framer:
+                            message = self.framer.on_input(message)
+                            if not message:
+                                continue
+                        message = await self.codec.decode(message)
+                    except Exception as e:
+                        logger.warning("Pacote de áudio inválido", error=str(e), user_id=self.user_id)
+                        continue
                     audio_chunks_received += 1
+                    if self.recorder:
+                        self.recorder.audio_in(message)
+                    # Voz: VAD do cliente (protocolo de frames) ou amplitude do PCM
+                    client_voice = self.framer.last_input_voice if self.framer else None
+                    if client_voice is None:
+                        speaking = is_voiced(message, settings.session_idle_voice_threshold)
+                    else:
+                        speaking = client_voice
+                    if speaking:
+                        self.last_activity = time.monotonic()
+                    if self.trace:
+                        voiced = client_voice
+                        if voiced is None:
+                            voiced = is_voiced(message, settings.tracing_voice_threshold)
+                        self.trace.audio_in(voiced)
                     if audio_chunks_received % 50 == 0:  # Log a cada 50 chunks
                         logger.debug(
                             f"Recebido chunk de áudio #{audio_chunks_received}: {len(message)} bytes",
@@ -90,11 +202,13 @@ class WebSocketConnection:
 
                 elif isinstance(message, str):
                     # Mensagem JSON de controlo
+                    self.last_activity = time.monotonic()
                     await self._handle_control_message(json.loads(message))
 
             # Quando o cliente desconecta
             self.audio_input_queue.close()
-            await stream_task
+            if not self._handed_over:
+                await stream_task
 
         except websockets.exceptions.ConnectionClosed:
             logger.info("Cliente desconectado", user_id=self.user_id)
@@ -103,18 +217,32 @@ class WebSocketConnection:
             logger.error("Erro na conexão WebSocket", error=str(e), user_id=self.user_id)
 
         finally:
+            # Garantir que a conexão Live desta ligação fecha antes de a sessão
+            # poder ser retomada por outra conexão
+            if stream_task and not stream_task.done():
+                stream_task.cancel()
+                try:
+                    await stream_task
+                except asyncio.CancelledError:
+                    pass
             await self.cleanup()
 
     async def _stream_agent_audio(self):
         """Stream de áudio do agente para o cliente."""
+        self.audio_output.start()
         try:
             logger.info("A iniciar stream de conversa com agente", user_id=self.user_id)
             async for audio_chunk in agent.stream_conversation(
-                self.session, self.audio_input_queue
+                self.session, self.audio_input_queue, on_event=self._on_agent_event
             ):
                 if self.is_active:
-                    logger.debug(f"Enviando chunk de áudio: {len(audio_chunk)} bytes")
-                    await self.websocket.send(audio_chunk)
+                    if self.recorder:
+                        self.recorder.audio_out(audio_chunk)
+                    if self.trace:
+                        self.trace.mark(MARK_AUDIO_OUT)
+                    # Não bloqueante: a escrita no socket corre na task do pipeline
+                    self.audio_output.push(audio_chunk)
+                    self.last_activity = time.monotonic()
                 else:
                     logger.info("Stream parado (is_active=False)")
                     break
@@ -124,6 +252,27 @@ class WebSocketConnection:
         except Exception as e:
             logger.error("Erro no stream de áudio", error=str(e), exc_info=True)
 
+        finally:
+            await self.audio_output.close()
+
+    def _on_agent_event(self, event: str, **data):
+        """Reage a eventos do modelo no pipeline de saída."""
+        if self.recorder:
+            self.recorder.event(event, **data)
+        if self.trace:
+            if event == "tool_call":
+                self.trace.mark(MARK_MODEL)
+            elif event in ("turn_complete", "interrupted"):
+                self.trace.end_turn(event)
+        if event == "turn_complete":
+            self.audio_output.flush()
+        elif event == "interrupted":
+            # O utilizador começou a falar: não enviar o resto da resposta
+            self.audio_output.clear()
+
+        if self.framer and event in ("turn_complete", "interrupted"):
+            self.framer.next_turn()
+
     async def _handle_control_message(self, message: Dict):
         """Processa mensagens de controlo do cliente."""
         msg_type = message.get("type")
@@ -131,8 +280,16 @@ class WebSocketConnection:
         if msg_type == "ping":
             await self.send_json({"type": "pong"})
 
+        elif msg_type == "playback_started":
+            # Início de reprodução de um turno (protocolo de frames)
+            if self.framer:
+                self.framer.on_playback(message)
+
         elif msg_type == "end_session":
             logger.info("Cliente solicitou fim de sessão", user_id=self.user_id)
+            if self.recorder:
+                self.recorder.event("end_session")
+            self._end_requested = True
             await self.cleanup()
 
         else:
@@ -145,23 +302,122 @@ class WebSocketConnection:
         except Exception as e:
             logger.error("Erro ao enviar JSON", error=str(e))
 
+    def is_closed(self) -> bool:
+        """Indica se o transporte WebSocket já fechou."""
+        state = getattr(self.websocket, "state", None)
+        return state is not None and getattr(state, "name", "OPEN") == "CLOSED"
+
+    async def hand_over(self) -> None:
+        """
+        Larga a sessão para outra conexão do mesmo utilizador que a quer
+        retomar (ex.: o telemóvel reconectou antes de o servidor notar que o
+        socket antigo morreu). A sessão fica em espera e a nova conexão retoma-a.
+        """
+        logger.info(
+            "Sessão retomada noutra conexão, a fechar a antiga",
+            user_id=self.user_id,
+            connection_id=self.connection_id,
+            session_id=self.session.session_id if self.session else None,
+        )
+        self._handed_over = True
+        # Fechar a ligação Live já: o socket pode estar meio-aberto
+        if self._stream_task and not self._stream_task.done():
+            self._stream_task.cancel()
+        try:
+            await asyncio.wait_for(
+                self.websocket.close(CLOSE_CODE_SESSION_TAKEN_OVER, "Sessão retomada noutra conexão"),
+                timeout=TAKEOVER_TIMEOUT_S,
+            )
+        except Exception as e:
+            logger.debug("Erro ao fechar conexão antiga", error=str(e))
+        if self.task and not self.task.done():
+            await asyncio.wait({self.task}, timeout=TAKEOVER_TIMEOUT_S)
+            if not self.task.done():
+                # Handler preso: cancelar (o cleanup põe a sessão em espera)
+                self.task.cancel()
+                await asyncio.wait({self.task}, timeout=TAKEOVER_TIMEOUT_S)
+
+    async def close_idle(self, code: int, reason: str) -> None:
+        """Fecha uma conexão inativa e termina a sessão (sem espera de reconexão)."""
+        self._end_requested = True
+        try:
+            await asyncio.wait_for(self.websocket.close(code, reason), timeout=5)
+        except Exception as e:
+            logger.debug("Erro ao fechar conexão inativa", error=str(e))
+
+    def resource_usage(self) -> Dict[str, Any]:
+        """Recursos usados por esta conexão e pela sessão associada."""
+        open_tasks = sum(
+            1
+            for task in (self.task, self._stream_task)
+            if task is not None and not task.done()
+        ) + int(self.audio_output.writer_running)
+        transcript_bytes = self.session.transcript.memory_bytes() if self.session else 0
+        return {
+            "bytes_in": self.codec.wire_bytes_in,
+            "bytes_out": self.codec.wire_bytes_out,
+            "messages_in": self.messages_in,
+            "input_queue_depth": self.audio_input_queue.queue.qsize(),
+            "output_queue_depth": self.audio_output.queue_depth(),
+            "open_tasks": open_tasks,
+            "memory_bytes": (
+                self.audio_input_queue.bytes_queued
+                + self.audio_output.buffered_bytes()
+                + transcript_bytes
+            ),
+            "idle_s": round(time.monotonic() - self.last_activity, 1),
+            "age_s": round(time.monotonic() - self.created_at, 1),
+        }
+
     async def cleanup(self):
         """Limpa recursos da conexão."""
+        if not self.is_active:
+            return
         self.is_active = False
         self.audio_input_queue.close()
 
         if self.session:
-            await agent.end_session(self.session.session_id)
-
-        logger.info("Conexão limpa", user_id=self.user_id)
+            if self._end_requested:
+                await agent.end_session(self.session.session_id)
+            else:
+                # Desconexão sem end_session: permitir retomar a sessão
+                agent.park_session(self.session.session_id)
+
+        self.closed_at = time.monotonic()
+        if self.recorder:
+            self.recorder.close()
+        if self.trace:
+            self.trace.close()
+        logger.info(
+            "Conexão limpa",
+            user_id=self.user_id,
+            connection_id=self.connection_id,
+            resources=self.resource_usage(),
+            audio_output=self.audio_output.stats(),
+            audio_transport=self.codec.stats(),
+            framing=self.framer.stats() if self.framer else None,
+            recording=self.recorder.stats() if self.recorder else None,
+        )
 
 
 class EmpatIAWebSocketServer:
     """Servidor WebSocket para o agente EmpatIA."""
 
     def __init__(self):
-        self.connections: Dict[str, WebSocketConnection] = {}
+        # Conexões por connection_id (vários dispositivos por utilizador)
+        self.registry = SessionRegistry()
         self.server = None
+        self.reuse_port = False
+        self.draining = False
+        self.admission = AdmissionController()
+        # Totais acumulados das conexões já terminadas
+        self.connections_total = 0
+        self.totals: Dict[str, int] = {
+            "audio_frames_sent": 0,
+            "audio_frames_dropped": 0,
+            "audio_bytes_in": 0,
+            "audio_bytes_out": 0,
+        }
 
     async def handler(self, websocket: WebSocketServerProtocol):
         """Handler principal de conexões WebSocket."""
@@ -170,43 +426,184 @@ class EmpatIAWebSocketServer:
         # Na versão 13+ do websockets, o path está em websocket.request.path
         path = websocket.request.path
         user_id = self._extract_user_id(websocket, path)
+        # Codec de transporte negociado: ws://host:port/ws?user_id=X&codec=opus
+        codec = self._extract_query_param(path, "codec")
+        # Protocolo binário com sequência/timestamps: ...&framing=1
+        framing = self._extract_query_param(path, "framing") == "1"
+        # Reconexão: ...&session_id=SESSION_ID (recebido em session_created)
+        resume_session_id = self._extract_query_param(path, "session_id")
 
         if not user_id:
             logger.warning("Conexão rejeitada: user_id ausente")
             await websocket.close(1008, "user_id obrigatório")
             return
 
-        connection = WebSocketConnection(websocket, user_id)
-        self.connections[user_id] = connection
+        if self.draining:
+            await websocket.close(CLOSE_CODE_SERVICE_RESTART, "Servidor a reiniciar")
+            return
+
+        if resume_session_id:
+            await self._prepare_resume(user_id, resume_session_id)
+
+        # Admissão: só abrir sessão Gemini/BD se houver capacidade
+        async def notify_queued(position: int):
+            await websocket.send(json.dumps({"type": "queued", "position": position}))
+
+        try:
+            await self.admission.acquire(
+                user_id,
+                reconnect=bool(resume_session_id) and agent.is_parked(resume_session_id),
+                on_queued=notify_queued,
+            )
+        except AdmissionRejected as e:
+            logger.warning(
+                "Conexão rejeitada pelo controlo de admissão",
+                user_id=user_id,
+                reason=e.reason,
+                **self.admission.snapshot(),
+            )
+            await websocket.close(e.code, e.reason)
+            return
+        except websockets.exceptions.ConnectionClosed:
+            logger.info("Cliente desconectado enquanto aguardava admissão", user_id=user_id)
+            return
+
+        connection = WebSocketConnection(
+            websocket,
+            user_id,
+            codec=codec,
+            framing=framing,
+            resume_session_id=resume_session_id,
+        )
+        self.registry.add(connection)
+        self.connections_total += 1
+        logger.info(
+            "Conexão registada",
+            user_id=user_id,
+            connection_id=connection.connection_id,
+            devices=len(self.registry.for_user(user_id)),
+        )
 
         try:
             await connection.handle()
         finally:
-            if user_id in self.connections:
-                del self.connections[user_id]
+            self.registry.remove(connection)
+            self._accumulate(connection)
+            self.admission.release(user_id)
+
+    async def _prepare_resume(self, user_id: str, session_id: str) -> None:
+        """
+        Prepara a retoma de uma sessão: se ainda estiver associada a uma
+        conexão do mesmo utilizador, essa conexão é fechada e a sessão fica em
+        espera para a nova.
+
+        As sessões vivem na memória do processo: com `--workers N` a
+        reconexão só retoma a sessão se o SO_REUSEPORT a entregar ao mesmo
+        worker; nos outros casos começa uma sessão nova.
+        """
+        for connection in self.registry.for_user(user_id):
+            session = connection.session
+            if connection.is_active and session and session.session_id == session_id:
+                await connection.hand_over()
+                return
+        if not agent.is_parked(session_id):
+            logger.warning(
+                "Sessão a retomar não existe neste processo, a criar uma nova",
+                user_id=user_id,
+                session_id=session_id,
+                multi_worker=self.reuse_port,
+            )
+
+    def _accumulate(self, connection: WebSocketConnection) -> None:
+        """Soma as métricas de uma conexão terminada aos totais do servidor."""
+        self.totals["audio_frames_sent"] += connection.audio_output.frames_sent
+        self.totals["audio_frames_dropped"] += connection.audio_output.frames_dropped
+        self.totals["audio_bytes_in"] += connection.codec.wire_bytes_in
+        self.totals["audio_bytes_out"] += connection.codec.wire_bytes_out
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot de métricas deste processo (somável entre workers)."""
+        admission = self.admission.snapshot()
+        # "load" é um rácio por worker: não faz sentido somá-lo
+        admission.pop("load", None)
+        db_pool = DatabaseConnection.stats()
+        return {
+            "connections": len(self.registry),
+            "connections_total": self.connections_total,
+            "sessions": len(agent.active_sessions),
+            "episodes_enqueued": agent.episodes.enqueued,
+            "episodes_completed": agent.episodes.completed,
+            "episodes_failed": agent.episodes.failed,
+            "embeddings_pending": agent.reembedder.pending_total,
+            "embedding_failures": MemoryStore.embedding_failures,
+            "embedding_fallbacks": MemoryStore.embedding_fallbacks,
+            **admission,
+            **self.totals,
+            **self.registry.snapshot(),
+            "db_pool_size": db_pool["pool_size"],
+            "db_pool_in_use": db_pool["pool_in_use"],
+            "db_acquire_timeouts": db_pool["acquire_timeouts"],
+            **api_totals(),
+            # Histogramas por operação (não somáveis; ignorados na agregação)
+            "db_pool": db_pool,
+            "vertex": api_stats(),
+            "tracing": tracing.tracing_metrics.snapshot(),
+        }
+
+    def process_request(self, connection, request):
+        """Responde a pedidos HTTP simples antes do handshake WebSocket.
+
+        `GET /status` devolve a carga atual em JSON (para balanceadores e
+        monitorização); os restantes caminhos seguem para o handshake.
+        """
+        if request.path.split("?", 1)[0] == "/status":
+            body = json.dumps(
+                {
+                    "status": "draining" if self.draining else "ok",
+                    **self.admission.snapshot(),
+                    "connections": len(self.registry),
+                }
+            )
+            # 503 durante o drain para o balanceador deixar de encaminhar
+            status = HTTPStatus.SERVICE_UNAVAILABLE if self.draining else HTTPStatus.OK
+            response = connection.respond(status, body + "\n")
+            del response.headers["Content-Type"]
+            response.headers["Content-Type"] = "application/json"
+            return response
+        return None
 
     def _extract_user_id(
         self, websocket: WebSocketServerProtocol, path: str
     ) -> Optional[str]:
         """Extrai o user_id dos query parameters."""
+        return self._extract_query_param(path, "user_id")
+
+    def _extract_query_param(self, path: str, name: str) -> Optional[str]:
+        """Extrai um parâmetro dos query parameters."""
         try:
             from urllib.parse import parse_qs, urlparse
 
             parsed = urlparse(path)
             params = parse_qs(parsed.query)
-            return params.get("user_id", [None])[0]
+            return params.get(name, [None])[0]
         except Exception as e:
-            logger.error("Erro ao extrair user_id", error=str(e))
+            logger.error("Erro ao extrair parâmetro", param=name, error=str(e))
             return None
 
-    async def start(self):
-        """Inicia o servidor WebSocket."""
+    async def start(self, reuse_port: bool = False):
+        """Inicia o servidor WebSocket.
+
+        Args:
+            reuse_port: Ativa SO_REUSEPORT (modo multi-processo)
+        """
         logger.info(
             "A iniciar servidor WebSocket",
             host=settings.websocket_host,
             port=settings.websocket_port,
+            reuse_port=reuse_port,
         )
 
+        self.reuse_port = reuse_port
         self.server = await websockets.serve(
             self.handler,
             settings.websocket_host,
@@ -214,17 +611,99 @@ class EmpatIAWebSocketServer:
             ping_interval=20,
             ping_timeout=10,
             max_size=10 * 1024 * 1024,  # 10MB
+            process_request=self.process_request,
+            reuse_port=reuse_port or None,
         )
 
+        self.registry.start()
         logger.info("Servidor WebSocket iniciado")
 
     async def stop(self):
         """Para o servidor WebSocket."""
+        await self.registry.stop()
         if self.server:
             self.server.close()
             await self.server.wait_closed()
             logger.info("Servidor WebSocket parado")
 
+    async def drain(self, timeout: float) -> Dict[str, Any]:
+        """
+        Modo drain: deixa de aceitar conexões, avisa os clientes para
+        reconectarem (noutro worker/instância) e fecha as conexões com 1012.
+
+        Cada cliente recebe um atraso de reconexão aleatório para que as
+        reconexões não cheguem todas ao mesmo tempo. As sessões vivem na
+        memória deste processo, pelo que a reconexão abre uma sessão nova
+        (o episódio desta é guardado no encerramento).
+
+        Todos os passos partilham o mesmo prazo (`timeout`).
+        """
+        deadline = time.monotonic() + timeout
+
+        def remaining() -> float:
+            return max(0.0, deadline - time.monotonic())
+
+        self.draining = True
+        await self.registry.stop()
+        if not self.server:
+            return {"clients_notified": 0, "clients_remaining": 0, "closed_cleanly": True}
+
+        connections = self.registry.connections()
+        logger.info("Modo drain: a avisar clientes", connections=len(connections))
+
+        async def notify(connection: WebSocketConnection):
+            delay_ms = settings.drain_reconnect_after_ms
+            try:
+                await connection.send_json(
+                    {
+                        "type": "server_draining",
+                        "reconnect_after_ms": int(random.uniform(0.5, 1.5) * delay_ms),
+                    }
+                )
+            except Exception:
+                pass
+
+        try:
+            await asyncio.wait_for(
+                # Um quarto do prazo no máximo, para sobrar tempo para fechar
+                asyncio.gather(*(notify(c) for c in connections)),
+                timeout=min(timeout / 4, remaining()),
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Aviso de drain não chegou a todos os clientes a tempo")
+
+        # Fechar as conexões com 1012 e depois o listening socket
+        # (o server.close() fecha com 1001 as que não fecharem a tempo)
+        closing = asyncio.gather(
+            *(
+                c.websocket.close(CLOSE_CODE_SERVICE_RESTART, "Servidor a reiniciar")
+                for c in connections
+            ),
+            return_exceptions=True,
+        )
+        try:
+            await asyncio.wait_for(closing, timeout=remaining())
+        except asyncio.TimeoutError:
+            pass
+        self.server.close()
+        try:
+            await asyncio.wait_for(self.server.wait_closed(), timeout=remaining())
+            closed_cleanly = True
+        except asyncio.TimeoutError:
+            closed_cleanly = False
+            logger.warning(
+                "Conexões não fecharam dentro do tempo de drain",
+                remaining=len(self.registry),
+            )
+
+        result = {
+            "clients_notified": len(connections),
+            "clients_remaining": len(self.registry),
+            "closed_cleanly": closed_cleanly,
+        }
+        logger.info("Servidor WebSocket em drain concluído", **result)
+        return result
+
 
 # Instância global do servidor
 ws_server = EmpatIAWebSocketServer()
@@ -1,11 +1,10 @@
 """Tool para pesquisa Google (ancoragem em factos atuais)."""
 
-import os
 from typing import Optional
 from pydantic import BaseModel, Field
 import structlog
 
-from src.config import settings
+from src.vertex import get_api, get_client, VertexUnavailable
 
 logger = structlog.get_logger(__name__)
 
@@ -39,33 +38,23 @@ async def google_search_tool(params: GoogleSearchInput) -> dict:
     informações atualizadas da web.
     """
     try:
-        # Usar o Google Search via Gemini Grounding (Vertex AI)
-        from google import genai
-
-        # Configurar credenciais Vertex AI
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
-
-        client = genai.Client(
-            vertexai=True,
-            project=settings.google_cloud_project,
-            location=settings.google_cloud_region,
-        )
-
-        # Fazer uma chamada ao Gemini com grounding habilitado
-        response = await client.aio.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=f"""Pesquisa as seguintes informações atualizadas e responde em Português de Portugal (PT-PT):
+        # Usar o Google Search via Gemini Grounding (Vertex AI), com o
+        # cliente e o limitador partilhados por todas as sessões
+        async with get_api("search").call():
+            response = await get_client().aio.models.generate_content(
+                model="gemini-2.5-flash-lite",
+                contents=f"""Pesquisa as seguintes informações atualizadas e responde em Português de Portugal (PT-PT):
 
 Query: {params.query}
 
 Fornece informações factuais e atualizadas. Se for sobre meteorologia, inclui a previsão.
 Se for sobre notícias, menciona as mais recentes e relevantes.
 Responde de forma concisa e objetiva.""",
-            config={
-                "tools": [{"google_search": {}}],
-                "temperature": 0.3,
-            },
-        )
+                config={
+                    "tools": [{"google_search": {}}],
+                    "temperature": 0.3,
+                },
+            )
 
         # Extrair texto da resposta
         result_text = ""
@@ -101,6 +90,18 @@ Responde de forma concisa e objetiva.""",
             "sources": sources,
         }
 
+    except VertexUnavailable as e:
+        # Recusado localmente (limite ou circuit breaker): responder já
+        logger.warning("Pesquisa Google recusada pelo limitador", error=str(e), query=params.query)
+
+        return {
+            "success": False,
+            "query": params.query,
+            "error": "Pesquisa indisponível de momento (serviço sobrecarregado). Tenta mais tarde.",
+            "result": None,
+            "sources": [],
+        }
+
     except Exception as e:
         logger.error("Erro na pesquisa Google", error=str(e), query=params.query)
 
@@ -0,0 +1,38 @@
+"""Acesso ao Vertex AI - cliente partilhado, limitador de pedidos e circuit breaker."""
+
+from .client import get_client, set_client
+from .limiter import (
+    Priority,
+    VertexUnavailable,
+    RateLimitExceeded,
+    CircuitOpenError,
+    TokenBucket,
+    CircuitBreaker,
+)
+from .gateway import (
+    VertexAPI,
+    get_api,
+    priority,
+    live_connect,
+    is_overload_error,
+    api_stats,
+    api_totals,
+)
+
+__all__ = [
+    "get_client",
+    "set_client",
+    "Priority",
+    "VertexUnavailable",
+    "RateLimitExceeded",
+    "CircuitOpenError",
+    "TokenBucket",
+    "CircuitBreaker",
+    "VertexAPI",
+    "get_api",
+    "priority",
+    "live_connect",
+    "is_overload_error",
+    "api_stats",
+    "api_totals",
+]
@@ -0,0 +1,30 @@
+"""Cliente google-genai (Vertex AI) partilhado pelo processo."""
+
+import os
+from typing import Optional, Any
+
+from google import genai
+
+from src.config import settings
+
+_client: Optional[Any] = None
+
+
+def get_client() -> Any:
+    """Cliente Vertex AI do processo (criado no primeiro uso)."""
+    global _client
+    if _client is None:
+        # Configurar credenciais Vertex AI
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
+        _client = genai.Client(
+            vertexai=True,
+            project=settings.google_cloud_project,
+            location=settings.google_cloud_region,
+        )
+    return _client
+
+
+def set_client(client: Optional[Any]) -> None:
+    """Substitui o cliente do processo (None volta a criar o real no próximo uso)."""
+    global _client
+    _client = client
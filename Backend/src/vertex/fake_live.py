@@ -0,0 +1,359 @@
+"""Cliente Vertex falso (Gemini Live com guião) para benchmarks sem rede.
+
+`FakeClient` imita a parte do `genai.Client` usada pelo backend:
+`aio.live.connect`, `aio.models.generate_content` e
+`aio.models.embed_content`. Instala-se antes de inicializar o agente:
+
+    set_client(FakeClient(LiveScript(parts_per_turn=20)))
+    await agent.initialize()
+
+Cada sessão Live segue um `LiveScript`:
+
+- ecoa cada chunk de áudio recebido (`echo`), tal como chegou
+- a cada `chunks_per_turn` chunks recebidos, responde com um turno: uma
+  tool call opcional (à espera da resposta), `parts_per_turn` partes de
+  áudio ao ritmo real (`part_ms` cada) com transcrição, e `turn_complete`
+- de `interrupt_every` em `interrupt_every` turnos o turno é interrompido a
+  meio (`interrupted`, seguido de `turn_complete`)
+- com `vad`, o turno começa após `silence_ms` de silêncio a seguir a voz
+  (em vez de a cada N chunks) e voz durante a resposta interrompe-a
+
+`receive()` termina no fim de cada turno, como o SDK real. Os tempos de
+envio ficam nos próprios dados: o áudio do modelo leva um carimbo (`stamp`)
+com o instante em que o servidor falso o enviou, e o eco devolve o carimbo
+do cliente, pelo que quem consome o áudio mede a latência acrescentada pelo
+backend sem relógios partilhados. Os instantes de `turn_complete` ficam na
+sessão (`FakeLiveSession`), encontrada por `FakeClient.sessions[tag]` a
+partir do carimbo do primeiro chunk, e a volta de cada tool call em
+`FakeClient.tool_ms`.
+"""
+
+import asyncio
+import itertools
+import json
+import struct
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, List, Tuple, Deque, AsyncIterator
+
+import numpy as np
+from google.genai import types
+
+from src.observability import Histogram
+
+# Carimbo no início do áudio: origem, conversa, sequência, perf_counter()
+STAMP = struct.Struct("<BIId")
+STAMP_CLIENT = 0
+STAMP_MODEL = 1
+
+OUTPUT_MIME = "audio/pcm;rate=24000"
+# PCM 16 bits mono a 16 kHz
+INPUT_BYTES_PER_MS = 32
+# PCM 16 bits mono a 24 kHz
+OUTPUT_BYTES_PER_MS = 48
+
+DEFAULT_TOOL_CALLS: List[Tuple[str, Dict[str, Any]]] = [
+    (
+        "manage_memory",
+        {
+            "action": "ADD",
+            "category": "familia",
+            "entity_type": "neta",
+            "entity_name": "Maria",
+            "content": "A neta Maria vive em Lisboa e visita aos domingos",
+        },
+    ),
+    (
+        "manage_memory",
+        {
+            "action": "SEARCH",
+            "category": "familia",
+            "entity_type": "neta",
+            "search_query": "quando vem a neta",
+        },
+    ),
+]
+
+SUMMARY_JSON = json.dumps(
+    {
+        "summary": "Conversa de teste com a EmpatIA.",
+        "key_topics": ["teste"],
+        "emotional_tone": "neutro",
+    }
+)
+
+
+def stamp(origin: int, tag: int, seq: int, size: int = 0, at: Optional[float] = None) -> bytes:
+    """Dados de áudio com carimbo (completados com zeros até `size` bytes)."""
+    header = STAMP.pack(origin, tag, seq, time.perf_counter() if at is None else at)
+    return header + bytes(max(0, size - STAMP.size))
+
+
+def read_stamp(data: bytes) -> Optional[Tuple[int, int, int, float]]:
+    """(origem, conversa, sequência, instante) ou None se não houver carimbo."""
+    if len(data) < STAMP.size or data[0] not in (STAMP_CLIENT, STAMP_MODEL):
+        return None
+    return STAMP.unpack_from(data)
+
+
+def is_speech(data: bytes, threshold: int) -> bool:
+    """VAD por amplitude de um chunk PCM 16 bits."""
+    samples = np.frombuffer(data, dtype=np.int16, count=len(data) // 2)
+    return samples.size > 0 and (samples.max() >= threshold or samples.min() <= -threshold)
+
+
+@dataclass
+class LiveScript:
+    """Comportamento das sessões Live falsas."""
+
+    echo: bool = True
+    chunks_per_turn: int = 50
+    parts_per_turn: int = 25
+    part_ms: float = 40.0
+    # 0 = nunca
+    tool_every: int = 2
+    interrupt_every: int = 0
+    vad: bool = False
+    vad_threshold: int = 500
+    silence_ms: float = 600.0
+    tool_calls: List[Tuple[str, Dict[str, Any]]] = field(
+        default_factory=lambda: list(DEFAULT_TOOL_CALLS)
+    )
+    tool_timeout_s: float = 30.0
+    connect_latency_s: float = 0.0
+    generate_latency_s: float = 0.0
+
+
+class FakeLiveSession:
+    """Sessão Live falsa: mesma interface que `AsyncSession` do google-genai."""
+
+    def __init__(self, client: "FakeClient", script: LiveScript):
+        self.client = client
+        self.script = script
+        self.tag: Optional[int] = None
+        self.closed = False
+
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._turns: asyncio.Queue = asyncio.Queue()
+        self._tool_waits: Dict[str, Tuple[float, asyncio.Event]] = {}
+        self._seq = itertools.count()
+        # VAD: voz ouvida desde o último turno, silêncio acumulado, barge-in
+        self._voice = False
+        self._silence_ms = 0.0
+        self._user_turns = 0
+        self._responding = False
+        self._barge_in = False
+        self._worker = asyncio.create_task(self._run_turns())
+
+        # Instantes (perf_counter) em que o servidor enviou turn_complete
+        self.turns_sent: Deque[float] = deque()
+        self.chunks_in = 0
+        self.parts_out = 0
+        self.tool_calls = 0
+        self.interrupted = 0
+
+    def _send(self, **kwargs: Any) -> None:
+        self._outbox.put_nowait(types.LiveServerMessage(**kwargs))
+
+    async def send_realtime_input(self, *, audio: Optional[types.Blob] = None, **kwargs: Any) -> None:
+        if self.closed or audio is None:
+            return
+        self.chunks_in += 1
+        if self.tag is None:
+            stamped = read_stamp(audio.data)
+            if stamped is not None:
+                self.tag = stamped[1]
+                self.client.sessions[self.tag] = self
+        if self.script.echo:
+            self._send(
+                server_content=types.LiveServerContent(
+                    model_turn=types.Content(
+                        role="model",
+                        parts=[types.Part(inline_data=types.Blob(data=audio.data, mime_type=OUTPUT_MIME))],
+                    )
+                )
+            )
+        if self.script.vad:
+            self._detect_turn(audio.data)
+        elif self.script.chunks_per_turn and self.chunks_in % self.script.chunks_per_turn == 0:
+            self._turns.put_nowait(self.chunks_in // self.script.chunks_per_turn)
+
+    def _detect_turn(self, data: bytes) -> None:
+        if is_speech(data, self.script.vad_threshold):
+            if self._responding:
+                self._barge_in = True
+            self._voice = True
+            self._silence_ms = 0.0
+        elif self._voice:
+            self._silence_ms += len(data) / INPUT_BYTES_PER_MS
+            if self._silence_ms >= self.script.silence_ms:
+                self._voice = False
+                self._user_turns += 1
+                self._turns.put_nowait(self._user_turns)
+
+    async def send_client_content(self, **kwargs: Any) -> None:
+        """Contexto enviado pelo pool: aceite sem resposta."""
+
+    async def send_tool_response(self, *, function_responses: Any) -> None:
+        if not isinstance(function_responses, list):
+            function_responses = [function_responses]
+        for response in function_responses:
+            waiting = self._tool_waits.pop(response.name, None)
+            if waiting:
+                sent_at, event = waiting
+                self.client.tool_ms.observe((time.perf_counter() - sent_at) * 1000)
+                event.set()
+
+    async def receive(self) -> AsyncIterator[types.LiveServerMessage]:
+        """Mensagens do servidor até ao fim do turno (ou ao fecho da sessão)."""
+        while True:
+            message = await self._outbox.get()
+            if message is None:
+                return
+            yield message
+            if message.server_content and message.server_content.turn_complete:
+                return
+
+    async def _run_turns(self) -> None:
+        while True:
+            turn = await self._turns.get()
+            await self._model_turn(turn)
+
+    async def _model_turn(self, turn: int) -> None:
+        script = self.script
+        self._send(
+            server_content=types.LiveServerContent(
+                input_transcription=types.Transcription(text=f"pergunta {turn}")
+            )
+        )
+
+        if script.tool_every and script.tool_calls and turn % script.tool_every == 0:
+            name, args = script.tool_calls[self.tool_calls % len(script.tool_calls)]
+            self.tool_calls += 1
+            event = asyncio.Event()
+            self._tool_waits[name] = (time.perf_counter(), event)
+            self._send(
+                tool_call=types.LiveServerToolCall(
+                    function_calls=[types.FunctionCall(id=f"call-{turn}", name=name, args=args)]
+                )
+            )
+            try:
+                await asyncio.wait_for(event.wait(), timeout=script.tool_timeout_s)
+            except asyncio.TimeoutError:
+                self._tool_waits.pop(name, None)
+
+        interrupt = bool(script.interrupt_every) and turn % script.interrupt_every == 0
+        parts = script.parts_per_turn // 2 if interrupt else script.parts_per_turn
+        size = max(STAMP.size, int(script.part_ms * OUTPUT_BYTES_PER_MS))
+        self._responding = True
+        self._barge_in = False
+        for _ in range(parts):
+            if self._barge_in:
+                interrupt = True
+                break
+            self.parts_out += 1
+            self._send(
+                server_content=types.LiveServerContent(
+                    model_turn=types.Content(
+                        role="model",
+                        parts=[
+                            types.Part(
+                                inline_data=types.Blob(
+                                    data=stamp(STAMP_MODEL, self.tag or 0, next(self._seq), size),
+                                    mime_type=OUTPUT_MIME,
+                                )
+                            )
+                        ],
+                    ),
+                    output_transcription=types.Transcription(text="resposta "),
+                )
+            )
+            await asyncio.sleep(script.part_ms / 1000)
+        self._responding = False
+
+        if interrupt:
+            self.interrupted += 1
+            self._send(server_content=types.LiveServerContent(interrupted=True))
+        self.turns_sent.append(time.perf_counter())
+        self._send(server_content=types.LiveServerContent(turn_complete=True))
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._outbox.put_nowait(None)
+
+
+class _FakeLive:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+
+    @asynccontextmanager
+    async def connect(self, *, model: str, config: Any = None) -> AsyncIterator[FakeLiveSession]:
+        script = self._client.script
+        if script.connect_latency_s:
+            await asyncio.sleep(script.connect_latency_s)
+        self._client.connections += 1
+        session = FakeLiveSession(self._client, script)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+        self._embedders: Dict[int, Any] = {}
+
+    async def generate_content(self, *, model: str, contents: Any, config: Any = None) -> types.GenerateContentResponse:
+        if self._client.script.generate_latency_s:
+            await asyncio.sleep(self._client.script.generate_latency_s)
+        mime = (
+            config.get("response_mime_type")
+            if isinstance(config, dict)
+            else getattr(config, "response_mime_type", None)
+        )
+        text = SUMMARY_JSON if mime == "application/json" else "Resposta simulada."
+        return types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))
+            ]
+        )
+
+    async def embed_content(self, *, model: str, contents: Any, config: Any = None) -> types.EmbedContentResponse:
+        # Vetores do fornecedor local: determinísticos e com a dimensão pedida
+        from src.embeddings import LocalEmbeddingProvider
+
+        dimensions = getattr(config, "output_dimensionality", None) or 768
+        embedder = self._embedders.get(dimensions)
+        if embedder is None:
+            embedder = self._embedders[dimensions] = LocalEmbeddingProvider(dimensions)
+        texts = [contents] if isinstance(contents, str) else list(contents)
+        return types.EmbedContentResponse(
+            embeddings=[
+                types.ContentEmbedding(values=vector.tolist())
+                for vector in embedder.embed_sync(texts)
+            ]
+        )
+
+
+class FakeClient:
+    """Substituto do `genai.Client` (instalar com `set_client`)."""
+
+    def __init__(self, script: Optional[LiveScript] = None):
+        self.script = script or LiveScript()
+        # Sessões Live por conversa (tag do carimbo do primeiro chunk)
+        self.sessions: Dict[int, FakeLiveSession] = {}
+        self.connections = 0
+        # Da tool call enviada à resposta recebida (todas as sessões)
+        self.tool_ms = Histogram()
+        self.aio = SimpleNamespace(live=_FakeLive(self), models=_FakeModels(self))
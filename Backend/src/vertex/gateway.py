@@ -0,0 +1,217 @@
+"""Coordenação dos pedidos ao Vertex partilhada por todas as sessões do processo.
+
+Cada API do Vertex ("embeddings", "search", "generate", "live") tem um
+token bucket e um circuit breaker próprios. Todos os pedidos passam por
+`get_api(nome).call()`:
+
+- se o circuito estiver aberto, o pedido falha logo com `CircuitOpenError`
+- caso contrário espera por um token, na fila por prioridade; a espera
+  máxima depende da prioridade (uma tool da conversa não fica 60s à espera)
+- o resultado do pedido alimenta o circuit breaker: só 429, erros 5xx,
+  timeouts e erros de rede contam como falhas do Vertex
+
+A prioridade vem do contexto (`with priority(Priority.BACKGROUND): ...`),
+pelo que os jobs a definem uma vez no seu loop e as chamadas de baixo
+nível (ex.: `MemoryStore.embed_batch`) herdam-na sem parâmetros extra.
+"""
+
+import time
+from contextlib import asynccontextmanager, contextmanager, AsyncExitStack
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, AsyncIterator, Iterator
+
+import structlog
+from google.genai import errors as genai_errors
+from websockets.exceptions import InvalidHandshake
+
+from src.config import settings
+from src.observability import Histogram, tracing
+from .limiter import Priority, TokenBucket, CircuitBreaker, CircuitOpenError, RateLimitExceeded
+
+logger = structlog.get_logger(__name__)
+
+_priority: ContextVar[Priority] = ContextVar("vertex_priority", default=Priority.NORMAL)
+
+
+@contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """Define a prioridade dos pedidos ao Vertex feitos dentro do bloco."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """True se o erro indica Vertex sobrecarregado/indisponível (conta para o breaker)."""
+    if isinstance(error, genai_errors.ClientError):
+        return error.code == 429
+    return isinstance(error, (genai_errors.ServerError, TimeoutError, OSError, InvalidHandshake))
+
+
+class VertexAPI:
+    """Limitador e circuit breaker de uma API do Vertex."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_queue: Optional[int] = None,
+        failure_threshold: Optional[int] = None,
+        reset_timeout_s: Optional[float] = None,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(
+            rate, burst, settings.vertex_max_queue if max_queue is None else max_queue
+        )
+        self.breaker = CircuitBreaker(
+            settings.vertex_breaker_failures if failure_threshold is None else failure_threshold,
+            settings.vertex_breaker_reset_s if reset_timeout_s is None else reset_timeout_s,
+        )
+
+        # Métricas
+        self.queue_ms = Histogram()
+        self.granted = 0
+        self.rejected_rate_limit = 0
+        self.rejected_circuit = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    @staticmethod
+    def max_wait(level: Priority) -> float:
+        if level == Priority.INTERACTIVE:
+            return settings.vertex_interactive_max_wait_s
+        return settings.vertex_background_max_wait_s
+
+    @asynccontextmanager
+    async def call(self, level: Optional[Priority] = None) -> AsyncIterator[None]:
+        """Envolve um pedido ao Vertex (espera por token e regista o resultado)."""
+        level = _priority.get() if level is None else level
+        # Circuito aberto: falhar já, sem ocupar lugar na fila
+        if self.breaker.rejecting:
+            self.rejected_circuit += 1
+            raise CircuitOpenError(f"Vertex {self.name} indisponível (circuit breaker aberto)")
+
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"vertex.{self.name}.queue", priority=level.name):
+                await self.bucket.acquire(level, self.max_wait(level))
+        except RateLimitExceeded:
+            self.rejected_rate_limit += 1
+            logger.warning(
+                "Pedido ao Vertex recusado pelo limitador",
+                api=self.name,
+                priority=level.name,
+                queued=self.bucket.queued,
+            )
+            raise
+        finally:
+            self.queue_ms.observe((time.perf_counter() - started) * 1000)
+
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.rejected_circuit += 1
+            raise
+
+        self.granted += 1
+        self.in_flight += 1
+        recorded = False
+        try:
+            with tracing.span(f"vertex.{self.name}"):
+                yield
+        except Exception as e:
+            recorded = True
+            if is_overload_error(e):
+                self.failures += 1
+                if self.breaker.record_failure():
+                    logger.warning(
+                        "Circuit breaker do Vertex aberto",
+                        api=self.name,
+                        error=str(e),
+                        reset_s=self.breaker.reset_timeout_s,
+                    )
+            else:
+                # Erro do pedido (ex.: 400), não do serviço
+                self.breaker.record_success()
+            raise
+        else:
+            recorded = True
+            if self.breaker.state != CircuitBreaker.CLOSED:
+                logger.info("Circuit breaker do Vertex fechado", api=self.name)
+            self.breaker.record_success()
+        finally:
+            self.in_flight -= 1
+            if not recorded:
+                # Cancelado a meio: não conta como sucesso nem como falha
+                self.breaker.release_trial()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "granted": self.granted,
+            "rejected_rate_limit": self.rejected_rate_limit,
+            "rejected_circuit": self.rejected_circuit,
+            "failures": self.failures,
+            "queued": self.bucket.queued,
+            "in_flight": self.in_flight,
+            "queue_ms": self.queue_ms.snapshot(),
+            "breaker": self.breaker.snapshot(),
+        }
+
+
+def _api_settings() -> Dict[str, tuple]:
+    return {
+        "embeddings": (settings.vertex_embed_rate_per_s, settings.vertex_embed_burst),
+        "search": (settings.vertex_search_rate_per_s, settings.vertex_search_burst),
+        "generate": (settings.vertex_generate_rate_per_s, settings.vertex_generate_burst),
+        "live": (settings.vertex_live_connect_rate_per_s, settings.vertex_live_connect_burst),
+    }
+
+
+_apis: Dict[str, VertexAPI] = {}
+
+
+def get_api(name: str) -> VertexAPI:
+    """Limitador partilhado de uma API do Vertex (criado no primeiro uso)."""
+    api = _apis.get(name)
+    if api is None:
+        rate, burst = _api_settings()[name]
+        api = _apis[name] = VertexAPI(name, rate, burst)
+    return api
+
+
+@asynccontextmanager
+async def live_connect(
+    client: Any, level: Optional[Priority] = None, **kwargs: Any
+) -> AsyncIterator[Any]:
+    """
+    `client.aio.live.connect(...)` com o handshake sujeito ao limitador.
+
+    Só a abertura da conexão conta para o limite e para o breaker; a sessão
+    em si pode durar o tempo que a conversa durar.
+    """
+    async with AsyncExitStack() as stack:
+        async with get_api("live").call(level):
+            session = await stack.enter_async_context(client.aio.live.connect(**kwargs))
+        yield session
+
+
+def api_stats() -> Dict[str, Any]:
+    """Métricas de todas as APIs usadas neste processo."""
+    return {name: api.snapshot() for name, api in _apis.items()}
+
+
+def api_totals() -> Dict[str, int]:
+    """Contadores somáveis entre workers (para o supervisor)."""
+    return {
+        "vertex_rejected": sum(
+            api.rejected_rate_limit + api.rejected_circuit for api in _apis.values()
+        ),
+        "vertex_failures": sum(api.failures for api in _apis.values()),
+        "vertex_queued": sum(api.bucket.queued for api in _apis.values()),
+        "vertex_circuits_open": sum(
+            api.breaker.state != CircuitBreaker.CLOSED for api in _apis.values()
+        ),
+    }
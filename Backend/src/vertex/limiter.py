@@ -0,0 +1,164 @@
+"""Token bucket com prioridades e circuit breaker para as APIs do Vertex."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Optional, Dict, Any, List
+
+
+class Priority(IntEnum):
+    """Prioridade de um pedido ao Vertex (menor valor = servido primeiro)."""
+
+    INTERACTIVE = 0  # conversa em curso (tools, ligação Live)
+    NORMAL = 1
+    BACKGROUND = 2  # jobs (resumos, re-embedding, importação)
+
+
+class VertexUnavailable(Exception):
+    """Pedido ao Vertex recusado localmente (sem chegar a ser feito)."""
+
+
+class RateLimitExceeded(VertexUnavailable):
+    """Fila do limitador cheia ou espera acima do máximo."""
+
+
+class CircuitOpenError(VertexUnavailable):
+    """Circuit breaker aberto: o Vertex está a falhar."""
+
+
+class TokenBucket:
+    """
+    Token bucket de `rate` pedidos/segundo com rajadas até `burst`.
+
+    Quando não há tokens, os pedidos esperam numa fila ordenada por
+    prioridade (e por ordem de chegada dentro da mesma prioridade): um
+    pedido interativo passa à frente de todos os jobs em espera.
+    """
+
+    def __init__(self, rate: float, burst: float, max_queue: int):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_queue = max_queue
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: Priority, timeout: float) -> None:
+        """Obtém um token, esperando no máximo `timeout` segundos."""
+        self._refill()
+        if not self.queued and self._tokens >= 1:
+            self._tokens -= 1
+            return
+        if self.queued >= self.max_queue:
+            raise RateLimitExceeded("fila do limitador cheia")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [int(priority), next(self._seq), future])
+        self._schedule()
+        try:
+            await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise RateLimitExceeded(f"sem token após {timeout}s") from None
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Desistiu (timeout ou cancelamento)
+                continue
+            future.set_result(None)
+            self._tokens -= 1
+        # Descartar da frente os que já desistiram
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        self._schedule()
+
+
+class CircuitBreaker:
+    """
+    Abre após `failure_threshold` falhas seguidas e recusa pedidos durante
+    `reset_timeout_s`; depois deixa passar um pedido de teste (half-open) e
+    fecha se este tiver sucesso.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    @property
+    def rejecting(self) -> bool:
+        """True se um pedido novo seria recusado agora (sem alterar o estado)."""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at < self.reset_timeout_s
+        return self.state == self.HALF_OPEN and self._trial_in_flight
+
+    def before_call(self) -> None:
+        """Recusa o pedido se o circuito estiver aberto."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout_s:
+                raise CircuitOpenError("Vertex indisponível (circuit breaker aberto)")
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError("Vertex indisponível (a testar recuperação)")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = self.CLOSED
+        self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Regista uma falha; retorna True se o circuito abriu agora."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            opened = self.state != self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+            if opened:
+                self.times_opened += 1
+            return opened
+        return False
+
+    def release_trial(self) -> None:
+        """Liberta o pedido de teste que terminou sem resultado (ex.: cancelado)."""
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+        }
@@ -0,0 +1,127 @@
+"""Testes do controlo de admissão (`src/server/admission.py`).
+
+Uso:
+    python test_admission.py
+"""
+
+import asyncio
+import os
+import sys
+from typing import Callable, List, Tuple
+
+os.environ.setdefault("POSTGRES_PASSWORD", "")
+
+from src.server.admission import AdmissionController, AdmissionRejected
+
+
+def controller(**kwargs) -> AdmissionController:
+    options = dict(
+        max_sessions=3,
+        max_sessions_per_user=2,
+        queue_size=10,
+        queue_timeout_s=0.3,
+        reconnect_window_s=60,
+    )
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+async def check_blocked_waiter(admission: AdmissionController) -> None:
+    """Quem espera no limite do utilizador não bloqueia capacidade livre."""
+    for user_id in ("u1", "u2", "u3"):
+        await admission.acquire(user_id)
+    # Servidor cheio: duas novas sessões de u1 esperam
+    first = asyncio.create_task(admission.acquire("u1"))
+    second = asyncio.create_task(admission.acquire("u1"))
+    await asyncio.sleep(0)
+    assert admission.snapshot()["waiting"] == 2
+
+    admission.release("u2")
+    await asyncio.wait_for(first, timeout=0.1)
+    admission.release("u3")
+    await asyncio.sleep(0)
+    # u1 está no limite: a segunda continua à espera com uma vaga livre
+    assert admission.active == 2 and not second.done()
+
+    await asyncio.wait_for(admission.acquire("u4"), timeout=0.1)
+    assert admission.active == 3
+
+    # Quando u1 liberta uma sessão, a que esperava entra assim que houver vaga
+    admission.release("u4")
+    await asyncio.sleep(0)
+    assert not second.done()
+    admission.release("u1")
+    await asyncio.wait_for(second, timeout=0.1)
+    assert admission.per_user["u1"] == 2 and admission.active == 2
+
+
+async def check_reconnect_priority(admission: AdmissionController) -> None:
+    """Reconexões recentes passam à frente na fila."""
+    admission.max_sessions = 1
+    await admission.acquire("r")
+    admission.release("r")  # Desconexão: "r" fica com prioridade de reconexão
+    await admission.acquire("a")
+
+    order: List[str] = []
+
+    async def wait(user_id: str) -> None:
+        await admission.acquire(user_id)
+        order.append(user_id)
+
+    normal = asyncio.create_task(wait("n"))
+    await asyncio.sleep(0)
+    reconnect = asyncio.create_task(wait("r"))
+    await asyncio.sleep(0)
+    assert admission.snapshot()["waiting"] == 2
+
+    admission.release("a", disconnected=False)
+    await asyncio.sleep(0.01)
+    assert order == ["r"], order
+    admission.release("r", disconnected=False)
+    await asyncio.gather(normal, reconnect)
+    assert order == ["r", "n"], order
+
+
+async def check_rejections(admission: AdmissionController) -> None:
+    admission.max_sessions = 1
+    admission.queue_size = 1
+    await admission.acquire("u1")
+    try:
+        await admission.acquire("u2")
+        raise AssertionError("esperava timeout")
+    except AdmissionRejected as e:
+        assert "Tempo de espera" in e.reason
+    waiter = asyncio.create_task(admission.acquire("u2"))
+    await asyncio.sleep(0)
+    try:
+        await admission.acquire("u3")
+        raise AssertionError("esperava fila cheia")
+    except AdmissionRejected as e:
+        assert "ocupado" in e.reason
+    admission.release("u1")
+    await asyncio.wait_for(waiter, timeout=0.1)
+    assert admission.snapshot()["rejected_timeout"] == 1
+    assert admission.snapshot()["rejected_busy"] == 1
+
+
+CHECKS: List[Tuple[str, Callable]] = [
+    ("espera no limite do utilizador não bloqueia a fila", check_blocked_waiter),
+    ("prioridade de reconexão", check_reconnect_priority),
+    ("rejeições (timeout e fila cheia)", check_rejections),
+]
+
+
+async def main() -> int:
+    ok = True
+    for name, check in CHECKS:
+        try:
+            await check(controller())
+            print(f"✅ {name}")
+        except Exception as e:
+            ok = False
+            print(f"❌ {name}: {type(e).__name__}: {e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -60,7 +60,7 @@ async def test_database():
                 print(f"   - {table['table_name']}: {count} registos")
         else:
             print(f"⚠️  Apenas {len(tables)}/3 tabelas encontradas")
-            print("   Execute o schema SQL: python -c 'from src.database.connection import DatabaseConnection; import asyncio; asyncio.run(DatabaseConnection.init_schema())'")
+            print("   Execute o schema SQL: python -m src.database.migrations")
 
         await DatabaseConnection.close_pool()
         print("\n✅ Teste de base de dados concluído com sucesso!")
@@ -0,0 +1,236 @@
+"""Testes de contrato dos backends de memórias (mesmos casos para todos).
+
+Corre o `MemoryStore` completo sobre cada backend com o fornecedor de
+embeddings local, pelo que não precisa de rede nem de credenciais Vertex.
+
+Uso:
+    python test_memory_backends.py               # backend em memória
+    python test_memory_backends.py --postgres    # também PostgreSQL (.env)
+"""
+
+import argparse
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+from src.database.memory_store import MemoryStore
+from src.database.storage import MemoryBackend, InMemoryMemoryBackend, PostgresMemoryBackend
+from src.embeddings import EmbeddingProvider, LocalEmbeddingProvider
+
+
+class FailingProvider(EmbeddingProvider):
+    """Fornecedor sempre indisponível (embeddings ficam pendentes)."""
+
+    model = "failing"
+    dimensions = 768
+
+    async def embed(self, texts, model=None):
+        raise RuntimeError("fornecedor indisponível")
+
+
+async def contract_dedup(store: MemoryStore, user_id: str) -> None:
+    first = await store.add_memory(user_id, "familia", "pessoa", "A neta vive em Lisboa", entity_name="Maria")
+    second = await store.add_memory(user_id, "familia", "pessoa", "A neta vive no Porto", entity_name="Maria")
+    assert second.id == first.id, "mesma entidade devia atualizar a memória"
+    assert second.content == "A neta vive no Porto"
+
+    # entity_name None só iguala None
+    no_name = await store.add_memory(user_id, "familia", "pessoa", "Tem muitos primos")
+    again = await store.add_memory(user_id, "familia", "pessoa", "Tem muitos primos na aldeia")
+    assert again.id == no_name.id
+    assert no_name.id != first.id
+
+    other = await store.add_memory(user_id, "saude", "pessoa", "A neta é enfermeira", entity_name="Maria")
+    assert other.id != first.id, "outra categoria não é duplicado"
+
+
+async def contract_soft_delete(store: MemoryStore, user_id: str) -> None:
+    memory = await store.add_memory(user_id, "hobbies", "atividade", "Gosta de jardinagem", entity_name="jardim")
+    assert await store.delete_memory(memory.id)
+    assert not await store.delete_memory(10**12), "id inexistente não é apagado"
+
+    profile = await store.get_user_profile(user_id)
+    assert "hobbies" not in profile["memorias"], "memória apagada não aparece no perfil"
+    results = await store.search_memories(user_id, "jardinagem", min_similarity=0.0)
+    assert memory.id not in [m.id for m in results], "memória apagada não aparece na pesquisa"
+
+    recreated = await store.add_memory(user_id, "hobbies", "atividade", "Voltou à jardinagem", entity_name="jardim")
+    assert recreated.id != memory.id, "memória apagada não conta para deduplicação"
+
+    updated = await store.update_memory(memory.id, importance=9)
+    assert updated is not None and updated.importance == 9, "apagada continua atualizável por id"
+
+
+async def contract_profile(store: MemoryStore, user_id: str) -> None:
+    await store.ensure_user_exists(user_id, "Joaquim")
+    await store.ensure_user_exists(user_id, "Outro nome")
+    await store.add_memory(user_id, "saude", "condicao", "Tensão alta", importance=8)
+    await store.add_memory(user_id, "saude", "medicamento", "Toma aspirina", importance=3)
+
+    profile = await store.get_user_profile(user_id)
+    assert profile["nome"] == "Joaquim", "create_user não altera um perfil existente"
+    assert profile["membro_desde"] is not None
+    importances = [m["importancia"] for m in profile["memorias"]["saude"]]
+    assert importances == sorted(importances, reverse=True), importances
+
+
+async def contract_semantic_search(store: MemoryStore, user_id: str) -> None:
+    fado = await store.add_memory(user_id, "interesses", "musica", "Gosta de ouvir fado na rádio", entity_name="fado")
+    await store.add_memory(user_id, "interesses", "desporto", "É sócio do Benfica", entity_name="benfica")
+    await store.add_memory(user_id, "hobbies", "musica", "Cantava fado em novo", entity_name="cantar")
+
+    results = await store.search_memories(user_id, "fados na radio")
+    assert results and results[0].id == fado.id, [m.content for m in results]
+    scores = [m.similarity_score for m in results]
+    assert scores == sorted(scores, reverse=True), scores
+
+    assert not await store.search_memories(user_id, "fados na radio", min_similarity=0.999)
+
+    in_category = await store.search_memories(user_id, "fado", category="hobbies", min_similarity=0.0)
+    assert in_category and all(m.category == "hobbies" for m in in_category)
+
+    limited = await store.search_memories(user_id, "fado", limit=1, min_similarity=0.0)
+    assert len(limited) == 1
+
+
+async def contract_model_filter(store: MemoryStore, user_id: str) -> None:
+    """Memórias sem embedding (ou de outro modelo) só aparecem por texto."""
+    pending_store = MemoryStore(provider=FailingProvider(), backend=store.backend)
+    pending = await pending_store.add_memory(
+        user_id, "geral", "facto", "Nasceu em Viseu em 1942", entity_name="naturalidade"
+    )
+    indexed = await store.add_memory(user_id, "geral", "facto", "Viveu em Viseu muitos anos", entity_name="viseu")
+
+    rows = await store.backend.search_memories(
+        user_id, (await store.embed_batch(["viseu"]))[0], 0.0, 10, None, store.embedding_model
+    )
+    assert pending.id not in [row["id"] for row in rows], "pendente fora da pesquisa semântica"
+
+    pending_rows = await store.backend.search_lexical(user_id, "Viseu", 10, None, True)
+    assert [row["id"] for row in pending_rows] == [pending.id], "pending_only só devolve pendentes"
+    all_rows = await store.backend.search_lexical(user_id, "Viseu", 10, None, False)
+    assert {row["id"] for row in all_rows} == {pending.id, indexed.id}
+    assert not await store.backend.search_lexical(user_id, "Coimbra", 10, None, False)
+
+    # A pesquisa completa com as pendentes encontradas por texto
+    results = await store.search_memories(user_id, "Viseu")
+    assert pending.id in [m.id for m in results]
+
+    # Texto só com palavras funcionais: vetor de norma zero fica pendente
+    embeddings, model = await store._generate_embeddings(["e a de que", "viseu"])
+    assert embeddings[0] is None and embeddings[1] is not None and model == store.embedding_model
+    assert await store._generate_embedding("e a de que") == (None, None)
+
+    # O embedding calculado mais tarde torna-a pesquisável
+    await store.update_memory(pending.id, content="Nasceu em Viseu em 1942")
+    source = await store.backend.memory_embedding_source(pending.id)
+    assert source is not None
+    assert not await store.backend.search_lexical(user_id, "Viseu", 10, None, True)
+
+
+async def contract_episodes(store: MemoryStore, user_id: str) -> None:
+    now = datetime.now()
+    episode_id = await store.save_episode(
+        user_id, f"{user_id}-s1", "Falou da vindima na aldeia", ["vindima"], "saudoso",
+        started_at=now - timedelta(hours=3), duration_minutes=10,
+    )
+    assert isinstance(episode_id, int)
+
+    batch = [
+        {
+            "user_id": user_id,
+            "session_id": f"{user_id}-s{i}",
+            "summary": f"Conversa número {i}",
+            "key_topics": ["rotina"],
+            "emotional_tone": "neutro",
+            "started_at": now - timedelta(hours=2, minutes=-i),
+            "ended_at": now - timedelta(hours=1, minutes=-i),
+            "duration_minutes": 5,
+            "metadata": {"turns": i},
+        }
+        for i in (2, 3)
+    ]
+    assert await store.save_episodes(batch) == 2
+    # Repetir o lote (job reprocessado) não duplica episódios
+    await store.save_episodes(batch)
+
+    # save_episode termina o episódio agora; o lote tem ended_at explícito
+    recent = await store.get_recent_episodes(user_id, limit=10)
+    assert [ep["session_id"] for ep in recent] == [
+        f"{user_id}-s1", f"{user_id}-s3", f"{user_id}-s2"
+    ], [ep["session_id"] for ep in recent]
+    assert len(await store.get_recent_episodes(user_id, limit=1)) == 1
+
+    # O lote cria utilizadores que ainda não existem
+    new_user = f"{user_id}-novo"
+    await store.save_episodes([{**batch[0], "user_id": new_user, "session_id": f"{new_user}-s1"}])
+    assert await store.backend.user_exists(new_user)
+
+
+CONTRACTS: List[Tuple[str, Callable]] = [
+    ("deduplicação", contract_dedup),
+    ("soft delete", contract_soft_delete),
+    ("perfil", contract_profile),
+    ("pesquisa semântica", contract_semantic_search),
+    ("filtro de modelo e pesquisa por texto", contract_model_filter),
+    ("episódios", contract_episodes),
+]
+
+
+async def cleanup_postgres(user_ids: List[str]) -> None:
+    from src.database import DatabaseConnection
+
+    # ON DELETE CASCADE remove memórias e episódios
+    await DatabaseConnection.execute(
+        "DELETE FROM user_profiles WHERE user_id = ANY($1::text[])", user_ids
+    )
+
+
+async def run_backend(backend: MemoryBackend) -> bool:
+    print(f"🔍 Backend: {backend.name}")
+    store = MemoryStore(provider=LocalEmbeddingProvider(), backend=backend)
+    prefix = f"test-contract-{uuid.uuid4().hex[:8]}"
+    user_ids = []
+    ok = True
+    try:
+        for index, (name, contract) in enumerate(CONTRACTS):
+            user_id = f"{prefix}-{index}"
+            user_ids += [user_id, f"{user_id}-novo"]
+            try:
+                await contract(store, user_id)
+                print(f"   ✅ {name}")
+            except Exception as e:
+                ok = False
+                print(f"   ❌ {name}: {type(e).__name__}: {e}")
+    finally:
+        if backend.name == "postgres":
+            await cleanup_postgres(user_ids)
+    return ok
+
+
+async def main(args: argparse.Namespace) -> int:
+    backends: List[MemoryBackend] = [InMemoryMemoryBackend()]
+    if args.postgres:
+        backends.append(PostgresMemoryBackend())
+
+    results = [await run_backend(backend) for backend in backends]
+
+    if args.postgres:
+        from src.database import DatabaseConnection
+
+        await DatabaseConnection.close_pool()
+
+    print()
+    if all(results):
+        print("✅ Todos os backends cumprem o contrato")
+        return 0
+    print("❌ Há backends que não cumprem o contrato")
+    return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--postgres", action="store_true", help="testar também o PostgreSQL")
+    sys.exit(asyncio.run(main(parser.parse_args())))
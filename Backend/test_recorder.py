@@ -0,0 +1,172 @@
+"""Testes da gravação de sessões em segmentos mmap (`src/server/recorder.py`).
+
+Uso:
+    python test_recorder.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from src.config import settings
+from src.server import recorder as recorder_module
+from src.server.recorder import (
+    SEGMENT_HEADER_SIZE,
+    RecordKind,
+    SessionRecorder,
+    open_recorder,
+    prune_recordings,
+    read_recording,
+    recording_info,
+)
+
+
+def check_roundtrip(root: Path) -> None:
+    recorder = SessionRecorder(root / "s", "sessao-1", segment_bytes=64 * 1024, max_segments=4)
+    recorder.audio_in(b"\x01\x00" * 320)
+    recorder.event("tool_call", tool="manage_memory", args={"action": "SEARCH"})
+    recorder.audio_out(b"\x02\x00" * 960)
+    recorder.close()
+
+    records = list(read_recording(root / "s"))
+    kinds = [r.kind for r in records]
+    assert kinds == [RecordKind.AUDIO_IN, RecordKind.EVENT, RecordKind.AUDIO_OUT, RecordKind.EVENT], kinds
+    assert records[0].payload == b"\x01\x00" * 320
+    assert records[1].event() == {"event": "tool_call", "tool": "manage_memory", "args": {"action": "SEARCH"}}
+    assert records[3].event()["event"] == "recording_closed"
+    assert [r.t_us for r in records] == sorted(r.t_us for r in records)
+
+    info = recording_info(root / "s")
+    assert info["session_id"] == "sessao-1" and not info["truncated"], info
+    # O espaço pré-alocado por usar é libertado ao fechar
+    assert os.path.getsize(root / "s" / "seg-000001.rec") < 64 * 1024
+
+
+def check_rotation(root: Path) -> None:
+    recorder = SessionRecorder(root / "r", "sessao-2", segment_bytes=4096, max_segments=3)
+    for i in range(100):
+        recorder.audio_in(i.to_bytes(2, "little") * 320)
+    recorder.close()
+
+    segments = sorted(p.name for p in (root / "r").glob("seg-*.rec"))
+    assert len(segments) == 3, segments
+    assert recorder.segments_deleted > 0
+    records = [r for r in read_recording(root / "r") if r.kind == RecordKind.AUDIO_IN]
+    values = [int.from_bytes(r.payload[:2], "little") for r in records]
+    # Mantêm-se os chunks mais recentes, por ordem e sem falhas
+    assert values == list(range(100 - len(values), 100)), values
+    assert recording_info(root / "r")["truncated"]
+
+
+def check_unclosed(root: Path) -> None:
+    """Um processo que morre sem fechar deixa os registos legíveis."""
+    recorder = SessionRecorder(root / "u", "sessao-3", segment_bytes=64 * 1024, max_segments=2)
+    recorder.audio_in(bytes(640))
+    recorder.event("interrupted")
+    records = list(read_recording(root / "u"))
+    assert [r.kind for r in records] == [RecordKind.AUDIO_IN, RecordKind.EVENT]
+
+
+def check_large_record(root: Path) -> None:
+    recorder = SessionRecorder(root / "l", "sessao-4", segment_bytes=4096, max_segments=4)
+    big = bytes(3 * 4096)
+    recorder.audio_out(big)
+    recorder.audio_out(b"\x01\x00")
+    recorder.close()
+    payloads = [r.payload for r in read_recording(root / "l") if r.kind == RecordKind.AUDIO_OUT]
+    assert payloads == [big, b"\x01\x00"]
+    assert os.path.getsize(root / "l" / "seg-000002.rec") >= SEGMENT_HEADER_SIZE + len(big)
+
+
+def check_prune(root: Path) -> None:
+    old = root / "rec" / "2020-01-01" / "antiga"
+    new = root / "rec" / "2026-01-01" / "recente"
+    for directory in (old, new):
+        SessionRecorder(directory, directory.name, segment_bytes=4096).close()
+    stale = time.time() - 5 * 3600
+    os.utime(old, (stale, stale))
+
+    assert prune_recordings(root / "rec", retention_hours=1) == 1
+    assert not old.parent.exists(), "dia sem gravações é apagado"
+    assert new.exists()
+
+
+def check_background_prune(root: Path) -> None:
+    """A limpeza lançada por `open_recorder` corre fora do event loop."""
+    old = root / "bg" / "2020-01-01" / "antiga"
+    SessionRecorder(old, old.name, segment_bytes=4096).close()
+    stale = time.time() - 5 * 3600
+    os.utime(old, (stale, stale))
+    settings.recording_enabled = True
+    settings.recording_dir = str(root / "bg")
+    settings.recording_retention_hours = 1
+
+    async def connect() -> None:
+        opening = asyncio.create_task(open_recorder("sessao-5", "u1", "c0nnection"))
+        await asyncio.sleep(0)
+        # A limpeza foi lançada numa thread, sem esperar por ela
+        assert recorder_module._prune_task is not None
+        assert old.exists(), "a limpeza não corre no event loop"
+        recorder = await opening
+        assert recorder is not None
+        recorder.close()
+        assert await recorder_module._prune_task == 1
+
+    asyncio.run(connect())
+    assert not old.parent.exists()
+
+
+def check_preallocated_rotation(root: Path) -> None:
+    """Com event loop, a rotação usa o segmento alocado numa thread."""
+    directory = root / "prealloc"
+
+    async def record() -> SessionRecorder:
+        recorder = SessionRecorder(directory, "sessao-6", segment_bytes=4096, max_segments=3)
+        for i in range(40):
+            recorder.audio_in(bytes([i]) * 400)
+            # Deixar as threads de alocação e fecho terminarem
+            await asyncio.sleep(0.01)
+        await recorder.aclose()
+        return recorder
+
+    recorder = asyncio.run(record())
+    assert recorder.sync_rotations == 0, recorder.sync_rotations
+    assert recorder.segments_deleted > 0
+    segments = sorted(directory.glob("seg-*.rec"))
+    assert len(segments) == 3, segments
+    records = list(read_recording(directory))
+    chunks = [r for r in records if r.kind == RecordKind.AUDIO_IN]
+    assert [c.payload[0] for c in chunks] == list(range(40))[-len(chunks):]
+    assert records[-1].kind == RecordKind.EVENT
+
+
+CHECKS: List[Tuple[str, Callable[[Path], None]]] = [
+    ("ida e volta", check_roundtrip),
+    ("rotação de segmentos", check_rotation),
+    ("gravação não fechada", check_unclosed),
+    ("registo maior que um segmento", check_large_record),
+    ("retenção", check_prune),
+    ("retenção em background", check_background_prune),
+    ("rotação com segmento pré-alocado", check_preallocated_rotation),
+]
+
+
+def main() -> int:
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, check in CHECKS:
+            try:
+                check(Path(tmp))
+                print(f"✅ {name}")
+            except Exception as e:
+                ok = False
+                print(f"❌ {name}: {type(e).__name__}: {e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
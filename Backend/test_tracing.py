@@ -0,0 +1,132 @@
+"""Testes do tracing de latência (`src/observability/tracing.py`).
+
+Uso:
+    python test_tracing.py
+"""
+
+import asyncio
+import os
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+os.environ["TRACING_ENABLED"] = "true"
+os.environ.setdefault("POSTGRES_PASSWORD", "")
+
+from src.observability import tracing
+from src.observability.tracing import MARK_AUDIO_OUT, MARK_AUDIO_SENT, MARK_MODEL
+
+
+class MemoryExporter(tracing.SpanExporter):
+    """Guarda os registos exportados."""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def export(self, record: Dict[str, Any]) -> None:
+        self.records.append(record)
+
+    def spans(self) -> Dict[str, Dict[str, Any]]:
+        return {r["name"]: r for r in self.records if r["type"] == "span"}
+
+
+@tracing.traced("memory.search")
+async def search() -> str:
+    with tracing.span("db.query", statement="search_memories"):
+        await asyncio.sleep(0.02)
+    return "ok"
+
+
+async def check_noop_outside_trace(exporter: MemoryExporter) -> None:
+    assert await search() == "ok"
+    with tracing.span("solto") as current:
+        current.set(ignorado=True)
+    assert tracing.start_span("solto") is None
+    assert not exporter.records, exporter.records
+
+
+async def check_parents(exporter: MemoryExporter) -> None:
+    trace = tracing.start_trace("ws.connection", user_id="u1")
+    trace.activate()
+    # Tasks filhas herdam o span atual pelo contexto
+    await asyncio.create_task(search())
+    trace.close()
+
+    spans = exporter.spans()
+    root, memory, query = spans["ws.connection"], spans["memory.search"], spans["db.query"]
+    assert memory["parent_id"] == root["span_id"]
+    assert query["parent_id"] == memory["span_id"]
+    assert query["statement"] == "search_memories" and query["ms"] >= 15
+    assert {r["trace_id"] for r in exporter.records} == {trace.trace_id}
+
+
+async def check_errors(exporter: MemoryExporter) -> None:
+    trace = tracing.start_trace("ws.connection")
+    trace.activate()
+    try:
+        with tracing.span("tool.manage_memory"):
+            raise ValueError("falhou")
+    except ValueError:
+        pass
+    trace.close()
+    assert exporter.spans()["tool.manage_memory"]["error"] == "ValueError"
+
+
+async def check_turn_breakdown(exporter: MemoryExporter) -> None:
+    trace = tracing.start_trace("ws.connection", session_id="s1")
+    trace.activate()
+    trace.audio_in(voiced=True)
+    trace.audio_in(voiced=False)
+    await asyncio.sleep(0.05)  # modelo (VAD e inferência)
+    trace.mark(MARK_MODEL)  # tool call
+    with tracing.span("tool.manage_memory"):
+        await search()
+    await asyncio.sleep(0.03)
+    trace.mark(MARK_AUDIO_OUT)
+    await asyncio.sleep(0.01)
+    trace.mark(MARK_AUDIO_SENT, open_turn=False)
+    summary = trace.end_turn("turn_complete")
+
+    # Sem turno aberto, o envio de áudio não abre um novo
+    trace.mark(MARK_AUDIO_SENT, open_turn=False)
+    assert trace.turn is None
+    trace.close()
+
+    breakdown = summary["breakdown_ms"]
+    assert summary["turn"] == 1 and summary["voice"] and summary["session_id"] == "s1"
+    assert set(breakdown) >= {"model", "tool.manage_memory", "memory.search", "db.query", "output"}, breakdown
+    assert breakdown["db.query"] >= 15 and breakdown["model"] >= 70 and breakdown["output"] >= 8, breakdown
+    total = sum(breakdown.values())
+    assert abs(total - summary["silence_ms"]) < 1, (total, summary["silence_ms"])
+
+    names = [segment["name"] for segment in summary["critical_path"]]
+    assert names == ["model", "tool.manage_memory", "model", "output"], names
+    assert summary in exporter.records
+    assert tracing.tracing_metrics.turns >= 1
+
+
+CHECKS: List[Tuple[str, Callable]] = [
+    ("no-op fora de um trace", check_noop_outside_trace),
+    ("spans pai/filho por contexto", check_parents),
+    ("erros nos spans", check_errors),
+    ("decomposição do turno", check_turn_breakdown),
+]
+
+
+async def main() -> int:
+    ok = True
+    for name, check in CHECKS:
+        exporter = MemoryExporter()
+        tracing.set_exporter(exporter)
+        try:
+            # Cada verificação no seu contexto (sem trace herdado)
+            await asyncio.create_task(check(exporter))
+            print(f"✅ {name}")
+        except Exception as e:
+            ok = False
+            print(f"❌ {name}: {type(e).__name__}: {e}")
+    tracing.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))